@@ -0,0 +1,210 @@
+"""Throughput benchmarks for fpf-cli commands on generated specs.
+
+Run from the repository root::
+
+    python -m benchmarks.bench --sizes 1MB,16MB --save baseline.json
+    python -m benchmarks.bench --sizes 1MB,16MB --baseline baseline.json
+
+Every command runs in a fresh interpreter so that its peak RSS is its own.
+Throughput is the spec size divided by the time spent in ``fpf.main``.
+"""
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from benchmarks.specgen import format_size, parse_size, write_spec
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_VERSION = 1
+DEFAULT_SIZES = "1MB,16MB"
+DEFAULT_TOLERANCE = 0.25
+# Interpreter start-up dominates RSS on small specs; growth below this is noise.
+RSS_SLACK_MB = 8.0
+
+
+def benchmark_commands(work_dir: Path, size: int) -> list[tuple[str, list[str]]]:
+    """Commands in run order; later ones reuse outputs of earlier ones."""
+    common = ["--work-dir", str(work_dir)]
+    profiles = ["--profiles-dir", str(REPO_ROOT / "profiles")]
+    return [
+        ("index", ["index", "--rebuild", *common]),
+        ("strip-lite", ["strip-lite", "--force", *common]),
+        ("strip-aggressive", ["strip-aggressive", "--force", *common]),
+        ("strip", ["strip", "--force", *common]),
+        ("split", ["split", "--force", *common]),
+        ("split-chapter", ["split", "--depth", "chapter", "--force", *common]),
+        ("assemble-full", ["assemble", "--profile", "full", "--force", *profiles, *common]),
+        (
+            "assemble-budget",
+            [
+                "assemble",
+                "--profile",
+                "coding",
+                "--max-tokens",
+                str(max(size // 32, 1000)),
+                "--force",
+                *profiles,
+                *common,
+            ],
+        ),
+        ("assemble-all", ["assemble", "--all-profiles", "--force", *profiles, *common]),
+    ]
+
+
+def run_child(argv: list[str]) -> dict[str, float]:
+    """Run ``fpf.main(argv)`` in this process and report time and peak RSS."""
+    import resource
+
+    import fpf
+
+    started = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        exit_code = fpf.main(argv)
+    seconds = time.perf_counter() - started
+    if exit_code != 0:
+        raise SystemExit(f"fpf-cli {' '.join(argv)} exited with {exit_code}")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    rss_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+    return {"seconds": seconds, "peak_rss_mb": rss_bytes / (1024 * 1024)}
+
+
+def measure(argv: list[str]) -> dict[str, float]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench", "--child", json.dumps(argv)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"Benchmark child failed: {argv}")
+    return dict(json.loads(result.stdout), wall_seconds=wall_seconds)
+
+
+def run_benchmarks(
+    sizes: list[int], data_dir: Path, repeat: int = 3, seed: int = 0, log=None
+) -> dict[str, object]:
+    results = []
+    for size in sizes:
+        work_dir = data_dir / f"{format_size(size)}-seed{seed}"
+        spec_path = work_dir / "FPF-Spec.md"
+        if not spec_path.exists():
+            write_spec(spec_path, size, seed)
+        spec_bytes = spec_path.stat().st_size
+        for name, argv in benchmark_commands(work_dir, size):
+            runs = [measure(argv) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run["seconds"])
+            result = {
+                "command": name,
+                "size": format_size(size),
+                "bytes": spec_bytes,
+                "seconds": round(best["seconds"], 4),
+                "wall_seconds": round(best["wall_seconds"], 4),
+                "mb_per_s": round(spec_bytes / (1024 * 1024) / best["seconds"], 2),
+                "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+            }
+            results.append(result)
+            if log is not None:
+                log(result)
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare_results(
+    current: dict[str, object], baseline: dict[str, object], tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """Return one message per command/size that regressed beyond ``tolerance``.
+
+    Throughput may drop and peak RSS may grow by ``tolerance`` (a fraction)
+    before a result counts as a regression. Entries missing from either side
+    are ignored.
+    """
+    previous = {(item["command"], item["size"]): item for item in baseline["results"]}
+    regressions = []
+    for item in current["results"]:
+        base = previous.get((item["command"], item["size"]))
+        if base is None:
+            continue
+        label = f"{item['command']} @ {item['size']}"
+        if item["mb_per_s"] < base["mb_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: {item['mb_per_s']} MB/s, baseline {base['mb_per_s']} MB/s"
+            )
+        if item["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance) + RSS_SLACK_MB:
+            regressions.append(
+                f"{label}: peak RSS {item['peak_rss_mb']} MB, baseline {base['peak_rss_mb']} MB"
+            )
+    return regressions
+
+
+def print_result(result: dict[str, object]) -> None:
+    print(
+        f"{result['command']:<17} {result['size']:>6} {result['mb_per_s']:>9.2f} MB/s "
+        f"{result['seconds']:>8.3f} s {result['peak_rss_mb']:>8.1f} MB RSS",
+        flush=True,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark fpf-cli on generated specs.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated spec sizes.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per command; best is kept.")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed.")
+    parser.add_argument(
+        "--data-dir",
+        default=str(Path(tempfile.gettempdir()) / "fpf-bench"),
+        help="Where generated specs and outputs are kept between runs.",
+    )
+    parser.add_argument("--save", default=None, help="Write results as a JSON baseline.")
+    parser.add_argument("--baseline", default=None, help="Compare against a JSON baseline.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed fractional slowdown or RSS growth before failing.",
+    )
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return 0
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    sizes = [parse_size(value) for value in args.sizes.split(",") if value.strip()]
+    current = run_benchmarks(
+        sizes, Path(args.data_dir), repeat=args.repeat, seed=args.seed, log=print_result
+    )
+    if args.save:
+        Path(args.save).write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.save}")
+    if baseline is not None:
+        regressions = compare_results(current, baseline, args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,189 @@
+"""Deterministic generator of FPF-shaped specs for benchmarks.
+
+The output mimics the structure that fpf-cli cares about: a preface, Parts
+A-K, chapters with nested ``A.1.2``-style headings, SoTA-Echoing, Forces and
+other pattern sections, Markdown tables, and the typographic characters
+(dashes, NBSPs, curly quotes) found in the real spec. The same size and seed
+always produce the same bytes.
+"""
+
+import argparse
+import os
+import random
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+
+PART_TITLES = {
+    "A": "Kernel Architecture Cluster",
+    "B": "Trans‑disciplinary Reasoning Cluster",
+    "C": "Kernel Extension Specifications",
+    "D": "Ethics & Conflict‑Optimisation",
+    "E": "Constitution and Authoring Guides",
+    "F": "Unification Suite",
+    "G": "SoTA Harvester, Parity Harness, Telemetry",
+    "H": "Reserved",
+    "I": "Reserved",
+    "J": "Reserved",
+    "K": "Reserved",
+}
+CHAPTER_NOUNS = (
+    "Holon",
+    "Bounded Context",
+    "Role Assignment",
+    "Method Description",
+    "Work Record",
+    "Evidence Graph",
+    "Trust Calculus",
+    "Aggregation Algebra",
+    "Transformer Quartet",
+    "Creativity Characteristic",
+)
+PATTERN_SECTIONS = (
+    "Problem frame",
+    "Problem",
+    "Forces",
+    "Solution",
+    "Conformance Checklist",
+    "SoTA‑Echoing",
+    "Rationale",
+    "Anti‑patterns",
+    "Relations",
+)
+WORDS = (
+    "holon boundary context role method episteme system claim scope evidence "
+    "assurance carrier work plan record lexicon bridge kernel pattern agent "
+    "transformer characteristic measure reliability formality congruence "
+    "publication view viewpoint lens concern stakeholder obligation gate"
+).split()
+NORMATIVE = ("MUST", "SHALL", "SHOULD", "MAY", "REQUIRED")
+TYPOGRAPHY = ("—", "–", "‑", " ", "“", "”", "’")
+SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*$", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+PARAGRAPH_POOL = 512
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes such as ``1MB``, ``256K`` or ``1GB`` (binary units) to bytes."""
+    match = SIZE_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"Invalid size: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}B"
+    return f"{size}B"
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    if rng.random() < 0.35:
+        words.insert(1, rng.choice(NORMATIVE))
+    if rng.random() < 0.5:
+        position = rng.randrange(1, len(words))
+        words[position] = f"{words[position]}{rng.choice(TYPOGRAPHY)}{rng.choice(WORDS)}"
+    sentence = " ".join(words)
+    return sentence[:1].upper() + sentence[1:] + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.15:
+        rows = [
+            f"| {rng.choice(WORDS)} | {_sentence(rng)} | {rng.choice(NORMATIVE)} |"
+            for _ in range(rng.randint(2, 6))
+        ]
+        return "| Term | Definition | Status |\n|---|---|---|\n" + "\n".join(rows) + "\n\n"
+    if kind < 0.3:
+        items = [f"- {_sentence(rng)}" for _ in range(rng.randint(2, 5))]
+        return "\n".join(items) + "\n\n"
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6))) + "\n\n"
+
+
+def iter_spec_chunks(size: int, seed: int = 0) -> Iterator[str]:
+    """Yield text chunks of a spec of roughly ``size`` UTF-8 bytes.
+
+    Paragraphs come from a fixed pool so that generating a gigabyte stays
+    cheap; headings are numbered uniquely throughout.
+    """
+    rng = random.Random(seed)
+    pool = [_paragraph(rng) for _ in range(PARAGRAPH_POOL)]
+    pool_sizes = [len(text.encode("utf-8")) for text in pool]
+
+    written = 0
+
+    def emit(text: str, text_size: int | None = None) -> str:
+        nonlocal written
+        written += len(text.encode("utf-8")) if text_size is None else text_size
+        return text
+
+    yield emit("# First Principles Framework (FPF)\n\n")
+    yield emit("Preface — synthetic benchmark edition.\n\n")
+    letters = list(PART_TITLES)
+    for part_number, letter in enumerate(letters):
+        part_end = size * (part_number + 1) // len(letters)
+        yield emit(f"# **Part {letter} – {PART_TITLES[letter]}**\n\n")
+        if letter == "A":
+            yield emit("## A.0 Onboarding Glossary\n\n")
+            position = rng.randrange(PARAGRAPH_POOL)
+            yield emit(pool[position], pool_sizes[position])
+        chapter = 0
+        while written < part_end or chapter == 0:
+            chapter += 1
+            noun = CHAPTER_NOUNS[rng.randrange(len(CHAPTER_NOUNS))]
+            yield emit(f"## {letter}.{chapter} {noun} — Pattern\n\n")
+            position = rng.randrange(PARAGRAPH_POOL)
+            yield emit(pool[position], pool_sizes[position])
+            for section, title in enumerate(PATTERN_SECTIONS, start=1):
+                yield emit(f"### {letter}.{chapter}.{section} {title}\n\n")
+                for _ in range(rng.randint(1, 3)):
+                    position = rng.randrange(PARAGRAPH_POOL)
+                    yield emit(pool[position], pool_sizes[position])
+                if rng.random() < 0.2:
+                    yield emit(f"#### {letter}.{chapter}.{section}.1 Worked example\n\n")
+                    position = rng.randrange(PARAGRAPH_POOL)
+                    yield emit(pool[position], pool_sizes[position])
+                if written >= part_end:
+                    break
+
+
+def write_spec(path: Path, size: int, seed: int = 0) -> Path:
+    """Write a generated spec to ``path`` atomically and return it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staged = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with staged.open("w", encoding="utf-8", newline="\n") as output:
+            buffer = []
+            buffered = 0
+            for chunk in iter_spec_chunks(size, seed):
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered >= 1024 * 1024:
+                    output.write("".join(buffer))
+                    buffer.clear()
+                    buffered = 0
+            output.write("".join(buffer))
+        os.replace(staged, path)
+    finally:
+        if staged.exists():
+            staged.unlink()
+    return path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic FPF-shaped spec.")
+    parser.add_argument("--size", default="1MB", help="Target size, e.g. 1MB, 64MB, 1GB.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--output", default="FPF/FPF-Spec.md", help="Output path.")
+    args = parser.parse_args(argv)
+    path = write_spec(Path(args.output), parse_size(args.size), args.seed)
+    print(f"Wrote {path} ({path.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
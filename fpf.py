@@ -1,21 +1,112 @@
 #!/usr/bin/env python3
 
 import argparse
+import base64
+import errno
+import fnmatch
+import hashlib
+import io
+import json
+import mmap
+import os
 import re
+import select
+import struct
 import sys
-import urllib.request
-from dataclasses import dataclass
+import threading
+import time
+import urllib.parse
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
-import yaml
+from fpf_typography import (
+    CHECK_CHUNK_SIZE,
+    CHECK_MIN_CHUNK_SIZE,
+    NormalizationStats,
+    TypographyViolation,
+    iter_normalized,
+    normalize_text,
+    offset_violations,
+    plan_check_chunks,
+    scan_chunk,
+    scan_file_chunk,
+)
+
 
 DEFAULT_SPEC_URL = "https://raw.githubusercontent.com/ailev/FPF/refs/heads/main/FPF-Spec.md"
 DEFAULT_WORK_DIR = Path("FPF")
 DEFAULT_SPEC_NAME = "FPF-Spec.md"
 DEFAULT_LITE_NAME = "FPF-Spec-Lite.md"
 DEFAULT_AGGRESSIVE_NAME = "FPF-Spec-Aggressive.md"
+DEFAULT_NORMALIZED_NAME = "FPF-Spec-Normalized.md"
+DEFAULT_DELTA_NAME = "FPF-Spec-Delta.md"
 DEFAULT_PARTS_MANIFEST = "FPF-Parts-Manifest.yaml"
 DEFAULT_PROFILES_DIR = Path("profiles")
+DEFAULT_RULES_DIR = Path(__file__).resolve().parent / "rules"
+TOOL_VERSION = "0.1.0"
+STAMPS_NAME = ".fpf-stamps.json"
+STAMPS_VERSION = 3
+UPDATE_INDEX_NAME = ".fpf-update.index.json"
+STORE_DIR_NAME = ".fpf-store"
+HTTP_METADATA_SUFFIX = ".http.json"
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DEFAULT_DOWNLOAD_RETRIES = 3
+DEFAULT_DOWNLOAD_BACKOFF = 1.0
+PARTIAL_SUFFIX = ".part"
+ACCEPT_ENCODING = "gzip, deflate"
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 2
+COPY_BUFFER_SIZE = 1024 * 1024
+DEFAULT_SERVE_PORT = 8765
+DEFAULT_SERVE_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_WATCH_DEBOUNCE = 0.2
+DEFAULT_WATCH_INTERVAL = 0.5
+PROFILE_SAMPLE_INTERVAL = 0.001
+COLLAPSED_PROFILE_SUFFIXES = {".folded", ".collapsed"}
+# Each MUST/SHALL/REQUIRED in a section is worth as much as this many tokens
+# of plain text when packing sections into a token budget.
+NORMATIVE_KEYWORD_VALUE = 200
+NORMATIVE_PATTERN = re.compile(rb"\b(?:MUST|SHALL|REQUIRED)\b")
+CHAPTER_ID_PATTERN = re.compile(r"^[A-Z]\.\d+$")
+KNAPSACK_CELLS = 4096
+KERNEL_COPY_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+    errno.EPERM,
+}
+
+
+# Estimated tokens per character, by class of UTF-8 byte. English prose in
+# cl100k/o200k-style BPE vocabularies runs at roughly four letters per token
+# with the preceding space merged in; digits group in threes; ASCII
+# punctuation (markdown tables, emphasis, list markers) merges far less; and
+# non-ASCII characters such as typographic dashes cost about a token each.
+TOKEN_WEIGHTS = {
+    "letters": 0.24,
+    "digits": 0.36,
+    "spaces": 0.05,
+    "newlines": 0.5,
+    "punctuation": 0.6,
+    "non_ascii": 0.9,
+}
+_LETTER_BYTES = bytes(range(ord("A"), ord("Z") + 1)) + bytes(range(ord("a"), ord("z") + 1))
+_DIGIT_BYTES = b"0123456789"
+_SPACE_BYTES = b" \t\r\f\v"
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+# cl100k pre-tokenizer, spelled without \p{L}/\p{N} for the stdlib ``re``.
+BPE_PRETOKEN_PATTERN = re.compile(
+    r"'(?i:[sdmt]|ll|ve|re)|(?:[^\r\n\w]|_)?[^\W\d_]+|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"
+)
 
 
 @dataclass(frozen=True)
@@ -23,6 +114,13 @@ class CompressionStats:
     removed_counts: dict[str, int]
     original_lines: int
     new_lines: int
+    original_bytes: int = 0
+    new_bytes: int = 0
+    original_chars: int = 0
+    new_chars: int = 0
+    original_tokens: int = 0
+    new_tokens: int = 0
+    token_model: str | None = None
 
     @property
     def reduction_percent(self) -> float:
@@ -30,357 +128,5393 @@ class CompressionStats:
             return 0.0
         return round((1 - self.new_lines / self.original_lines) * 100, 1)
 
+    @property
+    def token_reduction_percent(self) -> float:
+        if self.original_tokens == 0:
+            return 0.0
+        return round((1 - self.new_tokens / self.original_tokens) * 100, 1)
 
-def normalize_text(text: str) -> str:
-    text = text.replace("\u2011", "-")
-    text = text.replace("\u2013", "-")
-    text = text.replace("\u2014", "-")
-    text = text.replace("\u00A0", " ")
-    return text
 
+@dataclass(frozen=True)
+class BudgetReport:
+    """Tokens of an output assembled under a budget, and the sections it dropped."""
 
-def compress_fpf(input_path: Path, output_path: Path, aggressive: bool) -> CompressionStats:
-    remove_keywords = [
-        "SoTA-Echoing",
-        "SOTA-Echoing",
-        "SoTA Echoing",
-        "SOTA Echoing",
-        "State-of-the-Art alignment",
-    ]
+    max_tokens: int
+    tokens: int
+    dropped: tuple[str, ...] = ()
 
-    if aggressive:
-        remove_keywords.extend(
-            [
-                "Problem frame",
-                "Problem",
-                "Forces",
-                "Rationale",
-                "Anti-patterns",
+
+@dataclass(frozen=True)
+class TextSize:
+    lines: int
+    bytes: int
+    chars: int
+    tokens: int
+    # Unrounded character-class counts of the heuristic token estimate.
+    token_counts: dict[str, int] | None = None
+
+
+class TokenEstimator:
+    """Streaming token estimate from per-character-class counts.
+
+    Classes are counted on raw UTF-8 bytes with ``bytes.translate``, so the
+    estimate never decodes text and does not depend on how the input is
+    chunked. Small feeds are batched before counting.
+    """
+
+    def __init__(self, weights: dict[str, float] | None = None) -> None:
+        self.weights = TOKEN_WEIGHTS if weights is None else weights
+        self.counts = dict.fromkeys(TOKEN_WEIGHTS, 0)
+        self._bytes = 0
+        self._continuation = 0
+        self._pending = bytearray()
+
+    def feed(self, data: bytes) -> None:
+        if len(data) >= COPY_BUFFER_SIZE and not self._pending:
+            self._count(data)
+            return
+        self._pending += data
+        if len(self._pending) >= COPY_BUFFER_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._count(self._pending)
+            self._pending = bytearray()
+
+    def _count(self, data: bytes) -> None:
+        size = len(data)
+        letters = size - len(data.translate(None, _LETTER_BYTES))
+        digits = size - len(data.translate(None, _DIGIT_BYTES))
+        spaces = size - len(data.translate(None, _SPACE_BYTES))
+        newlines = data.count(b"\n")
+        high = size - len(data.translate(None, _HIGH_BYTES))
+        continuation = size - len(data.translate(None, _CONTINUATION_BYTES))
+        counts = self.counts
+        counts["letters"] += letters
+        counts["digits"] += digits
+        counts["spaces"] += spaces
+        counts["newlines"] += newlines
+        counts["punctuation"] += size - letters - digits - spaces - newlines - high
+        counts["non_ascii"] += high - continuation
+        self._bytes += size
+        self._continuation += continuation
+
+    def merge(self, other: "TokenEstimator") -> None:
+        """Add the counts of ``other``, as if its input had been fed here."""
+        self._flush()
+        other._flush()
+        for name, count in other.counts.items():
+            self.counts[name] += count
+        self._bytes += other._bytes
+        self._continuation += other._continuation
+
+    def add(self, size: TextSize) -> bool:
+        """Count text of a known ``size`` without reading it; False if it lacks class counts."""
+        if size.token_counts is None or set(size.token_counts) != set(self.counts):
+            return False
+        for name, count in size.token_counts.items():
+            self.counts[name] += count
+        self._bytes += size.bytes
+        self._continuation += size.bytes - size.chars
+        return True
+
+    @property
+    def token_counts(self) -> dict[str, int]:
+        self._flush()
+        return dict(self.counts)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes + len(self._pending)
+
+    @property
+    def chars(self) -> int:
+        self._flush()
+        return self._bytes - self._continuation
+
+    @property
+    def tokens(self) -> int:
+        self._flush()
+        return round(sum(count * self.weights[name] for name, count in self.counts.items()))
+
+
+class HeuristicTokenModel:
+    name = "heuristic-v1"
+
+    def counter(self) -> TokenEstimator:
+        return TokenEstimator()
+
+
+class BpeTokenModel:
+    """Exact token counts from an offline BPE vocabulary.
+
+    The vocabulary uses the tiktoken file format: one base64-encoded token
+    and its merge rank per line. Text is pre-tokenized with the cl100k
+    pattern and every distinct piece is merged once and cached.
+    """
+
+    def __init__(self, vocab_path: Path) -> None:
+        self.ranks: dict[bytes, int] = {}
+        digest = new_digest()
+        try:
+            with vocab_path.open("rb") as vocab_file:
+                for line_number, line in enumerate(vocab_file, start=1):
+                    digest.update(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        token, rank = line.split()
+                        self.ranks[base64.b64decode(token, validate=True)] = int(rank)
+                    except ValueError as exc:
+                        raise RuntimeError(
+                            f"Invalid BPE vocabulary line {line_number}: {vocab_path}"
+                        ) from exc
+        except FileNotFoundError as exc:
+            raise RuntimeError(f"BPE vocabulary not found: {vocab_path}") from exc
+        except OSError as exc:
+            raise RuntimeError(f"Failed to read BPE vocabulary: {vocab_path}") from exc
+        self.name = f"bpe:{vocab_path.name}:{digest.hexdigest()[:16]}"
+        self._cache: dict[str, int] = {}
+
+    def counter(self) -> "_BpeCounter":
+        return _BpeCounter(self)
+
+    def count(self, text: str) -> int:
+        cache = self._cache
+        tokens = 0
+        for piece in BPE_PRETOKEN_PATTERN.findall(text):
+            count = cache.get(piece)
+            if count is None:
+                count = cache[piece] = self._merge_count(piece.encode("utf-8"))
+            tokens += count
+        return tokens
+
+    def _merge_count(self, piece: bytes) -> int:
+        ranks = self.ranks
+        if piece in ranks:
+            return 1
+        parts = [piece[position : position + 1] for position in range(len(piece))]
+        while len(parts) > 1:
+            best_rank = None
+            best_position = 0
+            for position in range(len(parts) - 1):
+                rank = ranks.get(parts[position] + parts[position + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank = rank
+                    best_position = position
+            if best_rank is None:
+                break
+            parts[best_position : best_position + 2] = [
+                parts[best_position] + parts[best_position + 1]
             ]
+        return len(parts)
+
+
+class _BpeCounter:
+    """Feeds whole lines to a :class:`BpeTokenModel` so no piece straddles a chunk."""
+
+    def __init__(self, model: BpeTokenModel) -> None:
+        self.model = model
+        self.bytes = 0
+        self._chars = 0
+        self._tokens = 0
+        self._pending = b""
+
+    def feed(self, data: bytes) -> None:
+        self.bytes += len(data)
+        data = self._pending + data
+        cut = data.rfind(b"\n") + 1
+        self._pending = data[cut:]
+        if cut:
+            self._count(data[:cut])
+
+    def _count(self, data: bytes) -> None:
+        text = data.decode("utf-8", errors="replace")
+        self._chars += len(text)
+        self._tokens += self.model.count(text)
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._count(self._pending)
+            self._pending = b""
+
+    def merge(self, other: "_BpeCounter") -> None:
+        """Add the counts of ``other``; exact when both were fed whole lines."""
+        self._flush()
+        other._flush()
+        self.bytes += other.bytes
+        self._chars += other._chars
+        self._tokens += other._tokens
+
+    def add(self, size: TextSize) -> bool:
+        """Count text of a known ``size``; BPE counts are exact, so they just add up."""
+        self.bytes += size.bytes
+        self._chars += size.chars
+        self._tokens += size.tokens
+        return True
+
+    @property
+    def token_counts(self) -> None:
+        return None
+
+    @property
+    def chars(self) -> int:
+        self._flush()
+        return self._chars
+
+    @property
+    def tokens(self) -> int:
+        self._flush()
+        return self._tokens
+
+
+TokenModel = HeuristicTokenModel | BpeTokenModel
+HEURISTIC_TOKEN_MODEL = HeuristicTokenModel()
+
+
+def load_token_model(vocab_path: Path | None = None) -> TokenModel:
+    if vocab_path is None:
+        return HEURISTIC_TOKEN_MODEL
+    return BpeTokenModel(vocab_path)
+
+
+def staging_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def _same_content(first: Path, second: Path) -> bool:
+    with first.open("rb") as first_file, second.open("rb") as second_file:
+        while True:
+            chunk = first_file.read(COPY_BUFFER_SIZE)
+            if chunk != second_file.read(COPY_BUFFER_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def commit_output(staged_path: Path, path: Path) -> bool:
+    """Move a finished staged file into place atomically.
+
+    An existing file with identical content is left untouched (and keeps its
+    mtime) so downstream caches are not invalidated. Returns True if replaced.
+    """
+    try:
+        if path.stat().st_size == staged_path.stat().st_size and _same_content(
+            staged_path, path
+        ):
+            staged_path.unlink()
+            return False
+    except FileNotFoundError:
+        pass
+    os.replace(staged_path, path)
+    return True
+
+
+@contextmanager
+def exclusive_lock(lock_path: Path) -> Iterator[None]:
+    """Hold an advisory lock on ``lock_path`` across processes, where flock exists."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with lock_path.open("a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def discard_output(staged_path: Path) -> None:
+    try:
+        staged_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def write_text_if_changed(path: Path, text: str) -> bool:
+    staged_path = staging_path(path)
+    try:
+        staged_path.write_text(text, encoding="utf-8")
+        return commit_output(staged_path, path)
+    except OSError as exc:
+        discard_output(staged_path)
+        raise RuntimeError(f"Failed to write output file: {path}") from exc
+
+
+class Timings:
+    """Per-phase wall time and byte counts collected for ``--timings``.
+
+    Phases run by worker threads add up, so their sum can exceed the wall time.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def count(self, read: int = 0, written: int = 0) -> None:
+        with self._lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+    def as_dict(self, command: str, exit_code: int) -> dict[str, object]:
+        wall_seconds = time.perf_counter() - self.started
+        return {
+            "command": command,
+            "exit_code": exit_code,
+            "wall_seconds": round(wall_seconds, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "read_mb_per_s": round(self.bytes_read / (1024 * 1024) / wall_seconds, 3),
+            "write_mb_per_s": round(self.bytes_written / (1024 * 1024) / wall_seconds, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+_active_timings: Timings | None = None
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Attribute the wall time of the block to ``phase`` while timings are on."""
+    timings = _active_timings
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def count_io(read: int = 0, written: int = 0) -> None:
+    if _active_timings is not None:
+        _active_timings.count(read, written)
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    rss_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+    return round(rss_bytes / (1024 * 1024), 1)
+
+
+class StackSampler:
+    """Samples one thread's stack and counts collapsed stacks for flamegraphs."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: dict[str, int] = {}
+        self._labels: dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = f"{Path(code.co_filename).stem}:{code.co_name}".replace(" ", "_")
+                    self._labels[code] = label
+                names.append(label)
+                frame = frame.f_back
+            if names:
+                stack = ";".join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+def run_profiled(run, profile_path: Path) -> int:
+    """Run ``run()`` under a profiler and write the profile to ``profile_path``.
+
+    ``.folded``/``.collapsed`` files get sampled collapsed stacks (for
+    flamegraph.pl, speedscope or inferno); anything else gets cProfile stats
+    readable with ``pstats``.
+    """
+    if profile_path.suffix in COLLAPSED_PROFILE_SUFFIXES:
+        with StackSampler(threading.get_ident()) as sampler:
+            exit_code = run()
+        try:
+            profile_path.write_text(sampler.collapsed(), encoding="utf-8")
+        except OSError as exc:
+            print(f"Warning: failed to write profile {profile_path}: {exc}", file=sys.stderr)
+        return exit_code
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    exit_code = profiler.runcall(run)
+    try:
+        profiler.dump_stats(profile_path)
+    except OSError as exc:
+        print(f"Warning: failed to write profile {profile_path}: {exc}", file=sys.stderr)
+    return exit_code
+
+
+HEADER_PATTERN = re.compile(r"^(#+)\s+(.*)")
+START_MARKER_PATTERN = re.compile(r"^#+\s+(Part A|A\.0)", re.IGNORECASE)
+PART_HEADER_PATTERN = re.compile(r"^#+\s\**Part\s+([A-Z])", re.IGNORECASE)
+SECTION_ID_PATTERN = re.compile(
+    r"^[*_\s]*(?:Part\s+([A-Z])(?![\w.])|([A-Z]\.\d+(?:[.:]\d+)*)(?!\w))",
+    re.IGNORECASE,
+)
+
+
+def parse_section_id(title: str) -> str | None:
+    match = SECTION_ID_PATTERN.match(normalize_text(title))
+    if not match:
+        return None
+    if match.group(1):
+        return match.group(1).upper()
+    section_id = match.group(2)
+    return section_id[0].upper() + section_id[1:]
+
+
+@dataclass(frozen=True)
+class RemovalRules:
+    name: str
+    keywords: tuple[str, ...] = ()
+    patterns: tuple[str, ...] = ()
+    section_ids: tuple[str, ...] = ()
+    min_level: int = 1
+    max_level: int | None = None
+    output_file: str | None = None
+
+    def compile(self) -> "CompiledRules":
+        return CompiledRules(self)
+
+
+class CompiledRules:
+    """All removal rules of a rule set folded into two precompiled matchers.
+
+    Keywords become one alternation regex over header titles; section-id
+    globs become one alternation regex over parsed ids. Each alternative is a
+    named group so a match reports its rule label. User title patterns are
+    compiled on their own, since their inline flags, group names and
+    backreferences would not survive being spliced into an alternation.
+    """
+
+    def __init__(self, rules: RemovalRules) -> None:
+        self.rules = rules
+        self.labels: list[str] = []
+        title_branches = []
+        id_branches = []
+        for keyword in rules.keywords:
+            if keyword not in self.labels:
+                title_branches.append(self._branch(keyword, f"(?i:{re.escape(keyword)})"))
+        self.title_patterns: list[tuple[int, re.Pattern]] = []
+        for pattern in rules.patterns:
+            if pattern not in self.labels:
+                self.labels.append(pattern)
+                self.title_patterns.append((len(self.labels) - 1, re.compile(pattern)))
+        for section_glob in rules.section_ids:
+            if section_glob not in self.labels:
+                id_branches.append(self._branch(section_glob, fnmatch.translate(section_glob)))
+        self.title_pattern = re.compile("|".join(title_branches)) if title_branches else None
+        self.id_pattern = re.compile("|".join(id_branches)) if id_branches else None
+
+    def _branch(self, label: str, expression: str) -> str:
+        self.labels.append(label)
+        return f"(?P<r{len(self.labels) - 1}>{expression})"
+
+    def _label(self, match: re.Match) -> str:
+        return self.labels[int(match.lastgroup[1:])]
+
+    def match(self, level: int, title: str) -> str | None:
+        if level < self.rules.min_level:
+            return None
+        if self.rules.max_level is not None and level > self.rules.max_level:
+            return None
+        # When several rules match, the one listed first labels the section.
+        # The alternation reports one rule per position, so search again from
+        # just after each hit to see the rules that start inside it.
+        if self.title_pattern is not None:
+            first: int | None = None
+            match = self.title_pattern.search(title)
+            while match:
+                rule_index = int(match.lastgroup[1:])
+                if first is None or rule_index < first:
+                    first = rule_index
+                match = self.title_pattern.search(title, match.start() + 1)
+            if first is not None:
+                return self.labels[first]
+        for label_index, pattern in self.title_patterns:
+            if pattern.search(title):
+                return self.labels[label_index]
+        if self.id_pattern is not None:
+            section_id = parse_section_id(title)
+            if section_id is not None:
+                match = self.id_pattern.match(section_id)
+                if match:
+                    return self._label(match)
+        return None
+
+
+def _rules_string_list(data: dict[str, object], key: str, rules_path: Path) -> tuple[str, ...]:
+    value = data.get(key, [])
+    if value is None:
+        return ()
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise RuntimeError(f"Rules file {rules_path} field {key} must be a list of strings")
+    return tuple(value)
+
+
+def _rules_level(data: dict[str, object], key: str, rules_path: Path) -> int | None:
+    value = data.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise RuntimeError(f"Rules file {rules_path} field {key} must be a positive integer")
+    return value
+
+
+def load_removal_rules(rules_path: Path) -> RemovalRules:
+    data = load_yaml_manifest(rules_path, kind="Rules")
+    with timed("validate"):
+        output_value = data.get("output_file")
+        if output_value is not None and (not isinstance(output_value, str) or not output_value):
+            raise RuntimeError(f"Invalid output_file entry: {rules_path}")
+
+        patterns = _rules_string_list(data, "patterns", rules_path)
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as exc:
+                raise RuntimeError(
+                    f"Invalid pattern in rules file {rules_path}: {pattern}"
+                ) from exc
+
+        return RemovalRules(
+            name=rules_path.stem,
+            keywords=_rules_string_list(data, "keywords", rules_path),
+            patterns=patterns,
+            section_ids=_rules_string_list(data, "section_ids", rules_path),
+            min_level=_rules_level(data, "min_level", rules_path) or 1,
+            max_level=_rules_level(data, "max_level", rules_path),
+            output_file=output_value,
         )
 
-    header_pattern = re.compile(r"^(#+)\s+(.*)")
-    start_marker_pattern = re.compile(r"^#+\s+(Part A|A\.0)", re.IGNORECASE)
 
+def resolve_rules_path(rules_value: str, rules_dir: Path) -> Path:
+    return resolve_profile_path(rules_value, rules_dir)
+
+
+def rules_output_name(rules: RemovalRules) -> str:
+    return rules.output_file or f"FPF-Spec-{rules.name}.md"
+
+
+@dataclass(frozen=True)
+class CompressionVariant:
+    output_path: Path
+    rules: RemovalRules
+
+
+class _SectionSkipper:
+    """Skip state of one rule set: a matched heading drops its whole subtree."""
+
+    def __init__(self, rules: RemovalRules) -> None:
+        self.matcher = rules.compile()
+        self.removed_counts = {label: 0 for label in self.matcher.labels}
+        self.skipping_section = False
+        self.skip_level = 0
+
+    def keep(self, level: int, title: str | None) -> bool:
+        if title is not None:
+            if self.skipping_section:
+                if level <= self.skip_level:
+                    self.skipping_section = False
+                else:
+                    return False
+
+            label = self.matcher.match(level, title)
+            if label is not None:
+                self.skipping_section = True
+                self.skip_level = level
+                self.removed_counts[label] += 1
+                return False
+
+        return not self.skipping_section
+
+
+def parse_header(line: str) -> tuple[int, str | None]:
+    """Heading level and normalized title of ``line``, or ``(0, None)``."""
+    match = HEADER_PATTERN.match(line)
+    if not match:
+        return 0, None
+    return len(match.group(1)), normalize_text(match.group(2).strip())
+
+
+class _VariantWriter:
+    """Per-variant skip state and counters for a shared compression pass."""
+
+    def __init__(self, variant: CompressionVariant, output_file, counter) -> None:
+        self.output_file = output_file
+        self.counter = counter
+        self.skipper = _SectionSkipper(variant.rules)
+        self.removed_counts = self.skipper.removed_counts
+        self.new_lines = 0
+
+    def write(self, line: str, data: bytes) -> None:
+        self.output_file.write(line)
+        self.counter.feed(data)
+        self.new_lines += 1
+
+    def feed(self, line: str, data: bytes, level: int, title: str | None) -> None:
+        if self.skipper.keep(level, title):
+            self.write(line, data)
+
+
+def compress_fpf_variants(
+    input_path: Path,
+    variants: list[CompressionVariant],
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+) -> list[CompressionStats]:
     try:
         input_file = input_path.open("r", encoding="utf-8")
     except FileNotFoundError as exc:
         raise RuntimeError(f"Input file not found: {input_path}") from exc
 
     is_content_started = False
-    skipping_section = False
-    skip_level = 0
-    removed_counts = {keyword: 0 for keyword in remove_keywords}
     original_lines = 0
-    new_lines = 0
+    original = token_model.counter()
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with input_file, output_path.open("w", encoding="utf-8") as output_file:
-        for line in input_file:
-            original_lines += 1
-            if not is_content_started:
-                if start_marker_pattern.match(line):
-                    is_content_started = True
-                    output_file.write(line)
-                    new_lines += 1
-                continue
+    staged_paths = [staging_path(variant.output_path) for variant in variants]
+    try:
+        with input_file, ExitStack() as stack, timed("strip pass"):
+            writers = []
+            for variant, staged_path in zip(variants, staged_paths):
+                variant.output_path.parent.mkdir(parents=True, exist_ok=True)
+                output_file = stack.enter_context(staged_path.open("w", encoding="utf-8"))
+                writers.append(_VariantWriter(variant, output_file, token_model.counter()))
 
-            match = header_pattern.match(line)
-            if match:
-                level = len(match.group(1))
-                raw_title = match.group(2).strip()
-                clean_title = normalize_text(raw_title)
+            for line in input_file:
+                original_lines += 1
+                data = line.encode("utf-8")
+                original.feed(data)
+                if not is_content_started:
+                    if START_MARKER_PATTERN.match(line):
+                        is_content_started = True
+                        for writer in writers:
+                            writer.write(line, data)
+                    continue
 
-                if skipping_section:
-                    if level <= skip_level:
-                        skipping_section = False
-                    else:
-                        continue
+                level, title = parse_header(line)
+                for writer in writers:
+                    writer.feed(line, data, level, title)
+    except BaseException:
+        for staged_path in staged_paths:
+            discard_output(staged_path)
+        raise
 
-                found_keyword = None
-                for keyword in remove_keywords:
-                    if keyword.lower() in clean_title.lower():
-                        found_keyword = keyword
-                        break
+    with timed("commit"):
+        for variant, staged_path in zip(variants, staged_paths):
+            commit_output(staged_path, variant.output_path)
+    count_io(original.bytes, sum(writer.counter.bytes for writer in writers))
 
-                if found_keyword and not skipping_section:
-                    skipping_section = True
-                    skip_level = level
-                    removed_counts[found_keyword] += 1
-                    continue
+    return [
+        CompressionStats(
+            removed_counts=writer.removed_counts,
+            original_lines=original_lines,
+            new_lines=writer.new_lines,
+            original_bytes=original.bytes,
+            new_bytes=writer.counter.bytes,
+            original_chars=original.chars,
+            new_chars=writer.counter.chars,
+            original_tokens=original.tokens,
+            new_tokens=writer.counter.tokens,
+            token_model=token_model.name,
+        )
+        for writer in writers
+    ]
 
-            if not skipping_section:
-                output_file.write(line)
-                new_lines += 1
 
-    return CompressionStats(
-        removed_counts=removed_counts,
-        original_lines=original_lines,
-        new_lines=new_lines,
+def load_builtin_rules(aggressive: bool) -> RemovalRules:
+    name = "aggressive" if aggressive else "lite"
+    return load_removal_rules(DEFAULT_RULES_DIR / f"{name}.yaml")
+
+
+def compress_fpf(
+    input_path: Path,
+    output_path: Path,
+    aggressive: bool,
+    rules: RemovalRules | None = None,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+) -> CompressionStats:
+    if rules is None:
+        rules = load_builtin_rules(aggressive)
+    [stats] = compress_fpf_variants(
+        input_path, [CompressionVariant(output_path, rules)], token_model
     )
+    return stats
 
 
-def print_compression_stats(stats: CompressionStats, output_path: Path) -> None:
-    print(f"Stats for {output_path}:")
-    print("Removal statistics:")
+def print_compression_stats(
+    stats: CompressionStats, output_path: Path | str, file=None
+) -> None:
+    print(f"Stats for {output_path}:", file=file)
+    print("Removal statistics:", file=file)
     for keyword, count in stats.removed_counts.items():
         if count:
-            print(f"  - {keyword}: {count} sections")
+            print(f"  - {keyword}: {count} sections", file=file)
     print(
         f"Lines: {stats.original_lines} -> {stats.new_lines} "
-        f"(Reduction: {stats.reduction_percent:.1f}%)"
+        f"(Reduction: {stats.reduction_percent:.1f}%)",
+        file=file,
     )
+    if stats.token_model is not None:
+        print(
+            f"Size: {stats.original_bytes} -> {stats.new_bytes} bytes, "
+            f"{stats.original_chars} -> {stats.new_chars} chars",
+            file=file,
+        )
+        print(
+            f"Tokens ({stats.token_model}): {stats.original_tokens} -> {stats.new_tokens} "
+            f"(Reduction: {stats.token_reduction_percent:.1f}%)",
+            file=file,
+        )
 
 
-def split_fpf(input_path: Path, output_dir: Path) -> list[str]:
-    try:
-        input_file = input_path.open("r", encoding="utf-8")
-    except FileNotFoundError as exc:
-        raise RuntimeError(f"Input file not found: {input_path}") from exc
+def print_budget_report(report: BudgetReport, file=None) -> None:
+    print(f"Token budget: {report.tokens} of {report.max_tokens} tokens used", file=file)
+    if report.dropped:
+        print("Dropped to fit the budget:", file=file)
+        for label in report.dropped:
+            print(f"  - {label}", file=file)
 
-    try:
-        output_dir.mkdir(parents=True, exist_ok=True)
-    except OSError as exc:
-        raise RuntimeError(f"Failed to write output directory: {output_dir}") from exc
-    manifest = []
 
-    def open_output(path: Path):
-        try:
-            return path.open("w", encoding="utf-8")
-        except OSError as exc:
-            raise RuntimeError(f"Failed to write output file: {path}") from exc
+# Generator stages: each takes an iterable of text lines (with their line
+# endings) and yields lines, so stages chain in one process with memory
+# bounded by the longest section rather than by the spec.
 
-    part_header_pattern = re.compile(r"^#+\s\**Part\s+([A-Z])", re.IGNORECASE)
-    current_name = "FPF-Part-Preface.md"
-    manifest.append(current_name)
-    current_path = output_dir / current_name
-    with input_file:
-        current_file = open_output(current_path)
+
+def iter_lines(source: Path | str) -> Iterator[str]:
+    """Yield the lines of a UTF-8 file; ``-`` reads standard input."""
+    if str(source) == "-":
+        buffer = getattr(sys.stdin, "buffer", None)
+        if buffer is None:
+            yield from sys.stdin
+            return
+        input_file = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
         try:
-            for line in input_file:
-                normalized_line = normalize_text(line)
-                match = part_header_pattern.match(normalized_line)
-                if match:
-                    part_id = match.group(1).upper()
-                    current_file.close()
-                    current_name = f"FPF-Part-{part_id}.md"
-                    manifest.append(current_name)
-                    current_path = output_dir / current_name
-                    current_file = open_output(current_path)
-                current_file.write(line)
+            yield from input_file
         finally:
-            current_file.close()
-
-    manifest_path = output_dir / DEFAULT_PARTS_MANIFEST
+            input_file.detach()
+        return
     try:
-        manifest_text = yaml.safe_dump(
-            {"parts": manifest, "baseline_file": input_path.name},
-            sort_keys=False,
-        )
-        manifest_path.write_text(manifest_text, encoding="utf-8")
-    except OSError as exc:
-        raise RuntimeError(f"Failed to write output file: {manifest_path}") from exc
+        input_file = Path(source).open("r", encoding="utf-8", newline="")
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Input file not found: {source}") from exc
+    with input_file:
+        yield from input_file
 
-    return manifest
 
+def iter_strip(
+    lines: Iterable[str],
+    rules: RemovalRules,
+    removed_counts: dict[str, int] | None = None,
+) -> Iterator[str]:
+    """Drop the sections matched by ``rules``, as :func:`compress_fpf` does.
 
-def resolve_workdir_path(work_dir: Path, value: str, label: str) -> Path:
-    path = Path(value)
-    if value in {".", ".."} or path.is_absolute() or path.name != value:
-        raise RuntimeError(f"{label} must be a filename: {value}")
-    return (work_dir / path).resolve(strict=False)
+    Lines before the first ``Part A``/``A.0`` heading are skipped. Removed
+    sections are tallied per rule label into ``removed_counts``.
+    """
+    skipper = _SectionSkipper(rules)
+    if removed_counts is not None:
+        removed_counts.update(skipper.removed_counts)
+        skipper.removed_counts = removed_counts
+    is_content_started = False
+    for line in lines:
+        if not is_content_started:
+            if START_MARKER_PATTERN.match(line):
+                is_content_started = True
+                yield line
+            continue
+        level, title = parse_header(line)
+        if skipper.keep(level, title):
+            yield line
 
 
-def resolve_profile_path(profile_value: str, profiles_dir: Path) -> Path:
-    path = Path(profile_value)
-    if path.is_absolute() or path.name != profile_value:
-        return path
-    if path.suffix:
-        return profiles_dir / path
-    return profiles_dir / f"{profile_value}.yaml"
+@dataclass(frozen=True)
+class SectionChunk:
+    level: int
+    section_id: str | None
+    title: str | None
+    lines: tuple[str, ...]
 
 
-def load_yaml_manifest(manifest_path: Path) -> dict[str, object]:
-    try:
-        text = manifest_path.read_text(encoding="utf-8")
-    except FileNotFoundError as exc:
-        raise RuntimeError(f"Manifest file not found: {manifest_path}") from exc
-    except OSError as exc:
-        raise RuntimeError(f"Failed to read manifest: {manifest_path}") from exc
+def iter_sections(lines: Iterable[str]) -> Iterator[SectionChunk]:
+    """Group lines into flat chunks: one heading with its body up to the next heading.
 
-    try:
-        data = yaml.safe_load(text)
-    except yaml.YAMLError as exc:
-        raise RuntimeError(f"Failed to parse manifest: {manifest_path}") from exc
+    Text before the first heading is yielded as a level 0 chunk without a title.
+    """
+    level = 0
+    title = None
+    chunk: list[str] = []
+    for line in lines:
+        line_level, line_title = parse_header(line)
+        if line_title is not None:
+            if chunk:
+                yield SectionChunk(
+                    level, parse_section_id(title) if title else None, title, tuple(chunk)
+                )
+            level, title, chunk = line_level, line_title, []
+        chunk.append(line)
+    if chunk:
+        yield SectionChunk(level, parse_section_id(title) if title else None, title, tuple(chunk))
 
-    if not isinstance(data, dict):
-        raise RuntimeError(f"Manifest must be a mapping: {manifest_path}")
 
-    return data
+def iter_select_sections(
+    lines: Iterable[str],
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+) -> Iterator[str]:
+    """Streaming counterpart of manifest ``include_sections``/``exclude_sections``.
 
+    A selector covers its section and every nested heading below it.
+    """
+    stack: list[tuple[int, bool, bool]] = []
+    included = include is None
+    excluded = False
+    for line in lines:
+        level, title = parse_header(line)
+        if title is not None:
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            parent_included, parent_excluded = (
+                stack[-1][1:] if stack else (include is None, False)
+            )
+            section_id = parse_section_id(title)
+            included = parent_included or (
+                include is not None and section_matches(section_id, include)
+            )
+            excluded = parent_excluded or bool(exclude and section_matches(section_id, exclude))
+            stack.append((level, included, excluded))
+        if included and not excluded:
+            yield line
 
-def count_lines(path: Path) -> int:
-    try:
-        with path.open("r", encoding="utf-8") as handle:
-            return sum(1 for _ in handle)
-    except FileNotFoundError as exc:
-        raise RuntimeError(f"Part file not found: {path}") from exc
-    except OSError as exc:
-        raise RuntimeError(f"Failed to read part file: {path}") from exc
 
+def iter_parts(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Yield ``(part filename, line)`` pairs using the same boundaries as split."""
+    current_name = SPLIT_PREFACE_NAME
+    for line in lines:
+        match = PART_HEADER_PATTERN.match(normalize_text(line))
+        if match:
+            current_name = f"FPF-Part-{match.group(1).upper()}.md"
+        yield current_name, line
 
-def validate_part_paths(part_paths: list[Path]) -> None:
-    for part_path in part_paths:
-        try:
-            with part_path.open("r", encoding="utf-8"):
-                pass
-        except FileNotFoundError as exc:
-            raise RuntimeError(f"Part file not found: {part_path}") from exc
-        except OSError as exc:
-            raise RuntimeError(f"Failed to read part file: {part_path}") from exc
 
+class LineMeter:
+    """Pass-through stage that measures the lines flowing through it."""
 
-def assemble_fpf(manifest_path: Path, work_dir: Path) -> tuple[Path, CompressionStats | None]:
-    data = load_yaml_manifest(manifest_path)
-    output_value = data.get("output_file")
-    parts_value = data.get("parts")
-    baseline_value = data.get("baseline_file")
+    def __init__(
+        self, lines: Iterable[str], token_model: TokenModel = HEURISTIC_TOKEN_MODEL
+    ) -> None:
+        self.source = lines
+        self.counter = token_model.counter()
+        self.lines = 0
 
-    if not isinstance(output_value, str) or not output_value:
-        raise RuntimeError(
-            f"Manifest file {manifest_path} is missing required field: output_file"
-        )
-    if not isinstance(parts_value, list):
-        raise RuntimeError(
-            f"Manifest file {manifest_path} is missing required field: parts"
-        )
+    def __iter__(self) -> Iterator[str]:
+        for line in self.source:
+            self.lines += 1
+            self.counter.feed(line.encode("utf-8"))
+            yield line
 
-    output_path = resolve_workdir_path(work_dir, output_value, "Output file")
-    part_paths = []
-    for raw in parts_value:
-        if not isinstance(raw, str) or not raw:
-            raise RuntimeError(f"Invalid part entry in manifest: {manifest_path}")
-        part_paths.append(resolve_workdir_path(work_dir, raw, "Part filename"))
+    def size(self) -> TextSize:
+        return TextSize(
+            lines=self.lines,
+            bytes=self.counter.bytes,
+            chars=self.counter.chars,
+            tokens=self.counter.tokens,
+        )
 
-    validate_part_paths(part_paths)
 
+def write_lines(lines: Iterable[str], target: Path | str) -> None:
+    """Write lines to ``target`` atomically; ``-`` writes to standard output."""
+    if str(target) == "-":
+        buffer = getattr(sys.stdout, "buffer", None)
+        if buffer is None:
+            sys.stdout.writelines(lines)
+            return
+        sys.stdout.flush()
+        output = io.TextIOWrapper(buffer, encoding="utf-8", newline="", write_through=True)
+        try:
+            output.writelines(lines)
+            output.flush()
+        finally:
+            output.detach()
+        return
+    path = Path(target)
+    staged_path = staging_path(path)
     try:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with staged_path.open("w", encoding="utf-8", newline="") as output_file:
+            output_file.writelines(lines)
+        commit_output(staged_path, path)
     except OSError as exc:
-        raise RuntimeError(f"Failed to write output file: {output_path}") from exc
+        raise RuntimeError(f"Failed to write output file: {path}") from exc
+    finally:
+        discard_output(staged_path)
 
-    output_lines = 0
-    try:
-        with output_path.open("w", encoding="utf-8") as output_file:
-            for part_path in part_paths:
-                try:
-                    with part_path.open("r", encoding="utf-8") as part_file:
-                        for line in part_file:
-                            output_file.write(line)
-                            output_lines += 1
-                except FileNotFoundError as exc:
-                    raise RuntimeError(f"Part file not found: {part_path}") from exc
-                except OSError as exc:
-                    raise RuntimeError(f"Failed to read part file: {part_path}") from exc
-    except OSError as exc:
-        raise RuntimeError(f"Failed to write output file: {output_path}") from exc
 
-    if baseline_value is None:
-        print(f"Warning: baseline_file missing in manifest: {manifest_path}", file=sys.stderr)
-        return output_path, None
+def strip_stream(
+    lines: Iterable[str],
+    target: Path | str,
+    rules: RemovalRules,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+) -> CompressionStats:
+    """Strip ``lines`` into ``target`` (``-`` for stdout) without intermediate files."""
+    removed_counts: dict[str, int] = {}
+    original = LineMeter(lines, token_model)
+    kept = LineMeter(iter_strip(original, rules, removed_counts), token_model)
+    with timed("strip pass"):
+        write_lines(kept, target)
+    original_size = original.size()
+    new_size = kept.size()
+    count_io(original_size.bytes, new_size.bytes)
+    return CompressionStats(
+        removed_counts=removed_counts,
+        original_lines=original_size.lines,
+        new_lines=new_size.lines,
+        original_bytes=original_size.bytes,
+        new_bytes=new_size.bytes,
+        original_chars=original_size.chars,
+        new_chars=new_size.chars,
+        original_tokens=original_size.tokens,
+        new_tokens=new_size.tokens,
+        token_model=token_model.name,
+    )
 
-    if not isinstance(baseline_value, str) or not baseline_value:
-        raise RuntimeError(f"Invalid baseline_file entry: {manifest_path}")
 
+def normalize_typographics(input_path: Path, output_path: Path) -> NormalizationStats:
+    """Write ``input_path`` with typographics and Part headers normalized (PF-7).
+
+    Line endings are kept as they are. The output is staged and moved into
+    place atomically, so ``output_path`` may be ``input_path`` itself.
+    """
     try:
-        baseline_path = resolve_workdir_path(work_dir, baseline_value, "Baseline file")
-        baseline_lines = count_lines(baseline_path)
-    except RuntimeError as exc:
-        print(f"Warning: {exc}", file=sys.stderr)
-        return output_path, None
+        input_file = input_path.open("r", encoding="utf-8", newline="")
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Input file not found: {input_path}") from exc
+    stats = NormalizationStats()
+    with input_file, timed("normalize pass"):
+        input_size = os.fstat(input_file.fileno()).st_size
+        write_lines(iter_normalized(input_file, stats), output_path)
+    count_io(input_size, output_path.stat().st_size)
+    return stats
 
-    stats = CompressionStats(
-        removed_counts={},
-        original_lines=baseline_lines,
-        new_lines=output_lines,
-    )
-    return output_path, stats
 
+def check_typographics(input_path: Path, jobs: int | None = None) -> list[TypographyViolation]:
+    """Every typographic violation of ``input_path``, in line order (PF-8).
 
-def download_spec(url: str, output_path: Path) -> None:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    The file is memory-mapped and cut into newline-aligned chunks, one to four
+    MiB each so that every job gets work. With more than one chunk and job the
+    chunks are scanned in a process pool; results come back in chunk order
+    and line numbers are rebuilt from the newline counts of earlier chunks.
+    """
     try:
-        with urllib.request.urlopen(url, timeout=30) as response:
-            if response.status != 200:
-                raise RuntimeError(f"HTTP {response.status} while downloading {url}")
-            data = response.read()
-    except Exception as exc:
+        input_file = input_path.open("rb")
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Input file not found: {input_path}") from exc
+    jobs = jobs or os.cpu_count() or 1
+    with input_file, timed("check pass"):
+        size = os.fstat(input_file.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunk_size = min(CHECK_CHUNK_SIZE, max(CHECK_MIN_CHUNK_SIZE, -(-size // jobs)))
+            chunks = plan_check_chunks(data, chunk_size)
+            if jobs == 1 or len(chunks) == 1:
+                results = [scan_chunk(data[start:end]) for start, end in chunks]
+            else:
+                from concurrent.futures import ProcessPoolExecutor
+
+                with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+                    results = list(
+                        pool.map(
+                            scan_file_chunk,
+                            [str(input_path)] * len(chunks),
+                            [start for start, _ in chunks],
+                            [end for _, end in chunks],
+                        )
+                    )
+    count_io(size)
+    return list(offset_violations(results))
+
+
+@dataclass(frozen=True)
+class FileMetadata:
+    lines: int
+    bytes: int
+    blake2b: str
+    mtime_ns: int | None  # None for files kept only in the chunk store
+    chars: int | None = None
+    tokens: int | None = None
+    token_counts: dict[str, int] | None = None
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.bytes == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+    def text_size(self) -> TextSize | None:
+        if self.chars is None or self.tokens is None:
+            return None
+        return TextSize(
+            lines=self.lines,
+            bytes=self.bytes,
+            chars=self.chars,
+            tokens=self.tokens,
+            token_counts=self.token_counts,
+        )
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "blake2b": self.blake2b,
+            "mtime_ns": self.mtime_ns,
+            "chars": self.chars,
+            "tokens": self.tokens,
+            "token_counts": self.token_counts,
+        }
+
+
+class _MeasuredOutput:
+    """Staged binary output that tracks lines, size, digest and tokens as it is written."""
+
+    def __init__(self, path: Path, token_model: TokenModel) -> None:
+        self.path = path
+        self.staged_path = staging_path(path)
+        try:
+            self.file = self.staged_path.open("wb")
+        except OSError as exc:
+            raise RuntimeError(f"Failed to write output file: {path}") from exc
+        self.digest = new_digest()
+        self.counter = token_model.counter()
+        self.newlines = 0
+        self.size = 0
+        self.last_byte = b""
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.file.write(data)
+        self.digest.update(data)
+        self.counter.feed(data)
+        self.newlines += data.count(b"\n")
+        self.size += len(data)
+        self.last_byte = data[-1:]
+
+    @property
+    def lines(self) -> int:
+        return self.newlines + (1 if self.last_byte not in {b"", b"\n"} else 0)
+
+    def discard(self) -> None:
+        self.file.close()
+        discard_output(self.staged_path)
+
+    def close(self) -> FileMetadata:
+        self.file.close()
+        commit_output(self.staged_path, self.path)
+        return FileMetadata(
+            lines=self.lines,
+            bytes=self.size,
+            blake2b=self.digest.hexdigest(),
+            mtime_ns=self.path.stat().st_mtime_ns,
+            chars=self.counter.chars,
+            tokens=self.counter.tokens,
+            token_counts=self.counter.token_counts,
+        )
+
+
+SPLIT_DEPTHS = {"part": 1, "chapter": 2, "section": 3}
+SPLIT_PREFACE_NAME = "FPF-Part-Preface.md"
+SECTION_ID_SEPARATOR_PATTERN = re.compile(r"[.:]")
+
+
+@dataclass(frozen=True)
+class SplitUnit:
+    """One output file of ``split``: a byte range of the spec.
+
+    ``level`` is 0 for the preface, 1 for a Part, 2 for a chapter such as
+    ``B.5`` and 3 for a section such as ``B.5.2``.
+    """
+
+    name: str
+    start: int
+    end: int
+    level: int
+    section_id: str | None = None
+    title: str | None = None
+
+
+def _split_heading(line: str, max_level: int) -> tuple[int, str, str] | None:
+    """``(level, section id, title)`` if heading ``line`` starts a split file."""
+    normalized = normalize_text(line)
+    match = PART_HEADER_PATTERN.match(normalized)
+    if match:
+        return 1, match.group(1).upper(), (parse_header(normalized)[1] or "").strip("*_ ")
+    if max_level == 1:
+        return None
+    _, title = parse_header(normalized)
+    section_id = parse_section_id(title) if title else None
+    if section_id is None or "." not in section_id:
+        return None
+    level = len(SECTION_ID_SEPARATOR_PATTERN.split(section_id))
+    if level > max_level:
+        return None
+    return level, section_id, title.strip("*_ ")
+
+
+def _next_heading(data: bytes | mmap.mmap, offset: int) -> int:
+    """Offset of the first line after ``offset`` that starts with ``#``, or -1."""
+    found = data.find(b"\n#", offset)
+    return -1 if found == -1 else found + 1
+
+
+def plan_split(data: bytes | mmap.mmap, depth: str = "part") -> list[SplitUnit]:
+    """Byte ranges of the files ``split`` writes at ``depth``, in spec order.
+
+    Only lines starting with ``#`` can start a file, so the scan jumps from
+    one ``\\n#`` to the next and decodes nothing else. A heading whose file
+    name was already used stays in the current file, so every byte is
+    written exactly once.
+    """
+    max_level = SPLIT_DEPTHS[depth]
+    size = len(data)
+    starts: list[tuple[int, str, int, str | None, str | None]] = [
+        (0, SPLIT_PREFACE_NAME, 0, None, None)
+    ]
+    names = {SPLIT_PREFACE_NAME}
+    position = 0 if data[:1] == b"#" else _next_heading(data, 0)
+    while position != -1:
+        line_end = data.find(b"\n", position)
+        if line_end == -1:
+            line_end = size
+        heading = _split_heading(
+            data[position:line_end].decode("utf-8", "replace"), max_level
+        )
+        if heading is not None:
+            level, section_id, title = heading
+            if level == 1:
+                name = f"FPF-Part-{section_id}.md"
+            else:
+                name = f"FPF-Sec-{section_id.replace(':', '-')}.md"
+            if name not in names:
+                names.add(name)
+                starts.append((position, name, level, section_id, title))
+        position = _next_heading(data, line_end)
+    units = []
+    for index, (start, name, level, section_id, title) in enumerate(starts):
+        end = starts[index + 1][0] if index + 1 < len(starts) else size
+        units.append(SplitUnit(name, start, end, level, section_id, title))
+    return units
+
+
+def split_hierarchy(units: list[SplitUnit]) -> list[dict[str, object]]:
+    """Nest split files under the Part or chapter file that contains them."""
+    roots: list[dict[str, object]] = []
+    stack: list[tuple[int, dict[str, object]]] = []
+    for unit in units:
+        node: dict[str, object] = {"file": unit.name}
+        if unit.section_id is not None:
+            node["id"] = unit.section_id
+            node["title"] = unit.title
+        if unit.level == 0:
+            roots.append(node)
+            continue
+        while stack and stack[-1][0] >= unit.level:
+            stack.pop()
+        siblings = stack[-1][1].setdefault("children", []) if stack else roots
+        siblings.append(node)
+        stack.append((unit.level, node))
+    return roots
+
+
+def _range_blocks(data: bytes | mmap.mmap, start: int, end: int) -> Iterator[bytes]:
+    for offset in range(start, end, COPY_BUFFER_SIZE):
+        yield data[offset : min(offset + COPY_BUFFER_SIZE, end)]
+
+
+def _write_split_units(
+    data: bytes | mmap.mmap, units: list[SplitUnit], output_dir: Path, token_model: TokenModel
+) -> list[tuple[FileMetadata, object, None]]:
+    results = []
+    for unit in units:
+        output = _MeasuredOutput(output_dir / unit.name, token_model)
+        try:
+            for block in _range_blocks(data, unit.start, unit.end):
+                output.write(block)
+            results.append((output.close(), output.counter, None))
+        except OSError as exc:
+            raise RuntimeError(f"Failed to write output file: {output.path}") from exc
+        finally:
+            output.discard()
+    return results
+
+
+def _batch_split_units(units: list[SplitUnit], batches: int) -> list[list[SplitUnit]]:
+    """Consecutive runs of ``units`` of about equal size, one executor task each."""
+    target = max(1, (units[-1].end - units[0].start) // batches)
+    result: list[list[SplitUnit]] = [[]]
+    batch_size = 0
+    for unit in units:
+        if batch_size >= target:
+            result.append([])
+            batch_size = 0
+        result[-1].append(unit)
+        batch_size += unit.end - unit.start
+    return result
+
+
+def _digest_range(data: bytes | mmap.mmap, start: int, end: int) -> str:
+    digest = new_digest()
+    for block in _range_blocks(data, start, end):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkStore:
+    """Content-addressed split chunks under ``<work-dir>/.fpf-store``.
+
+    A chunk is stored once at ``chunks/<2 hex digits>/<rest of its blake2b>``
+    and never rewritten, so revisions of the spec share every unchanged
+    section. ``versions/<baseline blake2b>.yaml`` keeps the parts manifest of
+    each stored revision.
+    """
+
+    def __init__(self, work_dir: Path) -> None:
+        self.root = work_dir / STORE_DIR_NAME
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest[2:]
+
+    def version_path(self, digest: str) -> Path:
+        return self.root / "versions" / f"{digest}.yaml"
+
+    def put(self, digest: str, data: bytes) -> bool:
+        """Store ``data`` under ``digest`` unless present; True if it was written."""
+        path = self.chunk_path(digest)
+        if path.exists():
+            return False
+        # Threads may store the same chunk at once, so the staging name is per thread.
+        staged_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            staged_path.write_bytes(data)
+            os.replace(staged_path, path)
+        except OSError as exc:
+            discard_output(staged_path)
+            raise RuntimeError(f"Failed to write chunk: {path}") from exc
+        with self._lock:
+            self.bytes_written += len(data)
+        return True
+
+    def read(self, digests: Iterable[str]) -> bytes:
+        blocks = []
+        for digest in digests:
+            path = self.chunk_path(digest)
+            try:
+                blocks.append(path.read_bytes())
+            except FileNotFoundError as exc:
+                raise RuntimeError(f"Chunk not found in store: {path}") from exc
+            except OSError as exc:
+                raise RuntimeError(f"Failed to read chunk: {path}") from exc
+        return b"".join(blocks)
+
+    def find_version(self, version: str) -> Path:
+        """Manifest of the stored version whose digest starts with ``version``."""
+        if not re.fullmatch(r"[0-9a-f]+", version):
+            raise RuntimeError(f"Invalid stored version: {version}")
+        matches = sorted((self.root / "versions").glob(f"{version}*.yaml"))
+        if not matches:
+            raise RuntimeError(f"Stored version not found: {version}")
+        if len(matches) > 1:
+            raise RuntimeError(f"Ambiguous stored version: {version}")
+        return matches[0]
+
+
+def _store_split_units(
+    data: bytes | mmap.mmap,
+    units: list[SplitUnit],
+    chunk_starts: list[int],
+    store: ChunkStore,
+    token_model: TokenModel,
+) -> list[tuple[FileMetadata, object, list[str]]]:
+    """Store ``units`` as chunks cut at ``chunk_starts`` and measure them."""
+    results = []
+    for unit in units:
+        digest = new_digest()
+        counter = token_model.counter()
+        newlines = 0
+        first = bisect_right(chunk_starts, unit.start)
+        last = bisect_left(chunk_starts, unit.end)
+        bounds = [unit.start, *chunk_starts[first:last], unit.end]
+        chunks = []
+        for start, end in zip(bounds, bounds[1:]):
+            if start == end:
+                continue
+            block = data[start:end]
+            digest.update(block)
+            counter.feed(block)
+            newlines += block.count(b"\n")
+            chunk_digest = new_digest_of(block)
+            store.put(chunk_digest, block)
+            chunks.append(chunk_digest)
+        trailing = unit.end > unit.start and data[unit.end - 1 : unit.end] != b"\n"
+        metadata = FileMetadata(
+            lines=newlines + trailing,
+            bytes=unit.end - unit.start,
+            blake2b=digest.hexdigest(),
+            mtime_ns=None,
+            chars=counter.chars,
+            tokens=counter.tokens,
+            token_counts=counter.token_counts,
+        )
+        results.append((metadata, counter, chunks))
+    return results
+
+
+def split_fpf(
+    input_path: Path,
+    output_dir: Path,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    depth: str = "part",
+    jobs: int | None = None,
+    store: bool = False,
+) -> list[str]:
+    """Split the spec into files at ``depth`` and write the parts manifest.
+
+    A scan over the memory-mapped spec finds the byte range of every file
+    (see :func:`plan_split`); the files and the baseline digest are then
+    written and measured concurrently by up to ``jobs`` threads.
+
+    With ``store`` no files are written. Every file is cut into section
+    chunks that go to the :class:`ChunkStore` of ``output_dir``, and the
+    manifest maps each file to its ``chunks`` and is also kept as the
+    store's version manifest for the spec's digest.
+    """
+    if depth not in SPLIT_DEPTHS:
+        raise RuntimeError(f"Unknown split depth: {depth}")
+    try:
+        input_file = input_path.open("rb")
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Input file not found: {input_path}") from exc
+
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as exc:
+        raise RuntimeError(f"Failed to write output directory: {output_dir}") from exc
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ExitStack() as stack:
+        stack.enter_context(input_file)
+        input_stat = os.fstat(input_file.fileno())
+        data: bytes | mmap.mmap = b""
+        if input_stat.st_size:
+            data = stack.enter_context(
+                mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+        with timed("split scan"):
+            units = plan_split(data, depth)
+            if store:
+                chunk_units = units if depth == "section" else plan_split(data, "section")
+                chunk_starts = [unit.start for unit in chunk_units]
+        workers = jobs or min(32, (os.cpu_count() or 1) + 4)
+        batches = _batch_split_units(units, workers * 4)
+        chunk_store = ChunkStore(output_dir)
+        with timed("write"), ThreadPoolExecutor(max_workers=workers) as pool:
+            baseline = pool.submit(_digest_range, data, 0, len(data))
+            if store:
+                futures = [
+                    pool.submit(
+                        _store_split_units, data, batch, chunk_starts, chunk_store, token_model
+                    )
+                    for batch in batches
+                ]
+            else:
+                futures = [
+                    pool.submit(_write_split_units, data, batch, output_dir, token_model)
+                    for batch in batches
+                ]
+            files = {}
+            chunks = {}
+            baseline_counter = token_model.counter()
+            for batch, future in zip(batches, futures):
+                for unit, (metadata, counter, unit_chunks) in zip(batch, future.result()):
+                    files[unit.name] = metadata.as_dict()
+                    baseline_counter.merge(counter)
+                    if unit_chunks is not None:
+                        chunks[unit.name] = unit_chunks
+            baseline_digest = baseline.result()
+
+    # Files start at line starts, so their line and token counts add up to the
+    # baseline's.
+    files[input_path.name] = FileMetadata(
+        lines=sum(entry["lines"] for entry in files.values()),
+        bytes=input_stat.st_size,
+        blake2b=baseline_digest,
+        mtime_ns=input_stat.st_mtime_ns,
+        chars=baseline_counter.chars,
+        tokens=baseline_counter.tokens,
+        token_counts=baseline_counter.token_counts,
+    ).as_dict()
+
+    manifest = [unit.name for unit in units]
+    with timed("manifest write"):
+        manifest_data: dict[str, object] = {
+            "parts": manifest,
+            "baseline_file": input_path.name,
+            "depth": depth,
+            "token_model": token_model.name,
+            "hierarchy": split_hierarchy(units),
+            "files": files,
+        }
+        if store:
+            manifest_data["version"] = baseline_digest
+            manifest_data["chunks"] = chunks
+        manifest_text = yaml_block_dump(manifest_data)
+        write_text_if_changed(output_dir / DEFAULT_PARTS_MANIFEST, manifest_text)
+        if store:
+            version_path = chunk_store.version_path(baseline_digest)
+            try:
+                version_path.parent.mkdir(parents=True, exist_ok=True)
+            except OSError as exc:
+                raise RuntimeError(
+                    f"Failed to write output directory: {version_path.parent}"
+                ) from exc
+            write_text_if_changed(version_path, manifest_text)
+    written = chunk_store.bytes_written if store else input_stat.st_size
+    count_io(input_stat.st_size, written + len(manifest_text.encode("utf-8")))
+    if not store:
+        remove_stale_split_files(output_dir, set(manifest))
+
+    return manifest
+
+
+def remove_stale_split_files(output_dir: Path, names: set[str]) -> None:
+    """Delete split files, and their index sidecars, that are not in ``names``.
+
+    A split at another depth leaves files such as ``FPF-Sec-B.5.md`` behind;
+    assembling from them would mix two splits.
+    """
+    for pattern in ("FPF-Part-*.md", "FPF-Sec-*.md"):
+        for path in output_dir.glob(pattern):
+            if path.name in names:
+                continue
+            for stale_path in (path, section_index_path(path)):
+                try:
+                    stale_path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as exc:
+                    raise RuntimeError(f"Failed to remove stale split file: {stale_path}") from exc
+
+
+_parts_manifests: dict[Path, tuple[tuple[int, int], dict[str, object]]] = {}
+
+
+def read_parts_manifest(manifest_path: Path) -> dict[str, object] | None:
+    """The parsed parts manifest, or None if there is none.
+
+    Manifests of deep splits are large and read by every assemble, so the
+    parsed data is kept until the file's size or mtime changes.
+    """
+    try:
+        stat = manifest_path.stat()
+    except OSError:
+        return None
+    version = (stat.st_size, stat.st_mtime_ns)
+    cached = _parts_manifests.get(manifest_path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    data = load_yaml_manifest(manifest_path, "Parts manifest")
+    _parts_manifests[manifest_path] = (version, data)
+    return data
+
+
+def split_expansions(hierarchy: object) -> dict[str, tuple[str, ...]]:
+    """Map each split file to itself followed by every file nested under it.
+
+    After ``split --depth chapter`` a Part file holds only the Part's own
+    introduction; the expansion of ``FPF-Part-B.md`` lists the chapter files
+    that complete it, in spec order.
+    """
+    expansions: dict[str, tuple[str, ...]] = {}
+
+    def visit(node: object) -> list[str]:
+        if not isinstance(node, dict) or not isinstance(node.get("file"), str):
+            return []
+        files = [node["file"]]
+        children = node.get("children")
+        for child in children if isinstance(children, list) else []:
+            files.extend(visit(child))
+        expansions[node["file"]] = tuple(files)
+        return files
+
+    for root in hierarchy if isinstance(hierarchy, list) else []:
+        visit(root)
+    return expansions
+
+
+def load_parts_metadata(
+    work_dir: Path, token_model: TokenModel = HEURISTIC_TOKEN_MODEL
+) -> dict[str, FileMetadata]:
+    """Read per-file metadata recorded by split; missing or broken data yields {}.
+
+    Char and token counts are dropped when split used another token model.
+    """
+    try:
+        data = read_parts_manifest(work_dir / DEFAULT_PARTS_MANIFEST)
+        if data is None:
+            return {}
+        files = data.get("files")
+        if not isinstance(files, dict):
+            return {}
+        metadata = {name: FileMetadata(**values) for name, values in files.items()}
+    except (RuntimeError, TypeError):
+        return {}
+    if data.get("token_model") != token_model.name:
+        metadata = {
+            name: replace(entry, chars=None, tokens=None, token_counts=None)
+            for name, entry in metadata.items()
+        }
+    return metadata
+
+
+@dataclass(frozen=True)
+class StoredVersion:
+    """A split written by ``split --store``: its manifest and the chunks of each file."""
+
+    store: ChunkStore
+    manifest_path: Path
+    chunks: dict[str, tuple[str, ...]]
+    metadata: dict[str, FileMetadata]
+    token_model: str | None = None
+
+    def read(self, name: str) -> bytes:
+        return self.store.read(self.chunks[name])
+
+    def text_size(self, name: str, token_model: TokenModel) -> TextSize | None:
+        """Recorded size of ``name``; chunks never change, so no stat is needed."""
+        entry = self.metadata.get(name)
+        if entry is None or self.token_model != token_model.name:
+            return None
+        return entry.text_size()
+
+
+def load_stored_version(work_dir: Path, version: str | None = None) -> StoredVersion | None:
+    """The stored split named by ``version`` (a digest prefix) in the work dir's store.
+
+    Without ``version`` this is the current parts manifest, or None if it was
+    not written by ``split --store``.
+    """
+    store = ChunkStore(work_dir)
+    if version is None:
+        manifest_path = work_dir / DEFAULT_PARTS_MANIFEST
+        if not manifest_path.exists():
+            return None
+    else:
+        manifest_path = store.find_version(version)
+    data = read_parts_manifest(manifest_path)
+    if data is None:
+        raise RuntimeError(f"Parts manifest file not found: {manifest_path}")
+    chunks = data.get("chunks")
+    if chunks is None and version is None:
+        return None
+    if not isinstance(chunks, dict) or not all(
+        isinstance(name, str)
+        and isinstance(digests, list)
+        and all(isinstance(digest, str) for digest in digests)
+        for name, digests in chunks.items()
+    ):
+        raise RuntimeError(f"Invalid chunks entry in parts manifest: {manifest_path}")
+    try:
+        metadata = {
+            name: FileMetadata(**values) for name, values in (data.get("files") or {}).items()
+        }
+    except (AttributeError, TypeError):
+        metadata = {}
+    return StoredVersion(
+        store=store,
+        manifest_path=manifest_path,
+        chunks={name: tuple(digests) for name, digests in chunks.items()},
+        metadata=metadata,
+        token_model=data.get("token_model"),
+    )
+
+
+def known_file_metadata(path: Path, metadata: dict[str, FileMetadata]) -> FileMetadata | None:
+    """Split metadata for ``path`` if the file still has the recorded size and mtime."""
+    entry = metadata.get(path.name)
+    if entry is None:
+        return None
+    try:
+        if entry.matches(path.stat()):
+            return entry
+    except OSError:
+        pass
+    return None
+
+
+def known_text_size(path: Path, metadata: dict[str, FileMetadata]) -> TextSize | None:
+    entry = known_file_metadata(path, metadata)
+    return None if entry is None else entry.text_size()
+
+
+@dataclass(frozen=True)
+class SectionEntry:
+    level: int
+    section_id: str | None
+    title: str
+    offset: int
+    length: int
+    line: int
+    # Digest of the section's own text: its heading line up to the next heading.
+    digest: str = ""
+
+
+@dataclass(frozen=True)
+class SectionIndex:
+    source_size: int
+    source_mtime_ns: int
+    source_digest: str
+    sections: tuple[SectionEntry, ...]
+    lead_digest: str = ""
+
+    def find(self, section_id: str) -> SectionEntry | None:
+        wanted = section_id[:1].upper() + section_id[1:]
+        for entry in self.sections:
+            if entry.section_id == wanted:
+                return entry
+        return None
+
+    def segments(self) -> list[tuple[int, int, str]]:
+        """``(start, end, digest)`` of the text before the first heading and of
+        every section's own text, in file order; together they cover the file."""
+        starts = [entry.offset for entry in self.sections]
+        ends = [*starts, self.source_size]
+        segments = [(0, ends[0], self.lead_digest)]
+        for position, entry in enumerate(self.sections):
+            segments.append((entry.offset, ends[position + 1], entry.digest))
+        return segments
+
+    def segment_digests(self, ranges: list[tuple[int, int]]) -> list[str]:
+        """Digests of the segments that start inside the sorted ``ranges``.
+
+        Section ranges start and end at headings, so these segments make up
+        exactly the text the ranges select.
+        """
+        digests = []
+        position = 0
+        for start, _, digest in self.segments():
+            while position < len(ranges) and ranges[position][1] <= start:
+                position += 1
+            if position < len(ranges) and ranges[position][0] <= start:
+                digests.append(digest)
+        return digests
+
+
+def new_digest():
+    return hashlib.blake2b(digest_size=32)
+
+
+def new_digest_of(data: bytes) -> str:
+    digest = new_digest()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def section_index_path(spec_path: Path) -> Path:
+    return spec_path.with_name(spec_path.name + INDEX_SUFFIX)
+
+
+def _index_lines(lines: Iterable[bytes], mtime_ns: int) -> SectionIndex:
+    digest = new_digest()
+    section_digest = new_digest()
+    lead_digest = None
+    entries = []
+    open_entries = []
+    offset = 0
+    line_number = 0
+
+    for line in lines:
+        line_number += 1
+        digest.update(line)
+        if line.startswith(b"#"):
+            match = HEADER_PATTERN.match(line.decode("utf-8", errors="replace"))
+            if match:
+                level = len(match.group(1))
+                while open_entries and entries[open_entries[-1]][0] >= level:
+                    position = open_entries.pop()
+                    entries[position][4] = offset - entries[position][3]
+                if entries:
+                    entries[-1][6] = section_digest.hexdigest()
+                else:
+                    lead_digest = section_digest.hexdigest()
+                section_digest = new_digest()
+                title = match.group(2).strip()
+                entries.append(
+                    [level, parse_section_id(title), title, offset, 0, line_number, ""]
+                )
+                open_entries.append(len(entries) - 1)
+        section_digest.update(line)
+        offset += len(line)
+
+    for position in open_entries:
+        entries[position][4] = offset - entries[position][3]
+    if entries:
+        entries[-1][6] = section_digest.hexdigest()
+    else:
+        lead_digest = section_digest.hexdigest()
+
+    return SectionIndex(
+        source_size=offset,
+        source_mtime_ns=mtime_ns,
+        source_digest=digest.hexdigest(),
+        sections=tuple(SectionEntry(*entry) for entry in entries),
+        lead_digest=lead_digest,
+    )
+
+
+def build_section_index(spec_path: Path) -> SectionIndex:
+    try:
+        input_file = spec_path.open("rb")
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Input file not found: {spec_path}") from exc
+
+    with input_file:
+        return _index_lines(input_file, os.fstat(input_file.fileno()).st_mtime_ns)
+
+
+def section_index_of(data: bytes) -> SectionIndex:
+    """Heading index of in-memory text, such as a part read from the chunk store."""
+    return _index_lines(io.BytesIO(data), 0)
+
+
+def file_digest(path: Path) -> str:
+    digest = new_digest()
+    with path.open("rb") as handle:
+        while chunk := handle.read(COPY_BUFFER_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_index_sidecar(index_path: Path) -> SectionIndex | None:
+    try:
+        data = json.loads(index_path.read_text(encoding="utf-8"))
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return SectionIndex(
+            source_size=data["size"],
+            source_mtime_ns=data["mtime_ns"],
+            source_digest=data["blake2b"],
+            sections=tuple(SectionEntry(*entry) for entry in data["sections"]),
+            lead_digest=data["lead"],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_section_index(index: SectionIndex, index_path: Path) -> None:
+    data = {
+        "version": INDEX_VERSION,
+        "size": index.source_size,
+        "mtime_ns": index.source_mtime_ns,
+        "blake2b": index.source_digest,
+        "lead": index.lead_digest,
+        "sections": [
+            [
+                entry.level,
+                entry.section_id,
+                entry.title,
+                entry.offset,
+                entry.length,
+                entry.line,
+                entry.digest,
+            ]
+            for entry in index.sections
+        ],
+    }
+    write_text_if_changed(index_path, json.dumps(data, ensure_ascii=False))
+
+
+def load_section_index(spec_path: Path, rebuild: bool = False) -> SectionIndex:
+    """Return the heading index of a spec, reusing its sidecar when still valid.
+
+    The sidecar is trusted when size and mtime match. If only the mtime moved,
+    the content hash decides whether the stored offsets can be kept.
+    """
+    try:
+        stat = spec_path.stat()
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Input file not found: {spec_path}") from exc
+
+    index_path = section_index_path(spec_path)
+    cached = None if rebuild else _read_index_sidecar(index_path)
+    if cached is not None and cached.source_size == stat.st_size:
+        if cached.source_mtime_ns == stat.st_mtime_ns:
+            return cached
+        if file_digest(spec_path) == cached.source_digest:
+            index = replace(cached, source_mtime_ns=stat.st_mtime_ns)
+            save_section_index(index, index_path)
+            return index
+
+    index = build_section_index(spec_path)
+    save_section_index(index, index_path)
+    return index
+
+
+def read_section(spec_path: Path, section_id: str) -> bytes:
+    entry = load_section_index(spec_path).find(section_id)
+    if entry is None:
+        raise RuntimeError(f"Section not found: {section_id}")
+    try:
+        with spec_path.open("rb") as handle:
+            handle.seek(entry.offset)
+            return handle.read(entry.length)
+    except OSError as exc:
+        raise RuntimeError(f"Failed to read input file: {spec_path}") from exc
+
+
+SPEC_LEAD_KEY = "(preface)"
+
+
+@dataclass(frozen=True)
+class SectionChange:
+    """A section that differs between two revisions of the spec.
+
+    ``offset`` and ``length`` locate the section's own text in the new
+    revision; they are 0 for removed sections.
+    """
+
+    status: str  # "added", "changed" or "removed"
+    key: str
+    title: str
+    offset: int = 0
+    length: int = 0
+
+
+def section_keys(index: SectionIndex) -> list[str]:
+    """Names that pair up the sections of two revisions.
+
+    A section with an id is named by it. Others, such as the ``Problem`` and
+    ``Solution`` headings repeated in every pattern, are named by the nearest
+    enclosing id and their title. Repeated names get a ``#<n>`` suffix.
+    """
+    keys = []
+    seen: dict[str, int] = {}
+    anchors: list[tuple[int, str | None]] = []
+    for entry in index.sections:
+        while anchors and anchors[-1][0] >= entry.level:
+            anchors.pop()
+        anchor = next((key for _, key in reversed(anchors) if key is not None), "")
+        anchors.append((entry.level, entry.section_id))
+        key = entry.section_id or f"{anchor}/{normalize_text(entry.title)}"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+def diff_section_indexes(old: SectionIndex, new: SectionIndex) -> list[SectionChange]:
+    """Compare two revisions section by section through their own-text digests.
+
+    Added and changed sections come in the new revision's order, removed ones
+    after them in the old revision's order. Moving a section is not a change.
+    """
+    segments = new.segments()
+    changes = []
+    if old.lead_digest != new.lead_digest:
+        _, end, _ = segments[0]
+        changes.append(SectionChange("changed", SPEC_LEAD_KEY, SPEC_LEAD_KEY, 0, end))
+    old_entries = dict(zip(section_keys(old), old.sections))
+    for key, entry, (start, end, digest) in zip(section_keys(new), new.sections, segments[1:]):
+        previous = old_entries.pop(key, None)
+        if previous is None:
+            changes.append(SectionChange("added", key, entry.title, start, end - start))
+        elif previous.digest != digest:
+            changes.append(SectionChange("changed", key, entry.title, start, end - start))
+    for key, entry in old_entries.items():
+        changes.append(SectionChange("removed", key, entry.title))
+    return changes
+
+
+def diff_sections(old_path: Path, new_path: Path) -> list[SectionChange]:
+    return diff_section_indexes(load_section_index(old_path), load_section_index(new_path))
+
+
+def write_section_delta(
+    spec_path: Path, changes: list[SectionChange], output_path: Path, old_name: str
+) -> None:
+    """Write the added and changed sections of ``spec_path`` after a summary.
+
+    Only each section's own text is copied, so a changed subsection does not
+    drag its parent chapter along. Removed sections are listed by title.
+    """
+    counts = change_counts(changes)
+    lines = [
+        f"# FPF delta: {old_name} -> {spec_path.name}\n",
+        "\n",
+        f"Added: {counts['added']}, changed: {counts['changed']}, "
+        f"removed: {counts['removed']} sections.\n",
+        "\n",
+    ]
+    removed = [change for change in changes if change.status == "removed"]
+    if removed:
+        lines.append("Removed sections:\n")
+        lines.extend(f"- {change.title}\n" for change in removed)
+        lines.append("\n")
+    try:
+        with spec_path.open("rb") as spec_file:
+            for change in changes:
+                if change.status == "removed":
+                    continue
+                spec_file.seek(change.offset)
+                text = spec_file.read(change.length).decode("utf-8", "replace")
+                lines.append(text if text.endswith("\n") else text + "\n")
+    except OSError as exc:
+        raise RuntimeError(f"Failed to read input file: {spec_path}") from exc
+    write_text_if_changed(output_path, "".join(lines))
+
+
+def change_counts(changes: list[SectionChange]) -> dict[str, int]:
+    counts = {status: 0 for status in ("added", "changed", "removed")}
+    for change in changes:
+        counts[change.status] += 1
+    return counts
+
+
+def print_section_changes(changes: list[SectionChange]) -> None:
+    symbols = {"added": "+", "changed": "~", "removed": "-"}
+    for change in changes:
+        print(f"{symbols[change.status]} {change.key}\t{change.title}")
+    counts = change_counts(changes)
+    print(
+        f"Added {counts['added']}, changed {counts['changed']}, "
+        f"removed {counts['removed']} sections"
+    )
+
+
+def write_stdout_bytes(data: bytes) -> None:
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        sys.stdout.write(data.decode("utf-8"))
+        return
+    sys.stdout.flush()
+    buffer.write(data)
+    buffer.flush()
+
+
+def resolve_workdir_path(work_dir: Path, value: str, label: str) -> Path:
+    path = Path(value)
+    if value in {".", ".."} or path.is_absolute() or path.name != value:
+        raise RuntimeError(f"{label} must be a filename: {value}")
+    return (work_dir / path).resolve(strict=False)
+
+
+def resolve_profile_path(profile_value: str, profiles_dir: Path) -> Path:
+    path = Path(profile_value)
+    if path.is_absolute() or path.name != profile_value:
+        return path
+    if path.suffix:
+        return profiles_dir / path
+    return profiles_dir / f"{profile_value}.yaml"
+
+
+def yaml_safe_load(text: str) -> object:
+    """``yaml.safe_load`` through libyaml when PyYAML was built with it."""
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def yaml_safe_dump(data: object, **kwargs) -> str:
+    """``yaml.safe_dump`` through libyaml when PyYAML was built with it."""
+    import yaml
+
+    return yaml.dump(data, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper), **kwargs)
+
+
+_YAML_PLAIN_PATTERN = re.compile(r"[A-Za-z](?:[\w.\-()/,'&+ ]*[\w.\-()/,'&+])?", re.ASCII)
+_YAML_RESERVED_WORDS = {"y", "n", "yes", "no", "on", "off", "true", "false", "null"}
+
+
+def _yaml_scalar(value: object) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if _YAML_PLAIN_PATTERN.fullmatch(value) and value.lower() not in _YAML_RESERVED_WORDS:
+        return value
+    if max(value, default="") <= "\uffff":
+        # JSON string escapes are a subset of YAML double-quoted ones, except
+        # for the surrogate pairs JSON uses beyond the BMP.
+        return json.dumps(value)
+    return yaml_safe_dump(value, default_style='"', width=2**31 - 1).rstrip("\n")
+
+
+def _emit_yaml_block(value: object, indent: str, lines: list[str]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            prefix = f"{indent}{_yaml_scalar(key)}:"
+            if isinstance(item, dict) and item:
+                lines.append(prefix)
+                _emit_yaml_block(item, indent + "  ", lines)
+            elif isinstance(item, list) and item:
+                lines.append(prefix)
+                _emit_yaml_block(item, indent, lines)
+            elif isinstance(item, (dict, list)):
+                lines.append(f"{prefix} {'{}' if isinstance(item, dict) else '[]'}")
+            else:
+                lines.append(f"{prefix} {_yaml_scalar(item)}")
+        return
+    for item in value:
+        if isinstance(item, (dict, list)) and item:
+            start = len(lines)
+            _emit_yaml_block(item, indent + "  ", lines)
+            lines[start] = f"{indent}- {lines[start][len(indent) + 2 :]}"
+        elif isinstance(item, (dict, list)):
+            lines.append(f"{indent}- {'{}' if isinstance(item, dict) else '[]'}")
+        else:
+            lines.append(f"{indent}- {_yaml_scalar(item)}")
+
+
+def yaml_block_dump(data: dict[str, object]) -> str:
+    """Block-style YAML for large manifests of dicts, lists, strings and ints.
+
+    Equivalent to ``yaml_safe_dump(data, sort_keys=False)`` when loaded back,
+    but PyYAML represents every node in Python even with libyaml, which takes
+    seconds for a split into thousands of files.
+    """
+    lines: list[str] = []
+    _emit_yaml_block(data, "", lines)
+    return "\n".join(lines) + "\n"
+
+
+def load_yaml_manifest(manifest_path: Path, kind: str = "Manifest") -> dict[str, object]:
+    import yaml
+
+    with timed("manifest load"):
+        try:
+            text = manifest_path.read_text(encoding="utf-8")
+        except FileNotFoundError as exc:
+            raise RuntimeError(f"{kind} file not found: {manifest_path}") from exc
+        except OSError as exc:
+            raise RuntimeError(f"Failed to read {kind.lower()}: {manifest_path}") from exc
+
+        try:
+            data = yaml_safe_load(text)
+        except yaml.YAMLError as exc:
+            raise RuntimeError(f"Failed to parse {kind.lower()}: {manifest_path}") from exc
+
+    if not isinstance(data, dict):
+        raise RuntimeError(f"{kind} must be a mapping: {manifest_path}")
+
+    return data
+
+
+def measure_file(path: Path, token_model: TokenModel = HEURISTIC_TOKEN_MODEL) -> TextSize:
+    try:
+        with path.open("rb", buffering=0) as handle:
+            buffer = bytearray(COPY_BUFFER_SIZE)
+            counter = token_model.counter()
+            lines = 0
+            last = b"\n"
+            while size := handle.readinto(buffer):
+                lines += buffer.count(b"\n", 0, size)
+                counter.feed(buffer[:size])
+                last = buffer[size - 1 : size]
+            return TextSize(
+                lines=lines if last == b"\n" else lines + 1,
+                bytes=counter.bytes,
+                chars=counter.chars,
+                tokens=counter.tokens,
+            )
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Part file not found: {path}") from exc
+    except OSError as exc:
+        raise RuntimeError(f"Failed to read part file: {path}") from exc
+
+
+def open_part_files(
+    part_paths: list[Path], stack: ExitStack, stored: StoredVersion | None = None
+) -> list:
+    """Open every part for reading; parts of ``stored`` are read into memory instead."""
+    part_files = []
+    for part_path in part_paths:
+        if stored is not None and part_path.name in stored.chunks:
+            part_files.append(stored.read(part_path.name))
+            continue
+        try:
+            part_files.append(stack.enter_context(part_path.open("rb", buffering=0)))
+        except FileNotFoundError as exc:
+            raise RuntimeError(f"Part file not found: {part_path}") from exc
+        except OSError as exc:
+            raise RuntimeError(f"Failed to read part file: {part_path}") from exc
+    return part_files
+
+
+def section_matches(section_id: str | None, selectors: list[str]) -> bool:
+    if section_id is None:
+        return False
+    for selector in selectors:
+        if section_id == selector or section_id.startswith((f"{selector}.", f"{selector}:")):
+            return True
+    return False
+
+
+def select_section_ranges(
+    index: SectionIndex,
+    include: list[str] | None,
+    exclude: list[str] | None,
+    removed_counts: dict[str, int] | None = None,
+) -> list[tuple[int, int]]:
+    """Resolve include/exclude selectors to sorted, merged byte ranges of a file.
+
+    Excluded sections that actually cut into the kept ranges are tallied in
+    ``removed_counts`` under the first selector that matched them.
+    """
+    if include is None:
+        ranges = [(0, index.source_size)]
+    else:
+        ranges = merge_ranges(
+            (entry.offset, entry.offset + entry.length)
+            for entry in index.sections
+            if section_matches(entry.section_id, include)
+        )
+
+    for entry in index.sections:
+        if not exclude or not section_matches(entry.section_id, exclude):
+            continue
+        start, end = entry.offset, entry.offset + entry.length
+        if removed_counts is not None and any(
+            range_start < end and range_end > start for range_start, range_end in ranges
+        ):
+            selector = next(item for item in exclude if section_matches(entry.section_id, [item]))
+            removed_counts[selector] = removed_counts.get(selector, 0) + 1
+        ranges = subtract_range(ranges, start, end)
+    return ranges
+
+
+def subtract_range(
+    ranges: list[tuple[int, int]], start: int, end: int
+) -> list[tuple[int, int]]:
+    kept = []
+    for range_start, range_end in ranges:
+        if range_end <= start or range_start >= end:
+            kept.append((range_start, range_end))
+            continue
+        if range_start < start:
+            kept.append((range_start, start))
+        if range_end > end:
+            kept.append((end, range_end))
+    return kept
+
+
+def intersect_range(
+    ranges: list[tuple[int, int]], start: int, end: int
+) -> list[tuple[int, int]]:
+    return [
+        (max(range_start, start), min(range_end, end))
+        for range_start, range_end in ranges
+        if range_start < end and range_end > start
+    ]
+
+
+def merge_ranges(ranges) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, offset: int, length: int) -> int:
+    """Copy bytes inside the kernel; returns how many were copied before giving up."""
+    copied = 0
+    for name in ("copy_file_range", "sendfile"):
+        kernel_copy = getattr(os, name, None)
+        if kernel_copy is None:
+            continue
+        try:
+            while copied < length:
+                if name == "copy_file_range":
+                    sent = kernel_copy(src_fd, dst_fd, length - copied, offset + copied)
+                else:
+                    sent = kernel_copy(dst_fd, src_fd, offset + copied, length - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return copied
+        except OSError as exc:
+            if exc.errno not in KERNEL_COPY_FALLBACK_ERRNOS:
+                raise
+    return copied
+
+
+def _read_at(fd: int, buffer: bytearray, offset: int) -> int:
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [buffer], offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.readv(fd, [buffer])
+
+
+def _write_all(fd: int, view: memoryview) -> None:
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def copy_block(
+    src_fd: int,
+    dst_fd: int,
+    offset: int,
+    length: int,
+    buffer: bytearray,
+    count_lines: bool,
+    counter=None,
+) -> int:
+    """Append ``length`` bytes of ``src_fd`` at ``offset`` to ``dst_fd``.
+
+    Without line counting the copy goes through copy_file_range/sendfile and
+    never enters Python; otherwise it falls back to ``readinto`` over a large
+    reusable buffer and counts newlines on that buffer, also feeding the
+    optional token ``counter``. Returns the line count (a trailing
+    unterminated line counts as one) or 0 when not counting.
+    """
+    count_lines = count_lines or counter is not None
+    copied = 0 if count_lines else _kernel_copy(src_fd, dst_fd, offset, length)
+    lines = 0
+    last = b"\n"
+    view = memoryview(buffer)
+    while copied < length:
+        size = _read_at(src_fd, buffer, offset + copied)
+        size = min(size, length - copied)
+        if size <= 0:
+            break
+        _write_all(dst_fd, view[:size])
+        if count_lines:
+            lines += buffer.count(b"\n", 0, size)
+            last = buffer[size - 1 : size]
+        if counter is not None:
+            counter.feed(buffer[:size])
+        copied += size
+    if count_lines and length and last != b"\n":
+        lines += 1
+    return lines
+
+
+def _manifest_selectors(
+    data: dict[str, object], key: str, manifest_path: Path
+) -> list[str] | None:
+    value = data.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise RuntimeError(f"Invalid {key} entry in manifest: {manifest_path}")
+    return [item[:1].upper() + item[1:] for item in value]
+
+
+@dataclass(frozen=True)
+class AssemblyPlan:
+    manifest_path: Path
+    output_path: Path
+    part_paths: tuple[Path, ...]
+    include_sections: list[str] | None
+    exclude_sections: list[str] | None
+    baseline_value: object
+    max_tokens: int | None = None
+    must_keep: list[str] | None = None
+    section_priorities: dict[str, float] | None = None
+    stored: StoredVersion | None = None
+    # The manifest entry each part path comes from, when a deeper split
+    # expanded one entry into several files.
+    listed_names: tuple[str, ...] = ()
+    split_depth: str = "part"
+
+    @property
+    def filters_sections(self) -> bool:
+        return self.include_sections is not None or bool(self.exclude_sections)
+
+    @property
+    def uses_section_index(self) -> bool:
+        return self.filters_sections or self.max_tokens is not None
+
+    def is_stored(self, part_path: Path) -> bool:
+        return self.stored is not None and part_path.name in self.stored.chunks
+
+    def listed_name(self, part_index: int) -> str:
+        if self.listed_names:
+            return self.listed_names[part_index]
+        return self.part_paths[part_index].name
+
+
+def _manifest_max_tokens(data: dict[str, object], manifest_path: Path) -> int | None:
+    value = data.get("max_tokens")
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise RuntimeError(f"Invalid max_tokens entry in manifest: {manifest_path}")
+    return value
+
+
+def _manifest_priorities(
+    data: dict[str, object], manifest_path: Path
+) -> dict[str, float] | None:
+    value = data.get("section_priorities")
+    if value is None:
+        return None
+    if not isinstance(value, dict) or not all(
+        isinstance(key, str)
+        and key
+        and isinstance(priority, (int, float))
+        and not isinstance(priority, bool)
+        and priority >= 0
+        for key, priority in value.items()
+    ):
+        raise RuntimeError(f"Invalid section_priorities entry in manifest: {manifest_path}")
+    return {key[:1].upper() + key[1:]: float(priority) for key, priority in value.items()}
+
+
+def plan_assembly(manifest_path: Path, work_dir: Path) -> AssemblyPlan:
+    data = load_yaml_manifest(manifest_path)
+    with timed("validate"):
+        output_value = data.get("output_file")
+        parts_value = data.get("parts")
+
+        if not isinstance(output_value, str) or not output_value:
+            raise RuntimeError(
+                f"Manifest file {manifest_path} is missing required field: output_file"
+            )
+        if not isinstance(parts_value, list):
+            raise RuntimeError(
+                f"Manifest file {manifest_path} is missing required field: parts"
+            )
+
+        output_path = resolve_workdir_path(work_dir, output_value, "Output file")
+        for raw in parts_value:
+            if not isinstance(raw, str) or not raw:
+                raise RuntimeError(f"Invalid part entry in manifest: {manifest_path}")
+            resolve_workdir_path(work_dir, raw, "Part filename")
+
+        # Parts come from the chunk store when the manifest pins a stored
+        # version, or when the current split was made with ``split --store``
+        # (part files from an earlier plain split may still be around).
+        version = data.get("version")
+        if version is not None and (not isinstance(version, str) or not version):
+            raise RuntimeError(f"Invalid version entry in manifest: {manifest_path}")
+        stored = None
+        if version is not None:
+            stored = load_stored_version(work_dir, version)
+
+        # An entry names a split file and everything the split nested under it.
+        split_path = stored.manifest_path if stored else work_dir / DEFAULT_PARTS_MANIFEST
+        split_data = read_parts_manifest(split_path) or {}
+        expansions = split_expansions(split_data.get("hierarchy"))
+        split_depth = split_data.get("depth")
+        if split_depth not in SPLIT_DEPTHS:
+            split_depth = "part"
+        part_paths = []
+        listed_names = []
+        seen = set()
+        for raw in parts_value:
+            for name in expansions.get(raw, (raw,)):
+                if name in seen:
+                    continue
+                seen.add(name)
+                part_paths.append(resolve_workdir_path(work_dir, name, "Part filename"))
+                listed_names.append(raw)
+        if stored is None:
+            stored = load_stored_version(work_dir)
+
+        return AssemblyPlan(
+            manifest_path=manifest_path,
+            output_path=output_path,
+            part_paths=tuple(part_paths),
+            include_sections=_manifest_selectors(data, "include_sections", manifest_path),
+            exclude_sections=_manifest_selectors(data, "exclude_sections", manifest_path),
+            baseline_value=data.get("baseline_file"),
+            max_tokens=_manifest_max_tokens(data, manifest_path),
+            must_keep=_manifest_selectors(data, "must_keep", manifest_path),
+            section_priorities=_manifest_priorities(data, manifest_path),
+            stored=stored,
+            listed_names=tuple(listed_names),
+            split_depth=split_depth,
+        )
+
+
+@dataclass(frozen=True)
+class BudgetUnit:
+    part_index: int
+    label: str
+    ranges: tuple[tuple[int, int], ...]
+    tokens: int
+    value: float
+    required: bool
+
+
+@dataclass(frozen=True)
+class BudgetSelection:
+    part_ranges: list[list[tuple[int, int]]]
+    max_tokens: int
+    tokens: int
+    dropped: tuple[BudgetUnit, ...]
+
+
+def _unit_priority(
+    section_id: str | None, part_name: str, priorities: dict[str, float] | None
+) -> float:
+    """Priority of the most specific matching selector (or part filename); 1.0 by default."""
+    if not priorities:
+        return 1.0
+    if part_name in priorities:
+        priority = priorities[part_name]
+    else:
+        priority = 1.0
+    matched = [
+        selector for selector in priorities if section_matches(section_id, [selector])
+    ]
+    if matched:
+        priority = priorities[max(matched, key=len)]
+    return priority
+
+
+def _unit_required(section_id: str | None, part_name: str, must_keep: list[str] | None) -> bool:
+    if not must_keep:
+        return False
+    if part_name in must_keep or section_matches(section_id, must_keep):
+        return True
+    # A kept subsection pins the whole chapter, which is the smallest unit.
+    return section_id is not None and any(
+        section_matches(selector, [section_id]) for selector in must_keep
+    )
+
+
+def budget_units(
+    plan: AssemblyPlan,
+    part_index: int,
+    data,
+    index: SectionIndex,
+    kept_ranges: list[tuple[int, int]],
+    token_model: TokenModel,
+) -> list[BudgetUnit]:
+    """Split a part into chapter-level units (``X.N`` sections) for budget packing.
+
+    Text outside any chapter (part heading, introductions) forms a required
+    frame unit; a part without chapters is a single unit.
+    """
+    part_name = plan.part_paths[part_index].name
+    # Selectors name the part as the manifest lists it, even when a deeper
+    # split expanded that entry into several files.
+    listed_name = plan.listed_name(part_index)
+    chapters: list[SectionEntry] = []
+    for entry in index.sections:
+        if entry.section_id is None or not CHAPTER_ID_PATTERN.match(entry.section_id):
+            continue
+        if chapters and entry.offset < chapters[-1].offset + chapters[-1].length:
+            continue
+        chapters.append(entry)
+
+    spans: list[tuple[str | None, str, list[tuple[int, int]], bool]] = []
+    if not chapters:
+        spans.append((None, part_name, kept_ranges, False))
+    else:
+        frame = kept_ranges
+        for entry in chapters:
+            frame = subtract_range(frame, entry.offset, entry.offset + entry.length)
+            ranges = intersect_range(kept_ranges, entry.offset, entry.offset + entry.length)
+            spans.append((entry.section_id, entry.title, ranges, False))
+        spans.insert(0, (None, part_name, frame, True))
+
+    units = []
+    for section_id, label, ranges, is_frame in spans:
+        if not ranges:
+            continue
+        counter = token_model.counter()
+        normative = 0
+        for start, end in ranges:
+            block = data[start:end]
+            counter.feed(block)
+            normative += len(NORMATIVE_PATTERN.findall(block))
+        tokens = counter.tokens
+        priority = _unit_priority(section_id, listed_name, plan.section_priorities)
+        units.append(
+            BudgetUnit(
+                part_index=part_index,
+                label=label,
+                ranges=tuple(ranges),
+                tokens=tokens,
+                value=priority * (tokens + NORMATIVE_KEYWORD_VALUE * normative),
+                required=is_frame or _unit_required(section_id, listed_name, plan.must_keep),
+            )
+        )
+    return units
+
+
+def choose_budget_units(units: list[BudgetUnit], max_tokens: int) -> set[int]:
+    """0/1 knapsack over unit token costs, maximising total unit value.
+
+    Costs are rounded up onto at most ``KNAPSACK_CELLS`` cells so large
+    budgets stay cheap; tokens lost to rounding are refilled greedily.
+    """
+    chosen = {position for position, unit in enumerate(units) if unit.required}
+    required_tokens = sum(units[position].tokens for position in chosen)
+    capacity = max_tokens - required_tokens
+    if capacity < 0:
+        raise RuntimeError(
+            f"Required sections need {required_tokens} tokens, over the budget of {max_tokens}"
+        )
+    optional = [
+        position
+        for position, unit in enumerate(units)
+        if not unit.required and unit.value > 0 and unit.tokens <= capacity
+    ]
+    scale = max(1, -(-capacity // KNAPSACK_CELLS))
+    cells = capacity // scale
+    best = [0.0] * (cells + 1)
+    taken = []
+    for position in optional:
+        weight = -(-units[position].tokens // scale)
+        value = units[position].value
+        take = bytearray(cells + 1)
+        for cell in range(cells, weight - 1, -1):
+            candidate = best[cell - weight] + value
+            if candidate > best[cell]:
+                best[cell] = candidate
+                take[cell] = 1
+        taken.append(take)
+
+    cell = cells
+    for position, take in zip(reversed(optional), reversed(taken)):
+        if take[cell]:
+            chosen.add(position)
+            cell -= -(-units[position].tokens // scale)
+
+    used = sum(units[position].tokens for position in chosen)
+    leftovers = sorted(
+        (position for position in optional if position not in chosen),
+        key=lambda position: units[position].value / max(units[position].tokens, 1),
+        reverse=True,
+    )
+    for position in leftovers:
+        if used + units[position].tokens <= max_tokens:
+            chosen.add(position)
+            used += units[position].tokens
+    return chosen
+
+
+def select_budget_ranges(
+    plan: AssemblyPlan,
+    part_data: list,
+    indexes: list[SectionIndex],
+    part_ranges: list[list[tuple[int, int]]] | None,
+    token_model: TokenModel,
+) -> BudgetSelection:
+    """Pick the highest-value chapters of all parts that fit ``plan.max_tokens``."""
+    units = []
+    for part_index, (data, index) in enumerate(zip(part_data, indexes)):
+        kept = [(0, len(data))] if part_ranges is None else part_ranges[part_index]
+        units.extend(budget_units(plan, part_index, data, index, kept, token_model))
+
+    chosen = choose_budget_units(units, plan.max_tokens)
+    # Per-unit estimates are rounded; make sure the joined text fits as well.
+    while True:
+        counter = token_model.counter()
+        for position in sorted(chosen):
+            for start, end in units[position].ranges:
+                counter.feed(part_data[units[position].part_index][start:end])
+        if counter.tokens <= plan.max_tokens:
+            break
+        optional = [position for position in chosen if not units[position].required]
+        if not optional:
+            break
+        chosen.discard(
+            min(
+                optional,
+                key=lambda position: units[position].value / max(units[position].tokens, 1),
+            )
+        )
+
+    selected: list[list[tuple[int, int]]] = [[] for _ in part_data]
+    for position in chosen:
+        selected[units[position].part_index].extend(units[position].ranges)
+    return BudgetSelection(
+        part_ranges=[merge_ranges(ranges) for ranges in selected],
+        max_tokens=plan.max_tokens,
+        tokens=counter.tokens,
+        dropped=tuple(unit for position, unit in enumerate(units) if position not in chosen),
+    )
+
+
+def assembly_stats(
+    plan: AssemblyPlan,
+    work_dir: Path,
+    output: TextSize,
+    removed_counts: dict[str, int],
+    metadata: dict[str, FileMetadata],
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    baseline_cache: dict[Path, TextSize] | None = None,
+) -> CompressionStats | None:
+    baseline_value = plan.baseline_value
+    if baseline_value is None:
+        print(
+            f"Warning: baseline_file missing in manifest: {plan.manifest_path}",
+            file=sys.stderr,
+        )
+        return None
+
+    if not isinstance(baseline_value, str) or not baseline_value:
+        raise RuntimeError(f"Invalid baseline_file entry: {plan.manifest_path}")
+
+    try:
+        baseline_path = resolve_workdir_path(work_dir, baseline_value, "Baseline file")
+        # A stored version keeps the size of the revision it was split from,
+        # which need not be the spec in the work dir any more.
+        stored_baseline = None
+        if plan.stored is not None:
+            stored_baseline = plan.stored.text_size(baseline_value, token_model)
+        if stored_baseline is not None:
+            baseline = stored_baseline
+        elif baseline_cache is not None and baseline_path in baseline_cache:
+            baseline = baseline_cache[baseline_path]
+        else:
+            baseline = known_text_size(baseline_path, metadata)
+            if baseline is None:
+                baseline = measure_file(baseline_path, token_model)
+            if baseline_cache is not None:
+                baseline_cache[baseline_path] = baseline
+    except RuntimeError as exc:
+        print(f"Warning: {exc}", file=sys.stderr)
+        return None
+
+    return CompressionStats(
+        removed_counts=removed_counts,
+        original_lines=baseline.lines,
+        new_lines=output.lines,
+        original_bytes=baseline.bytes,
+        new_bytes=output.bytes,
+        original_chars=baseline.chars,
+        new_chars=output.chars,
+        original_tokens=baseline.tokens,
+        new_tokens=output.tokens,
+        token_model=token_model.name,
+    )
+
+
+def assemble_fpf(
+    manifest_path: Path,
+    work_dir: Path,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    max_tokens: int | None = None,
+) -> tuple[Path, CompressionStats | None, BudgetReport | None]:
+    plan = plan_assembly(manifest_path, work_dir)
+    if max_tokens is not None:
+        plan = replace(plan, max_tokens=max_tokens)
+    output_path = plan.output_path
+    part_paths = plan.part_paths
+
+    staged_path = staging_path(output_path)
+    # Outputs are counted for their stats and for the budget report.
+    need_line_counts = plan.baseline_value is not None or plan.max_tokens is not None
+    metadata = load_parts_metadata(work_dir, token_model) if need_line_counts else {}
+    counter = token_model.counter() if need_line_counts else None
+    output_lines = 0
+    removed_counts: dict[str, int] = {}
+    with ExitStack() as stack:
+        with timed("read"):
+            part_files = open_part_files(part_paths, stack, plan.stored)
+            indexes = []
+            if plan.uses_section_index:
+                indexes = [
+                    section_index_of(part_file)
+                    if isinstance(part_file, bytes)
+                    else load_section_index(part_path)
+                    for part_path, part_file in zip(part_paths, part_files)
+                ]
+            part_data = None
+            if plan.max_tokens is not None:
+                part_data = [
+                    part_file if isinstance(part_file, bytes) else _map_part(part_path, stack)
+                    for part_path, part_file in zip(part_paths, part_files)
+                ]
+
+        part_ranges = None
+        budget = None
+        with timed("match"):
+            if plan.filters_sections:
+                part_ranges = [
+                    select_section_ranges(
+                        index, plan.include_sections, plan.exclude_sections, removed_counts
+                    )
+                    for index in indexes
+                ]
+            if part_data is not None:
+                budget = select_budget_ranges(plan, part_data, indexes, part_ranges, token_model)
+                part_ranges = budget.part_ranges
+
+        stack.enter_context(timed("write"))
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_file = stack.enter_context(staged_path.open("wb", buffering=0))
+        except OSError as exc:
+            raise RuntimeError(f"Failed to write output file: {output_path}") from exc
+        stack.callback(discard_output, staged_path)
+
+        buffer = bytearray(COPY_BUFFER_SIZE)
+        bytes_read = 0
+        for index, part_file in enumerate(part_files):
+            part_name = part_paths[index].name
+            in_memory = isinstance(part_file, bytes)
+            if in_memory:
+                part_size = len(part_file)
+            else:
+                part_stat = os.fstat(part_file.fileno())
+                part_size = part_stat.st_size
+            bytes_read += part_size
+            part_counter = counter
+            if part_ranges is None:
+                ranges = [(0, part_size)]
+                known = None
+                if need_line_counts and in_memory:
+                    known = plan.stored.text_size(part_name, token_model)
+                elif need_line_counts:
+                    part_metadata = metadata.get(part_name)
+                    if part_metadata and part_metadata.matches(part_stat):
+                        known = part_metadata.text_size()
+                # Recorded class counts merge unrounded into the output's estimate.
+                if known is not None and counter.add(known):
+                    output_lines += known.lines
+                    part_counter = None
+            else:
+                ranges = part_ranges[index]
+            try:
+                for start, end in ranges:
+                    if in_memory:
+                        with memoryview(part_file) as view:
+                            _write_all(output_file.fileno(), view[start:end])
+                        if part_counter is not None:
+                            output_lines += count_buffer_lines(part_file, start, end, part_counter)
+                        continue
+                    output_lines += copy_block(
+                        part_file.fileno(),
+                        output_file.fileno(),
+                        start,
+                        end - start,
+                        buffer,
+                        part_counter is not None,
+                        part_counter,
+                    )
+            except OSError as exc:
+                raise RuntimeError(
+                    f"Failed to copy part file {part_paths[index]} to {output_path}"
+                ) from exc
+
+        output_file.close()
+        try:
+            commit_output(staged_path, output_path)
+        except OSError as exc:
+            raise RuntimeError(f"Failed to write output file: {output_path}") from exc
+
+    output = TextSize(
+        lines=output_lines,
+        bytes=output_path.stat().st_size,
+        chars=0 if counter is None else counter.chars,
+        tokens=0 if counter is None else counter.tokens,
+    )
+    count_io(bytes_read, output.bytes)
+    with timed("baseline count"):
+        stats = assembly_stats(plan, work_dir, output, removed_counts, metadata, token_model)
+    return output_path, stats, budget_report(budget, output)
+
+
+def budget_report(budget: BudgetSelection | None, output: TextSize) -> BudgetReport | None:
+    if budget is None:
+        return None
+    return BudgetReport(
+        max_tokens=budget.max_tokens,
+        tokens=output.tokens,
+        dropped=tuple(f"{unit.label} ({unit.tokens} tokens)" for unit in budget.dropped),
+    )
+
+
+def assemble_stream(
+    manifest_path: Path,
+    work_dir: Path,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    max_tokens: int | None = None,
+) -> tuple[CompressionStats | None, BudgetReport | None]:
+    """Assemble ``manifest_path`` onto standard output instead of its output_file.
+
+    Nothing is written to the work dir, so the build stamps are not consulted.
+    """
+    plan = plan_assembly(manifest_path, work_dir)
+    if max_tokens is not None:
+        plan = replace(plan, max_tokens=max_tokens)
+    buffer = getattr(sys.stdout, "buffer", None)
+
+    def write(block: memoryview) -> None:
+        # Ranges end at line boundaries, so each one decodes on its own.
+        if buffer is None:
+            sys.stdout.write(bytes(block).decode("utf-8"))
+        else:
+            buffer.write(block)
+
+    sys.stdout.flush()
+    counter = token_model.counter()
+    output_lines = 0
+    output_bytes = 0
+    removed_counts: dict[str, int] = {}
+    with ExitStack() as stack:
+        with timed("read"):
+            part_files = open_part_files(plan.part_paths, stack, plan.stored)
+            part_data = [
+                part_file if isinstance(part_file, bytes) else _map_part(part_path, stack)
+                for part_path, part_file in zip(plan.part_paths, part_files)
+            ]
+            indexes = []
+            if plan.uses_section_index:
+                indexes = [
+                    section_index_of(part_file)
+                    if isinstance(part_file, bytes)
+                    else load_section_index(part_path)
+                    for part_path, part_file in zip(plan.part_paths, part_files)
+                ]
+        part_ranges = None
+        budget = None
+        with timed("match"):
+            if plan.filters_sections:
+                part_ranges = [
+                    select_section_ranges(
+                        index, plan.include_sections, plan.exclude_sections, removed_counts
+                    )
+                    for index in indexes
+                ]
+            if plan.max_tokens is not None:
+                budget = select_budget_ranges(plan, part_data, indexes, part_ranges, token_model)
+                part_ranges = budget.part_ranges
+        with timed("write"):
+            for position, data in enumerate(part_data):
+                ranges = [(0, len(data))] if part_ranges is None else part_ranges[position]
+                with memoryview(data) as view:
+                    for start, end in ranges:
+                        write(view[start:end])
+                        output_bytes += end - start
+                        output_lines += count_buffer_lines(data, start, end, counter)
+            sys.stdout.flush()
+        bytes_read = sum(len(data) for data in part_data)
+    output = TextSize(
+        lines=output_lines, bytes=output_bytes, chars=counter.chars, tokens=counter.tokens
+    )
+    count_io(bytes_read, output_bytes)
+    metadata = load_parts_metadata(work_dir, token_model)
+    with timed("baseline count"):
+        stats = assembly_stats(plan, work_dir, output, removed_counts, metadata, token_model)
+    return stats, budget_report(budget, output)
+
+
+@dataclass(frozen=True)
+class AssemblyResult:
+    manifest_path: Path
+    output_path: Path | None
+    stats: CompressionStats | None
+    error: str | None = None
+    ran: bool = True
+    budget: BudgetReport | None = None
+
+
+def _map_part(part_path: Path, stack: ExitStack):
+    try:
+        with part_path.open("rb") as part_file:
+            if os.fstat(part_file.fileno()).st_size == 0:
+                return b""
+            return stack.enter_context(
+                mmap.mmap(part_file.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Part file not found: {part_path}") from exc
+    except OSError as exc:
+        raise RuntimeError(f"Failed to read part file: {part_path}") from exc
+
+
+def count_buffer_lines(data, start: int, end: int, counter=None) -> int:
+    lines = 0
+    for position in range(start, end, COPY_BUFFER_SIZE):
+        block = data[position : min(position + COPY_BUFFER_SIZE, end)]
+        lines += block.count(b"\n")
+        if counter is not None:
+            counter.feed(block)
+    if end > start and data[end - 1 : end] != b"\n":
+        lines += 1
+    return lines
+
+
+def duplicate_outputs(plans: dict[Path, AssemblyPlan]) -> dict[Path, str]:
+    """Errors for manifests that write the same output file as another one."""
+    writers: dict[Path, list[Path]] = {}
+    for manifest_path, plan in plans.items():
+        writers.setdefault(plan.output_path, []).append(manifest_path)
+    errors = {}
+    for output_path, manifest_paths in writers.items():
+        if len(manifest_paths) > 1:
+            names = ", ".join(str(path) for path in manifest_paths)
+            for manifest_path in manifest_paths:
+                errors[manifest_path] = f"Output file {output_path} is written by {names}"
+    return errors
+
+
+def assemble_profiles(
+    manifest_paths: list[Path],
+    work_dir: Path,
+    jobs: int | None = None,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    max_tokens: int | None = None,
+) -> list[AssemblyResult]:
+    """Assemble many manifests while reading every distinct part only once.
+
+    Parts are mapped into memory once and shared by all outputs; line counts
+    and section ranges are computed once per part and outputs are written
+    concurrently. ``max_tokens`` overrides the budget of every manifest.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    plans: dict[Path, AssemblyPlan] = {}
+    errors: dict[Path, str] = {}
+    for manifest_path in manifest_paths:
+        try:
+            plans[manifest_path] = plan_assembly(manifest_path, work_dir)
+            if max_tokens is not None:
+                plans[manifest_path] = replace(plans[manifest_path], max_tokens=max_tokens)
+        except RuntimeError as exc:
+            errors[manifest_path] = str(exc)
+
+    for manifest_path, error in duplicate_outputs(plans).items():
+        errors[manifest_path] = error
+        del plans[manifest_path]
+
+    metadata = load_parts_metadata(work_dir, token_model)
+    baseline_cache: dict[Path, TextSize] = {}
+    results: dict[Path, AssemblyResult] = {}
+
+    def part_key(plan: AssemblyPlan, part_path: Path) -> tuple[Path, Path | None]:
+        # Stored versions may hold different text under the same part name.
+        return part_path, plan.stored.manifest_path if plan.is_stored(part_path) else None
+
+    with ExitStack() as stack:
+        shared = {}
+        part_errors = {}
+        indexes = {}
+        whole_part_sizes = {}
+        with timed("read"):
+            for plan in plans.values():
+                for part_path in plan.part_paths:
+                    key = part_key(plan, part_path)
+                    if key in part_errors:
+                        continue
+                    try:
+                        if key not in shared and plan.is_stored(part_path):
+                            shared[key] = plan.stored.read(part_path.name)
+                            size = plan.stored.text_size(part_path.name, token_model)
+                            if size is not None:
+                                whole_part_sizes[key] = size
+                        elif key not in shared:
+                            shared[key] = _map_part(part_path, stack)
+                            size = known_text_size(part_path, metadata)
+                            if size is not None:
+                                whole_part_sizes[key] = size
+                        if plan.uses_section_index and key not in indexes:
+                            if plan.is_stored(part_path):
+                                indexes[key] = section_index_of(shared[key])
+                            else:
+                                indexes[key] = load_section_index(part_path)
+                    except RuntimeError as exc:
+                        part_errors[key] = str(exc)
+        count_io(read=sum(len(data) for data in shared.values()))
+
+        def write_output(
+            plan: AssemblyPlan,
+        ) -> tuple[TextSize, dict[str, int], BudgetSelection | None]:
+            keys = [part_key(plan, part_path) for part_path in plan.part_paths]
+            for key in keys:
+                if key in part_errors:
+                    raise RuntimeError(part_errors[key])
+            removed_counts: dict[str, int] = {}
+            part_ranges = None
+            budget = None
+            with timed("match"):
+                if plan.filters_sections:
+                    part_ranges = [
+                        select_section_ranges(
+                            indexes[key],
+                            plan.include_sections,
+                            plan.exclude_sections,
+                            removed_counts,
+                        )
+                        for key in keys
+                    ]
+                if plan.max_tokens is not None:
+                    budget = select_budget_ranges(
+                        plan,
+                        [shared[key] for key in keys],
+                        [indexes[key] for key in keys],
+                        part_ranges,
+                        token_model,
+                    )
+                    part_ranges = budget.part_ranges
+            need_line_counts = plan.baseline_value is not None or plan.max_tokens is not None
+            counter = token_model.counter()
+            output_lines = 0
+            output_bytes = 0
+            staged_path = staging_path(plan.output_path)
+            try:
+                plan.output_path.parent.mkdir(parents=True, exist_ok=True)
+                with timed("write"), staged_path.open("wb") as output_file:
+                    for position, key in enumerate(keys):
+                        data = shared[key]
+                        if part_ranges is not None:
+                            ranges = part_ranges[position]
+                        else:
+                            ranges = [(0, len(data))]
+                        with memoryview(data) as view:
+                            for start, end in ranges:
+                                output_file.write(view[start:end])
+                                output_bytes += end - start
+                        if not need_line_counts:
+                            continue
+                        size = whole_part_sizes.get(key) if part_ranges is None else None
+                        if size is not None and counter.add(size):
+                            output_lines += size.lines
+                            continue
+                        for start, end in ranges:
+                            output_lines += count_buffer_lines(data, start, end, counter)
+                commit_output(staged_path, plan.output_path)
+            except OSError as exc:
+                raise RuntimeError(f"Failed to write output file: {plan.output_path}") from exc
+            finally:
+                discard_output(staged_path)
+            output = TextSize(
+                lines=output_lines,
+                bytes=output_bytes,
+                chars=counter.chars,
+                tokens=counter.tokens,
+            )
+            count_io(written=output_bytes)
+            return output, removed_counts, budget
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                manifest_path: pool.submit(write_output, plan)
+                for manifest_path, plan in plans.items()
+            }
+            for manifest_path, future in futures.items():
+                plan = plans[manifest_path]
+                try:
+                    output, removed_counts, budget = future.result()
+                    with timed("baseline count"):
+                        stats = assembly_stats(
+                            plan,
+                            work_dir,
+                            output,
+                            removed_counts,
+                            metadata,
+                            token_model,
+                            baseline_cache,
+                        )
+                except RuntimeError as exc:
+                    errors[manifest_path] = str(exc)
+                    continue
+                results[manifest_path] = AssemblyResult(
+                    manifest_path, plan.output_path, stats, budget=budget_report(budget, output)
+                )
+
+    return [
+        results.get(manifest_path)
+        or AssemblyResult(manifest_path, None, None, errors[manifest_path])
+        for manifest_path in manifest_paths
+    ]
+
+
+def print_assembly_table(results: list[AssemblyResult]) -> None:
+    rows = [("Profile", "Output", "Lines", "Reduction", "Tokens")]
+    for result in results:
+        if result.error is not None:
+            rows.append((result.manifest_path.stem, "-", "failed", "-", "-"))
+            continue
+        if result.stats is None:
+            rows.append((result.manifest_path.stem, result.output_path.name, "-", "-", "-"))
+            continue
+        tokens = "-"
+        if result.stats.token_model is not None:
+            tokens = f"{result.stats.original_tokens} -> {result.stats.new_tokens}"
+        rows.append(
+            (
+                result.manifest_path.stem,
+                result.output_path.name,
+                f"{result.stats.original_lines} -> {result.stats.new_lines}",
+                f"{result.stats.reduction_percent:.1f}%",
+                tokens,
+            )
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(5)]
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+
+def http_metadata_path(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + HTTP_METADATA_SUFFIX)
+
+
+def _load_http_metadata(output_path: Path, url: str) -> dict[str, str]:
+    if not output_path.exists():
+        return {}
+    try:
+        data = json.loads(http_metadata_path(output_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("url") != url:
+        return {}
+    return data
+
+
+@dataclass(frozen=True)
+class DownloadReport:
+    """Transfer figures of a download.
+
+    ``bytes_transferred`` and ``seconds`` cover every attempt including the
+    backoff between them; TTFB and throughput are those of the last,
+    successful attempt (``attempt_bytes`` in ``attempt_seconds``).
+    """
+
+    url: str
+    downloaded: bool
+    bytes_transferred: int
+    total_bytes: int
+    resumed_from: int
+    attempts: int
+    seconds: float
+    ttfb_seconds: float | None
+    content_encoding: str | None = None
+    attempt_bytes: int = 0
+    attempt_seconds: float = 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.attempt_seconds <= 0:
+            return 0.0
+        return self.attempt_bytes / self.attempt_seconds
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "url": self.url,
+            "downloaded": self.downloaded,
+            "bytes_transferred": self.bytes_transferred,
+            "total_bytes": self.total_bytes,
+            "resumed_from": self.resumed_from,
+            "attempts": self.attempts,
+            "seconds": round(self.seconds, 6),
+            "attempt_bytes": self.attempt_bytes,
+            "attempt_seconds": round(self.attempt_seconds, 6),
+            "ttfb_seconds": None if self.ttfb_seconds is None else round(self.ttfb_seconds, 6),
+            "bytes_per_second": round(self.bytes_per_second, 1),
+            "content_encoding": self.content_encoding,
+        }
+
+
+class _RetryableDownloadError(Exception):
+    pass
+
+
+def _content_length(headers) -> int | None:
+    """The ``Content-Length`` header as a byte count; None if absent or malformed."""
+    try:
+        length = int(headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+    return length if length >= 0 else None
+
+
+def _content_range_start(headers) -> int | None:
+    """First byte of a ``Content-Range: bytes START-END/TOTAL`` header, if any."""
+    match = re.fullmatch(r"bytes (\d+)-\d+/(?:\d+|\*)", headers.get("Content-Range") or "")
+    return int(match.group(1)) if match else None
+
+
+class _ContentDecoder:
+    """Incremental decoder for ``gzip``/``deflate`` response bodies.
+
+    ``deflate`` is officially zlib-wrapped but some servers send a raw
+    deflate stream, so the wrapper is detected from the first two bytes.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        self._pending = b""
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+
+    def decode(self, chunk: bytes) -> bytes:
+        if self._decoder is None:
+            self._pending += chunk
+            if len(self._pending) < 2:
+                return b""
+            first, second = self._pending[0], self._pending[1]
+            wrapped = first & 0x0F == 8 and (first << 8 | second) % 31 == 0
+            self._decoder = zlib.decompressobj(zlib.MAX_WBITS if wrapped else -zlib.MAX_WBITS)
+            chunk, self._pending = self._pending, b""
+        try:
+            return self._decoder.decompress(chunk)
+        except zlib.error as exc:
+            raise RuntimeError(f"Corrupt {self.encoding} response body: {exc}") from exc
+
+    def finish(self) -> bytes:
+        if self._decoder is None or not self._decoder.eof:
+            raise _RetryableDownloadError(f"truncated {self.encoding} stream")
+        return self._decoder.flush()
+
+
+def _content_decoder(encoding: str | None) -> _ContentDecoder | None:
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return None
+    if encoding in {"gzip", "x-gzip"}:
+        return _ContentDecoder("gzip")
+    if encoding == "deflate":
+        return _ContentDecoder("deflate")
+    raise RuntimeError(f"Unsupported Content-Encoding: {encoding}")
+
+
+class _DownloadProgress:
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.attempt_started = self.started
+        self.ttfb_seconds: float | None = None
+        self.bytes_transferred = 0
+        self.attempt_bytes = 0
+        self.resumed_from = 0
+        self.content_encoding: str | None = None
+        self.response_headers: dict[str, str] = {}
+        self.digest = hashlib.sha256()
+
+    def start_attempt(self) -> None:
+        self.attempt_started = time.monotonic()
+        self.ttfb_seconds = None
+        self.attempt_bytes = 0
+
+    def first_byte(self) -> None:
+        if self.ttfb_seconds is None:
+            self.ttfb_seconds = time.monotonic() - self.attempt_started
+
+
+def _conditional_headers(output_path: Path, url: str, sha256: str | None) -> dict[str, str]:
+    """``If-None-Match``/``If-Modified-Since`` for ``output_path``, if it is still intact.
+
+    A 304 keeps the local file, so the validators are only sent when its
+    content matches the digest recorded in the sidecar and the ``sha256`` pin.
+    """
+    metadata = _load_http_metadata(output_path, url)
+    if not metadata.get("etag") and not metadata.get("last_modified"):
+        return {}
+    digest = hashlib.sha256()
+    try:
+        with output_path.open("rb") as output_file:
+            while chunk := output_file.read(COPY_BUFFER_SIZE):
+                digest.update(chunk)
+    except OSError:
+        return {}
+    expected = {value.lower() for value in (metadata.get("sha256"), sha256) if value}
+    if not expected or expected != {digest.hexdigest()}:
+        return {}
+    headers = {}
+    if metadata.get("etag"):
+        headers["If-None-Match"] = metadata["etag"]
+    if metadata.get("last_modified"):
+        headers["If-Modified-Since"] = metadata["last_modified"]
+    return headers
+
+
+def _download_attempt(
+    url: str,
+    output_path: Path,
+    partial_path: Path,
+    timeout: float,
+    progress: _DownloadProgress,
+    conditional: dict[str, str],
+) -> bool:
+    """Fetch or resume into ``partial_path``; returns False on 304 Not Modified.
+
+    Fresh transfers accept gzip/deflate and are decoded while streaming, so
+    ``partial_path`` always holds identity bytes. Resumes therefore ask for
+    ``identity`` so the byte range lines up with what is already on disk.
+    """
+    import http.client
+    import urllib.error
+    import urllib.request
+
+    headers = {"Accept-Encoding": ACCEPT_ENCODING}
+    offset = 0
+    partial_metadata = _load_http_metadata(partial_path, url)
+    validator = partial_metadata.get("etag") or partial_metadata.get("last_modified")
+    if validator:
+        offset = partial_path.stat().st_size
+    else:
+        discard_output(partial_path)
+        headers.update(conditional)
+    if offset:
+        headers["Accept-Encoding"] = "identity"
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+
+    try:
+        response = urllib.request.urlopen(
+            urllib.request.Request(url, headers=headers), timeout=timeout
+        )
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            return False
+        if exc.code == 416:
+            discard_output(partial_path)
+        if exc.code == 416 or exc.code == 429 or exc.code >= 500:
+            raise _RetryableDownloadError(f"HTTP {exc.code}") from exc
         raise RuntimeError(f"Failed to download spec from {url}: {exc}") from exc
+    except (OSError, http.client.HTTPException) as exc:
+        raise _RetryableDownloadError(str(exc)) from exc
+
+    with response:
+        progress.first_byte()
+        progress.response_headers = getattr(response, "headers", None) or {}
+        if response.status == 206 and offset:
+            mode = "ab"
+            # Appending any other range would corrupt the partial file; start
+            # the next attempt from scratch instead.
+            if _content_range_start(progress.response_headers) != offset:
+                discard_output(partial_path)
+                raise _RetryableDownloadError(f"partial response does not start at byte {offset}")
+        elif response.status == 200:
+            mode = "wb"
+            offset = 0
+        else:
+            raise RuntimeError(f"HTTP {response.status} while downloading {url}")
+        decoder = _content_decoder(progress.response_headers.get("Content-Encoding"))
+        if decoder is not None and mode == "ab":
+            raise RuntimeError(f"Encoded partial response while resuming {url}")
+        progress.content_encoding = decoder.encoding if decoder is not None else None
+        if mode == "wb":
+            write_text_if_changed(
+                http_metadata_path(partial_path),
+                json.dumps(
+                    {
+                        "url": url,
+                        "etag": progress.response_headers.get("ETag"),
+                        "last_modified": progress.response_headers.get("Last-Modified"),
+                    }
+                ),
+            )
+
+        progress.digest = hashlib.sha256()
+        progress.resumed_from = offset
+        if offset:
+            with partial_path.open("rb") as partial_file:
+                while chunk := partial_file.read(COPY_BUFFER_SIZE):
+                    progress.digest.update(chunk)
+        expected_length = _content_length(progress.response_headers)
+        received = 0
+        try:
+            with partial_path.open(mode) as partial_file:
+                while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                    progress.bytes_transferred += len(chunk)
+                    progress.attempt_bytes += len(chunk)
+                    received += len(chunk)
+                    if decoder is not None:
+                        chunk = decoder.decode(chunk)
+                    partial_file.write(chunk)
+                    progress.digest.update(chunk)
+                if expected_length is not None and received < expected_length:
+                    raise _RetryableDownloadError(
+                        f"connection closed after {received} of {expected_length} bytes"
+                    )
+                if decoder is not None:
+                    chunk = decoder.finish()
+                    partial_file.write(chunk)
+                    progress.digest.update(chunk)
+        except (OSError, http.client.HTTPException) as exc:
+            raise _RetryableDownloadError(str(exc) or type(exc).__name__) from exc
+    return True
+
+
+def download_spec(
+    url: str,
+    output_path: Path,
+    sha256: str | None = None,
+    retries: int = DEFAULT_DOWNLOAD_RETRIES,
+    backoff: float = DEFAULT_DOWNLOAD_BACKOFF,
+    timeout: float = 30.0,
+) -> DownloadReport:
+    """Stream ``url`` into ``output_path`` and report transfer statistics.
+
+    The body is requested with gzip/deflate transfer compression and streams,
+    decoded, into ``<output>.part`` while being hashed; it replaces
+    the target atomically once complete. Interrupted transfers are retried
+    with exponential backoff and resumed with ``Range``/``If-Range`` requests,
+    also across runs. ETag/Last-Modified of the finished file are kept in a
+    sidecar with its SHA-256 and sent back as ``If-None-Match``/``If-Modified-Since``
+    while the file still has that digest (and matches ``sha256``).
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = output_path.with_name(output_path.name + PARTIAL_SUFFIX)
+    conditional = _conditional_headers(output_path, url, sha256)
+    progress = _DownloadProgress()
+    attempts = 0
+    while True:
+        attempts += 1
+        progress.start_attempt()
+        try:
+            with timed("download"):
+                downloaded = _download_attempt(
+                    url, output_path, partial_path, timeout, progress, conditional
+                )
+            attempt_seconds = time.monotonic() - progress.attempt_started
+            break
+        except _RetryableDownloadError as exc:
+            if attempts > retries:
+                raise RuntimeError(f"Failed to download spec from {url}: {exc}") from exc
+            with timed("backoff"):
+                time.sleep(backoff * 2 ** (attempts - 1))
+    count_io(read=progress.bytes_transferred)
+
+    def report(total_bytes: int) -> DownloadReport:
+        return DownloadReport(
+            url=url,
+            downloaded=downloaded,
+            bytes_transferred=progress.bytes_transferred,
+            total_bytes=total_bytes,
+            resumed_from=progress.resumed_from,
+            attempts=attempts,
+            seconds=time.monotonic() - progress.started,
+            ttfb_seconds=progress.ttfb_seconds,
+            content_encoding=progress.content_encoding,
+            attempt_bytes=progress.attempt_bytes,
+            attempt_seconds=attempt_seconds,
+        )
+
+    if not downloaded:
+        return report(output_path.stat().st_size)
+
+    if sha256 is not None and progress.digest.hexdigest() != sha256.lower():
+        discard_output(partial_path)
+        discard_output(http_metadata_path(partial_path))
+        raise RuntimeError(
+            f"SHA-256 mismatch for {url}: expected {sha256.lower()}, "
+            f"got {progress.digest.hexdigest()}"
+        )
+
+    total_bytes = partial_path.stat().st_size
+    count_io(written=total_bytes - progress.resumed_from)
+    commit_output(partial_path, output_path)
+    discard_output(http_metadata_path(partial_path))
+    metadata = {
+        "url": url,
+        "etag": progress.response_headers.get("ETag"),
+        "last_modified": progress.response_headers.get("Last-Modified"),
+        "sha256": progress.digest.hexdigest(),
+    }
+    write_text_if_changed(http_metadata_path(output_path), json.dumps(metadata, indent=2))
+    return report(total_bytes)
+
+
+def format_rate(bytes_per_second: float) -> str:
+    for unit in ("B/s", "KiB/s"):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} MiB/s"
+
+
+class StampDatabase:
+    """Build stamps stored in ``<work-dir>/.fpf-stamps.json``.
+
+    A target is up to date when its key (tool version, input content hashes
+    and rule/manifest parameters) matches the stored one and every output it
+    recorded still has the recorded size and mtime. Input digests are cached
+    by size and mtime so an up-to-date check does not reread the inputs.
+    Several processes may update the stamps of one work dir at once (``build``);
+    each saves only the entries it changed, merged into the current file.
+    """
+
+    def __init__(self, work_dir: Path) -> None:
+        self.path = work_dir / STAMPS_NAME
+        self.files, self.targets = self._load()
+        self._changed_files: set[str] = set()
+        self._changed_targets: set[str] = set()
+
+    def _load(self) -> tuple[dict[str, dict[str, object]], dict[str, dict[str, object]]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == STAMPS_VERSION:
+                return data["files"], data["targets"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return {}, {}
+
+    def digest(self, path: Path) -> str | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = str(path.resolve())
+        cached = self.files.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["blake2b"]
+        digest = file_digest(path)
+        self.files[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "blake2b": digest,
+        }
+        self._changed_files.add(key)
+        return digest
+
+    def key(self, kind: str, inputs: list[Path], params: object = None) -> str:
+        with timed("stamps"):
+            payload = json.dumps(
+                [TOOL_VERSION, kind, [self.digest(path) for path in inputs], params],
+                sort_keys=True,
+                default=str,
+            )
+            return new_digest_of(payload.encode("utf-8"))
+
+    def current(self, target: str, key: str) -> dict[str, object] | None:
+        record = self.targets.get(target)
+        if not record or record["key"] != key:
+            return None
+        for name, stamp in record["outputs"].items():
+            try:
+                stat = Path(name).stat()
+            except OSError:
+                return None
+            if stat.st_size != stamp["size"] or stat.st_mtime_ns != stamp["mtime_ns"]:
+                return None
+        return record
+
+    def record(self, target: str, key: str, outputs: list[Path], result: object) -> None:
+        stamps = {}
+        for output_path in outputs:
+            stat = output_path.stat()
+            stamps[os.path.abspath(output_path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        self.targets[target] = {"key": key, "outputs": stamps, "result": result}
+        self._changed_targets.add(target)
+
+    def save(self) -> None:
+        try:
+            with timed("stamps"):
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with exclusive_lock(self.path.with_name(STAMPS_NAME + ".lock")):
+                    files, targets = self._load()
+                    files.update((key, self.files[key]) for key in self._changed_files)
+                    targets.update((key, self.targets[key]) for key in self._changed_targets)
+                    self.files, self.targets = files, targets
+                    data = {"version": STAMPS_VERSION, "files": files, "targets": targets}
+                    write_text_if_changed(self.path, json.dumps(data))
+        except (OSError, RuntimeError) as exc:
+            print(f"Warning: failed to save build stamps: {exc}", file=sys.stderr)
+
+
+def stats_to_dict(stats: CompressionStats | None) -> dict[str, object] | None:
+    if stats is None:
+        return None
+    return {
+        "removed_counts": stats.removed_counts,
+        "original_lines": stats.original_lines,
+        "new_lines": stats.new_lines,
+        "original_bytes": stats.original_bytes,
+        "new_bytes": stats.new_bytes,
+        "original_chars": stats.original_chars,
+        "new_chars": stats.new_chars,
+        "original_tokens": stats.original_tokens,
+        "new_tokens": stats.new_tokens,
+        "token_model": stats.token_model,
+    }
+
+
+def stats_from_dict(data: dict[str, object] | None) -> CompressionStats | None:
+    if data is None:
+        return None
+    return CompressionStats(**data)
+
+
+def budget_to_dict(report: BudgetReport | None) -> dict[str, object] | None:
+    if report is None:
+        return None
+    return {
+        "max_tokens": report.max_tokens,
+        "tokens": report.tokens,
+        "dropped": list(report.dropped),
+    }
+
+
+def budget_from_dict(data: dict[str, object] | None) -> BudgetReport | None:
+    if data is None:
+        return None
+    return BudgetReport(**{**data, "dropped": tuple(data["dropped"])})
+
+
+def assemble_stamp_key(
+    stamps: StampDatabase, plan: AssemblyPlan, work_dir: Path, token_model: TokenModel
+) -> str:
+    """Key of an assemble target: the text it selects rather than whole files.
+
+    A manifest that filters sections without a token budget is keyed by the
+    digests of the sections it keeps, so edits elsewhere in its parts do not
+    rebuild it. The baseline is left out; see :func:`reuse_assembly`.
+    """
+    inputs = [plan.manifest_path]
+    if plan.stored is not None:
+        inputs.append(plan.stored.manifest_path)
+    sections = []
+    for part_path in plan.part_paths:
+        if plan.is_stored(part_path):
+            continue
+        if plan.filters_sections and plan.max_tokens is None and part_path.exists():
+            index = load_section_index(part_path)
+            removed_counts: dict[str, int] = {}
+            ranges = select_section_ranges(
+                index, plan.include_sections, plan.exclude_sections, removed_counts
+            )
+            sections.append([index.segment_digests(ranges), removed_counts])
+        else:
+            inputs.append(part_path)
+    return stamps.key(
+        "assemble",
+        inputs,
+        [str(plan.output_path), token_model.name, plan.max_tokens, sections],
+    )
+
+
+def assembly_baseline_digest(
+    stamps: StampDatabase, plan: AssemblyPlan, work_dir: Path, token_model: TokenModel
+) -> str | None:
+    """Digest of the baseline file assemble measures its reduction against."""
+    value = plan.baseline_value
+    if not isinstance(value, str) or not value:
+        return None
+    if plan.stored is not None and plan.stored.text_size(value, token_model) is not None:
+        # Recorded in the stored version, which is part of the stamp key.
+        return None
+    return stamps.digest(work_dir / value)
+
+
+def reuse_assembly(
+    stamps: StampDatabase,
+    target: str,
+    key: str,
+    plan: AssemblyPlan,
+    work_dir: Path,
+    token_model: TokenModel,
+) -> AssemblyResult | None:
+    """The recorded result if the target is up to date, else ``None``.
+
+    When only the baseline changed, the output is kept and its stats are
+    recomputed from the recorded output size.
+    """
+    record = stamps.current(target, key)
+    if record is None:
+        return None
+    stats = stats_from_dict(record["result"]["stats"])
+    budget = budget_from_dict(record["result"]["budget"])
+    baseline = assembly_baseline_digest(stamps, plan, work_dir, token_model)
+    if record["result"]["baseline"] == baseline:
+        return AssemblyResult(plan.manifest_path, plan.output_path, stats, ran=False, budget=budget)
+    if stats is None:
+        return None
+    output = TextSize(
+        lines=stats.new_lines,
+        bytes=stats.new_bytes,
+        chars=stats.new_chars,
+        tokens=stats.new_tokens,
+    )
+    metadata = load_parts_metadata(work_dir, token_model)
+    refreshed = assembly_stats(
+        plan, work_dir, output, stats.removed_counts, metadata, token_model
+    )
+    stamps.record(
+        target, key, [plan.output_path], assembly_record(refreshed, budget, baseline)
+    )
+    return AssemblyResult(plan.manifest_path, plan.output_path, refreshed, ran=False, budget=budget)
+
+
+def assembly_record(
+    stats: CompressionStats | None, budget: BudgetReport | None, baseline: str | None
+) -> dict[str, object]:
+    return {"stats": stats_to_dict(stats), "budget": budget_to_dict(budget), "baseline": baseline}
+
+
+def stripped_sections(
+    index: SectionIndex, rules: RemovalRules
+) -> tuple[list[str], dict[str, int]]:
+    """Digests of the sections a strip with ``rules`` keeps, and its removal counts.
+
+    This replays the decisions of :func:`compress_fpf_variants` on the
+    headings of the index, without reading the spec.
+    """
+    skipper = _SectionSkipper(rules)
+    kept = []
+    is_content_started = False
+    for entry in index.sections:
+        if not is_content_started:
+            if START_MARKER_PATTERN.match(f"# {entry.title}"):
+                is_content_started = True
+                kept.append(entry.digest)
+            continue
+        if skipper.keep(entry.level, normalize_text(entry.title)):
+            kept.append(entry.digest)
+    return kept, skipper.removed_counts
+
+
+def run_strip(
+    input_path: Path,
+    variants: list[CompressionVariant],
+    work_dir: Path,
+    force: bool = False,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    index: SectionIndex | None = None,
+) -> list[tuple[CompressionStats, bool]]:
+    """Strip only the variants whose kept sections changed, in one shared pass.
+
+    A variant is keyed by its rules and the digests of the sections it keeps,
+    so editing a section it drops, or the text before ``Part A``, only
+    refreshes its stats against the new spec. Returns ``(stats, ran)`` per
+    variant; skipped variants report stored stats. ``index`` is the current
+    heading index of the input, when the caller already holds it.
+    """
+    stamps = StampDatabase(work_dir)
+    if index is None:
+        if input_path.parent == work_dir:
+            index = load_section_index(input_path)
+        else:
+            index = build_section_index(input_path)
+    results: list[tuple[CompressionStats, bool] | None] = [None] * len(variants)
+    stale = []
+    baseline = None
+    for position, variant in enumerate(variants):
+        kept, removed_counts = stripped_sections(index, variant.rules)
+        key = stamps.key("strip", [], [variant.rules, token_model.name, kept])
+        target = f"strip:{variant.output_path.resolve()}"
+        record = None if force else stamps.current(target, key)
+        if record is None:
+            stale.append((position, variant, target, key))
+            continue
+        stats = stats_from_dict(record["result"]["stats"])
+        if record["result"]["baseline"] != index.source_digest:
+            if baseline is None:
+                metadata = load_parts_metadata(work_dir, token_model)
+                baseline = known_text_size(input_path, metadata) or measure_file(
+                    input_path, token_model
+                )
+            stats = replace(
+                stats,
+                removed_counts=removed_counts,
+                original_lines=baseline.lines,
+                original_bytes=baseline.bytes,
+                original_chars=baseline.chars,
+                original_tokens=baseline.tokens,
+            )
+            stamps.record(
+                target,
+                key,
+                [variant.output_path],
+                {"stats": stats_to_dict(stats), "baseline": index.source_digest},
+            )
+        results[position] = (stats, False)
+
+    if stale:
+        all_stats = compress_fpf_variants(
+            input_path, [variant for _, variant, _, _ in stale], token_model
+        )
+        for (position, variant, target, key), stats in zip(stale, all_stats):
+            stamps.record(
+                target,
+                key,
+                [variant.output_path],
+                {"stats": stats_to_dict(stats), "baseline": index.source_digest},
+            )
+            results[position] = (stats, True)
+    stamps.save()
+    return results
+
+
+def run_split(
+    input_path: Path,
+    output_dir: Path,
+    force: bool = False,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    depth: str = "part",
+    jobs: int | None = None,
+    store: bool = False,
+) -> tuple[list[str], bool]:
+    stamps = StampDatabase(output_dir)
+    key = stamps.key(
+        "split", [input_path], [str(output_dir.resolve()), token_model.name, depth, store]
+    )
+    target = f"split:{input_path.resolve()}"
+    record = None if force else stamps.current(target, key)
+    if record is not None:
+        return record["result"], False
+
+    manifest = split_fpf(input_path, output_dir, token_model, depth=depth, jobs=jobs, store=store)
+    if store:
+        version_path = ChunkStore(output_dir).version_path(stamps.digest(input_path))
+        outputs = [version_path]
+    else:
+        outputs = [output_dir / name for name in manifest]
+    outputs.append(output_dir / DEFAULT_PARTS_MANIFEST)
+    stamps.record(target, key, outputs, manifest)
+    stamps.save()
+    return manifest, True
+
+
+def run_assemble(
+    manifest_path: Path,
+    work_dir: Path,
+    force: bool = False,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    max_tokens: int | None = None,
+) -> AssemblyResult:
+    stamps = StampDatabase(work_dir)
+    plan = plan_assembly(manifest_path, work_dir)
+    if max_tokens is not None:
+        plan = replace(plan, max_tokens=max_tokens)
+    key = assemble_stamp_key(stamps, plan, work_dir, token_model)
+    target = f"assemble:{plan.output_path}"
+    if not force:
+        result = reuse_assembly(stamps, target, key, plan, work_dir, token_model)
+        if result is not None:
+            stamps.save()
+            return result
+
+    baseline = assembly_baseline_digest(stamps, plan, work_dir, token_model)
+    output_path, stats, budget = assemble_fpf(manifest_path, work_dir, token_model, max_tokens)
+    stamps.record(target, key, [output_path], assembly_record(stats, budget, baseline))
+    stamps.save()
+    return AssemblyResult(manifest_path, output_path, stats, budget=budget)
+
+
+def run_assemble_profiles(
+    manifest_paths: list[Path],
+    work_dir: Path,
+    jobs: int | None = None,
+    force: bool = False,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    max_tokens: int | None = None,
+) -> list[AssemblyResult]:
+    stamps = StampDatabase(work_dir)
+    results: dict[Path, AssemblyResult] = {}
+    stale: dict[Path, tuple[str, str, str | None]] = {}
+    plans = {}
+    for manifest_path in manifest_paths:
+        try:
+            plans[manifest_path] = plan_assembly(manifest_path, work_dir)
+        except RuntimeError:
+            pass
+    duplicates = duplicate_outputs(plans)
+    for manifest_path in manifest_paths:
+        # assemble_profiles reports failed plans and clashing outputs.
+        plan = plans.get(manifest_path)
+        if plan is None or manifest_path in duplicates:
+            stale[manifest_path] = ("", "", None)
+            continue
+        if max_tokens is not None:
+            plan = replace(plan, max_tokens=max_tokens)
+        key = assemble_stamp_key(stamps, plan, work_dir, token_model)
+        target = f"assemble:{plan.output_path}"
+        if not force:
+            result = reuse_assembly(stamps, target, key, plan, work_dir, token_model)
+            if result is not None:
+                results[manifest_path] = result
+                continue
+        baseline = assembly_baseline_digest(stamps, plan, work_dir, token_model)
+        stale[manifest_path] = (target, key, baseline)
+
+    if stale:
+        for result in assemble_profiles(
+            list(stale), work_dir, jobs=jobs, token_model=token_model, max_tokens=max_tokens
+        ):
+            results[result.manifest_path] = result
+            if result.error is None:
+                target, key, baseline = stale[result.manifest_path]
+                stamps.record(
+                    target,
+                    key,
+                    [result.output_path],
+                    assembly_record(result.stats, result.budget, baseline),
+                )
+    stamps.save()
+    return [results[manifest_path] for manifest_path in manifest_paths]
+
+
+def rebuild_spec_outputs(
+    spec_path: Path,
+    work_dir: Path,
+    manifest_paths: list[Path],
+    force: bool = False,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    depth: str = "part",
+    jobs: int | None = None,
+    index: SectionIndex | None = None,
+) -> tuple[list[tuple[Path, bool]], list[str]]:
+    """Run split, both strip variants and the given profiles through the build stamps.
+
+    Returns ``(output, rebuilt)`` pairs and the errors of failed profiles.
+    """
+    _, ran = run_split(spec_path, work_dir, force, token_model, depth=depth, jobs=jobs)
+    outputs = [(work_dir / DEFAULT_PARTS_MANIFEST, ran)]
+    variants = [
+        CompressionVariant(work_dir / DEFAULT_LITE_NAME, load_builtin_rules(False)),
+        CompressionVariant(work_dir / DEFAULT_AGGRESSIVE_NAME, load_builtin_rules(True)),
+    ]
+    for variant, (_, ran) in zip(
+        variants, run_strip(spec_path, variants, work_dir, force, token_model, index)
+    ):
+        outputs.append((variant.output_path, ran))
+    errors = []
+    for result in run_assemble_profiles(
+        manifest_paths, work_dir, jobs=jobs, force=force, token_model=token_model
+    ):
+        if result.error is not None:
+            errors.append(f"{result.manifest_path}: {result.error}")
+        else:
+            outputs.append((result.output_path, result.ran))
+    return outputs, errors
+
+
+@dataclass(frozen=True)
+class UpdateReport:
+    changes: list[SectionChange] | None  # None on the first update of a work dir
+    delta_path: Path | None
+    outputs: list[tuple[Path, bool]]  # (output, rebuilt)
+    errors: list[str]
+
+
+def run_update(
+    work_dir: Path,
+    profiles_dir: Path,
+    force: bool = False,
+    token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    depth: str = "part",
+    jobs: int | None = None,
+) -> UpdateReport:
+    """Diff the spec against the revision seen by the previous update, write
+    the delta and rebuild the split, strip and profile outputs.
+
+    Rebuilds go through the build stamps, which key strip and filtered
+    assemble targets by the sections they contain, so only outputs holding a
+    changed section are rewritten.
+    """
+    spec_path = work_dir / DEFAULT_SPEC_NAME
+    snapshot_path = work_dir / UPDATE_INDEX_NAME
+    previous = _read_index_sidecar(snapshot_path)
+    with timed("diff"):
+        index = load_section_index(spec_path)
+        changes = None if previous is None else diff_section_indexes(previous, index)
+    delta_path = None
+    if changes:
+        delta_path = work_dir / DEFAULT_DELTA_NAME
+        old_name = f"{spec_path.name}@{previous.source_digest[:12]}"
+        write_section_delta(spec_path, changes, delta_path, old_name)
+
+    outputs, errors = rebuild_spec_outputs(
+        spec_path,
+        work_dir,
+        sorted(profiles_dir.glob("*.yaml")),
+        force,
+        token_model,
+        depth=depth,
+        jobs=jobs,
+        index=index,
+    )
+    save_section_index(index, snapshot_path)
+    return UpdateReport(changes, delta_path, outputs, errors)
+
+
+@dataclass(frozen=True)
+class SpecSnapshot:
+    """The spec held in memory: its bytes, heading index and part boundaries."""
+
+    data: bytes
+    index: SectionIndex
+    part_ranges: dict[str, tuple[int, int]]
+    # File ranges of deeper splits, filled in on first use.
+    depth_ranges: dict[str, dict[str, tuple[int, int]]] = field(
+        default_factory=dict, compare=False
+    )
+
+    @property
+    def version(self) -> tuple[int, int]:
+        return self.index.source_size, self.index.source_mtime_ns
+
+    def ranges(self, depth: str = "part") -> dict[str, tuple[int, int]]:
+        if depth == "part":
+            return self.part_ranges
+        ranges = self.depth_ranges.get(depth)
+        if ranges is None:
+            ranges = {unit.name: (unit.start, unit.end) for unit in plan_split(self.data, depth)}
+            self.depth_ranges[depth] = ranges
+        return ranges
+
+    def part(self, name: str, depth: str = "part") -> tuple[bytes, SectionIndex] | None:
+        """Return a file as ``split`` at ``depth`` would write it, with offsets relative to it."""
+        bounds = self.ranges(depth).get(name)
+        if bounds is None:
+            return None
+        start, end = bounds
+        sections = tuple(
+            replace(
+                entry,
+                offset=entry.offset - start,
+                length=min(entry.offset + entry.length, end) - entry.offset,
+            )
+            for entry in self.index.sections
+            if start <= entry.offset < end
+        )
+        return self.data[start:end], replace(self.index, source_size=end - start, sections=sections)
+
+
+def load_spec_snapshot(spec_path: Path) -> SpecSnapshot:
+    while True:
+        try:
+            before = spec_path.stat()
+            data = spec_path.read_bytes()
+        except FileNotFoundError as exc:
+            raise RuntimeError(f"Input file not found: {spec_path}") from exc
+        except OSError as exc:
+            raise RuntimeError(f"Failed to read input file: {spec_path}") from exc
+        index = load_section_index(spec_path)
+        # Retry if the spec was replaced between reading it and indexing it.
+        if (before.st_size, before.st_mtime_ns) == (len(data), index.source_mtime_ns) and (
+            index.source_size == len(data)
+        ):
+            break
+
+    part_ranges = {unit.name: (unit.start, unit.end) for unit in plan_split(data)}
+    return SpecSnapshot(data, index, part_ranges)
+
+
+@dataclass(frozen=True)
+class RenderedPack:
+    body: bytes
+    lines: int
+    tokens: int
+
+
+class PackCache:
+    """Thread-safe LRU of rendered packs bounded by the total size of their bodies."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, RenderedPack] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> RenderedPack | None:
+        with self._lock:
+            pack = self._entries.get(key)
+            if pack is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pack
+
+    def put(self, key: tuple, pack: RenderedPack) -> None:
+        if len(pack.body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self._entries[key] = pack
+            self.size += len(pack.body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@dataclass(frozen=True)
+class ServeResponse:
+    status: int
+    body: bytes
+    content_type: str = "text/markdown; charset=utf-8"
+    headers: tuple[tuple[str, str], ...] = ()
+
+
+class _NotFound(RuntimeError):
+    pass
+
+
+class SpecService:
+    """Serves sections, stripped variants and profile packs from an in-memory spec.
+
+    The spec is read and indexed once and re-read when its size or mtime
+    changes; rendered packs are kept in a :class:`PackCache` keyed by the spec
+    version and the stat of the manifest or rules file they came from.
+    """
+
+    def __init__(
+        self,
+        work_dir: Path,
+        profiles_dir: Path = DEFAULT_PROFILES_DIR,
+        rules_dir: Path = DEFAULT_RULES_DIR,
+        cache_bytes: int = DEFAULT_SERVE_CACHE_BYTES,
+        token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+    ) -> None:
+        self.work_dir = work_dir
+        self.spec_path = work_dir / DEFAULT_SPEC_NAME
+        self.profiles_dir = profiles_dir
+        self.rules_dir = rules_dir
+        self.token_model = token_model
+        self.cache = PackCache(cache_bytes)
+        self.reloads = 0
+        self._snapshot: SpecSnapshot | None = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> SpecSnapshot:
+        try:
+            stat = self.spec_path.stat()
+        except FileNotFoundError as exc:
+            raise _NotFound(f"Input file not found: {self.spec_path}") from exc
+        version = (stat.st_size, stat.st_mtime_ns)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = load_spec_snapshot(self.spec_path)
+                self._snapshot = snapshot
+                self.cache.clear()
+                self.reloads += 1
+        return snapshot
+
+    def handle(self, target: str) -> ServeResponse:
+        url = urllib.parse.urlsplit(target)
+        segments = [urllib.parse.unquote(segment) for segment in url.path.split("/") if segment]
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            snapshot = self.snapshot()
+            if not segments:
+                return self._json(200, self.info(snapshot))
+            if segments == ["spec"]:
+                key = ("spec", snapshot.version)
+                return self._cached(key, lambda: self._pack(snapshot.data))
+            if len(segments) == 2 and segments[0] == "sections":
+                return self._section(snapshot, segments[1])
+            if len(segments) == 2 and segments[0] == "strip":
+                return self._strip(snapshot, segments[1])
+            if len(segments) == 2 and segments[0] == "profiles":
+                return self._profile(snapshot, segments[1], _query_max_tokens(query))
+            raise _NotFound(f"Unknown path: {url.path}")
+        except _NotFound as exc:
+            return self._json(404, {"error": str(exc)})
+        except RuntimeError as exc:
+            return self._json(400, {"error": str(exc)})
+
+    def info(self, snapshot: SpecSnapshot) -> dict[str, object]:
+        return {
+            "spec": str(self.spec_path),
+            "bytes": snapshot.index.source_size,
+            "blake2b": snapshot.index.source_digest,
+            "sections": len(snapshot.index.sections),
+            "parts": list(snapshot.part_ranges),
+            "profiles": sorted(path.stem for path in self.profiles_dir.glob("*.yaml")),
+            "rules": sorted(path.stem for path in self.rules_dir.glob("*.yaml")),
+            "token_model": self.token_model.name,
+            "reloads": self.reloads,
+            "cache": self.cache.as_dict(),
+        }
+
+    def _section(self, snapshot: SpecSnapshot, section_id: str) -> ServeResponse:
+        entry = snapshot.index.find(section_id)
+        if entry is None:
+            raise _NotFound(f"Section not found: {section_id}")
+        key = ("section", entry.offset, snapshot.version)
+        return self._cached(
+            key, lambda: self._pack(snapshot.data[entry.offset : entry.offset + entry.length])
+        )
+
+    def _strip(self, snapshot: SpecSnapshot, rules_value: str) -> ServeResponse:
+        rules_path = self._named_file(rules_value, self.rules_dir, "Rules")
+
+        def render() -> RenderedPack:
+            rules = load_removal_rules(rules_path)
+            lines = io.TextIOWrapper(io.BytesIO(snapshot.data), encoding="utf-8")
+            return self._pack("".join(iter_strip(lines, rules)).encode("utf-8"))
+
+        key = ("strip", str(rules_path), _file_version(rules_path), snapshot.version)
+        return self._cached(key, render)
+
+    def _profile(
+        self, snapshot: SpecSnapshot, profile_value: str, max_tokens: int | None
+    ) -> ServeResponse:
+        manifest_path = self._named_file(profile_value, self.profiles_dir, "Profile")
+        plan = plan_assembly(manifest_path, self.work_dir)
+        if max_tokens is not None:
+            plan = replace(plan, max_tokens=max_tokens)
 
-    output_path.write_bytes(data)
+        def render() -> RenderedPack:
+            part_data = []
+            indexes = []
+            for part_path in plan.part_paths:
+                # A pinned or stored split is served as assemble would write it,
+                # not from the current spec.
+                if plan.is_stored(part_path):
+                    data = plan.stored.read(part_path.name)
+                    part_data.append(data)
+                    indexes.append(section_index_of(data))
+                    continue
+                part = snapshot.part(part_path.name, plan.split_depth)
+                if part is None:
+                    raise _NotFound(f"Part not found in spec: {part_path.name}")
+                part_data.append(part[0])
+                indexes.append(part[1])
+
+            part_ranges = None
+            if plan.filters_sections:
+                part_ranges = [
+                    select_section_ranges(index, plan.include_sections, plan.exclude_sections)
+                    for index in indexes
+                ]
+            if plan.max_tokens is not None:
+                part_ranges = select_budget_ranges(
+                    plan, part_data, indexes, part_ranges, self.token_model
+                ).part_ranges
+            if part_ranges is None:
+                return self._pack(b"".join(part_data))
+            return self._pack(
+                b"".join(
+                    data[start:end]
+                    for data, ranges in zip(part_data, part_ranges)
+                    for start, end in ranges
+                )
+            )
+
+        key = (
+            "profile",
+            str(manifest_path),
+            _file_version(manifest_path),
+            max_tokens,
+            snapshot.version,
+        )
+        if plan.stored is not None:
+            stored_path = plan.stored.manifest_path
+            key += (str(stored_path), _file_version(stored_path))
+        return self._cached(key, render)
+
+    def _named_file(self, value: str, directory: Path, kind: str) -> Path:
+        # Only names inside the configured directory are served.
+        if not value or value.startswith(".") or Path(value).name != value:
+            raise _NotFound(f"{kind} not found: {value}")
+        path = resolve_profile_path(value, directory)
+        if not path.is_file():
+            raise _NotFound(f"{kind} not found: {value}")
+        return path
+
+    def _pack(self, body: bytes) -> RenderedPack:
+        counter = self.token_model.counter()
+        counter.feed(body)
+        lines = body.count(b"\n")
+        if body and not body.endswith(b"\n"):
+            lines += 1
+        return RenderedPack(body, lines, counter.tokens)
+
+    def _cached(self, key: tuple, render) -> ServeResponse:
+        pack = self.cache.get(key)
+        hit = pack is not None
+        if pack is None:
+            pack = render()
+            self.cache.put(key, pack)
+        return ServeResponse(
+            200,
+            pack.body,
+            headers=(
+                ("X-FPF-Lines", str(pack.lines)),
+                ("X-FPF-Tokens", str(pack.tokens)),
+                ("X-FPF-Token-Model", self.token_model.name),
+                ("X-FPF-Cache", "hit" if hit else "miss"),
+            ),
+        )
+
+    @staticmethod
+    def _json(status: int, data: dict[str, object]) -> ServeResponse:
+        body = (json.dumps(data, indent=2) + "\n").encode("utf-8")
+        return ServeResponse(status, body, "application/json")
+
+
+def _file_version(path: Path) -> tuple[int, int]:
+    try:
+        stat = path.stat()
+    except OSError as exc:
+        raise _NotFound(f"File not found: {path}") from exc
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _query_max_tokens(query: dict[str, list[str]]) -> int | None:
+    values = query.get("max_tokens")
+    if not values:
+        return None
+    try:
+        max_tokens = int(values[-1])
+    except ValueError:
+        max_tokens = 0
+    if max_tokens <= 0:
+        raise RuntimeError("max_tokens must be a positive number")
+    return max_tokens
+
+
+def make_spec_server(
+    service: SpecService,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_SERVE_PORT,
+    socket_path: Path | None = None,
+    access_log: bool = False,
+):
+    """Bind an HTTP server for ``service`` on TCP or, with ``socket_path``, a Unix socket."""
+    import http.server
+    import socketserver
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = f"fpf-cli/{TOOL_VERSION}"
+        # Headers and body are separate writes; without TCP_NODELAY a small
+        # response on a kept-alive connection waits for the delayed ACK.
+        disable_nagle_algorithm = socket_path is None
+
+        def do_GET(self) -> None:
+            self._respond(send_body=True)
+
+        def do_HEAD(self) -> None:
+            self._respond(send_body=False)
+
+        def _respond(self, send_body: bool) -> None:
+            response = service.handle(self.path)
+            self.send_response(response.status)
+            self.send_header("Content-Type", response.content_type)
+            self.send_header("Content-Length", str(len(response.body)))
+            for name, value in response.headers:
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(response.body)
+
+        def address_string(self) -> str:
+            if isinstance(self.client_address, tuple) and self.client_address:
+                return str(self.client_address[0])
+            return "unix"
+
+        def log_message(self, format: str, *args) -> None:
+            if access_log:
+                super().log_message(format, *args)
+
+    if socket_path is None:
+        return http.server.ThreadingHTTPServer((host, port), Handler)
+
+    class UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    if socket_path.is_socket():
+        socket_path.unlink()
+    return UnixServer(str(socket_path), Handler)
+
+
+# inotify(7) event bits for a file written, moved in or out, or deleted, and
+# for a dropped event queue; events are ``struct inotify_event`` plus a name.
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Reports files written, moved or deleted in a set of directories (Linux inotify)."""
+
+    def __init__(self, directories: list[Path]) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+        self._directories: dict[int, Path] = {}
+        try:
+            for directory in directories:
+                descriptor = libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+                if descriptor < 0:
+                    error = ctypes.get_errno()
+                    raise OSError(error, os.strerror(error), str(directory))
+                self._directories[descriptor] = directory
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        """Return the paths changed within ``timeout`` seconds (forever if None)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                changed.update(self._directories.values())
+            elif name and descriptor in self._directories:
+                changed.add(self._directories[descriptor] / os.fsdecode(name))
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback for :class:`InotifyWatcher` that compares file sizes and mtimes."""
+
+    def __init__(self, directories: list[Path], interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        self.directories = directories
+        self.interval = interval
+        self._stats = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        stats = {}
+        for directory in self.directories:
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            stats[directory / entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        pass
+        return stats
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            stats = self._scan()
+            changed = {
+                path
+                for path in stats.keys() | self._stats.keys()
+                if stats.get(path) != self._stats.get(path)
+            }
+            self._stats = stats
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(
+    directories: list[Path], poll: bool = False, interval: float = DEFAULT_WATCH_INTERVAL
+) -> InotifyWatcher | PollingWatcher:
+    if not poll:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as exc:
+            print(
+                f"Warning: inotify unavailable ({exc}); polling every {interval:g}s",
+                file=sys.stderr,
+            )
+    return PollingWatcher(directories, interval)
+
+
+def wait_for_changes(
+    watcher: InotifyWatcher | PollingWatcher, debounce: float, timeout: float | None = None
+) -> set[Path]:
+    """Block until files change, then collect further changes until ``debounce``
+    seconds pass without one, so an editor's burst of writes is one rebuild."""
+    changed = watcher.wait(timeout)
+    while changed:
+        more = watcher.wait(debounce)
+        if not more:
+            break
+        changed |= more
+    return changed
+
+
+@dataclass(frozen=True)
+class WatchReport:
+    inputs: list[Path]  # changed inputs; empty for the initial build
+    changes: list[SectionChange] | None  # set when the spec changed after the first build
+    outputs: list[tuple[Path, bool]]  # (output, rebuilt)
+    errors: list[str]
+    seconds: float
+
+
+class SpecWatch:
+    """Rebuilds what a change to the spec, a profile or a part affects.
+
+    Lives for the whole ``watch`` session: the spec's heading index and the
+    assembly plans stay in memory, so a spec edit is diffed against the
+    previous revision without reading it back, and a profile or part edit
+    only reassembles the profiles that use it. Inputs are recognised by their
+    size and mtime, so outputs written by a rebuild never trigger another.
+    """
+
+    def __init__(
+        self,
+        work_dir: Path,
+        profiles_dir: Path,
+        force: bool = False,
+        token_model: TokenModel = HEURISTIC_TOKEN_MODEL,
+        depth: str = "part",
+        jobs: int | None = None,
+    ) -> None:
+        self.work_dir = work_dir
+        self.spec_path = work_dir / DEFAULT_SPEC_NAME
+        self.profiles_dir = profiles_dir
+        self.force = force
+        self.token_model = token_model
+        self.depth = depth
+        self.jobs = jobs
+        self.index: SectionIndex | None = None
+        self.plans: dict[Path, AssemblyPlan | None] = {}
+        self._seen: dict[Path, tuple[int, int] | None] = {}
+
+    @property
+    def directories(self) -> list[Path]:
+        if self.profiles_dir.resolve() == self.work_dir.resolve():
+            return [self.work_dir]
+        return [self.work_dir, self.profiles_dir]
+
+    def inputs(self) -> set[Path]:
+        paths = {self.spec_path, *self.profiles_dir.glob("*.yaml"), *self.plans}
+        for plan in self.plans.values():
+            if plan is not None:
+                paths.update(plan.part_paths)
+        return paths
+
+    def pending(self) -> set[Path]:
+        """Inputs added, removed or modified since the last rebuild."""
+        return {path for path in self.inputs() if _stat_version(path) != self._seen.get(path)}
+
+    def rebuild(self, paths: set[Path] | None = None) -> WatchReport:
+        """Rebuild the outputs ``paths`` affect; ``None`` is the initial full build."""
+        started = time.perf_counter()
+        manifest_paths = sorted(self.profiles_dir.glob("*.yaml"))
+        changes = None
+        outputs: list[tuple[Path, bool]] = []
+        errors: list[str] = []
+        spec_changed = paths is None or self.spec_path in paths
+        if spec_changed:
+            try:
+                index = load_section_index(self.spec_path)
+                if self.index is not None:
+                    changes = diff_section_indexes(self.index, index)
+                self.index = index
+                outputs, errors = rebuild_spec_outputs(
+                    self.spec_path,
+                    self.work_dir,
+                    manifest_paths,
+                    self.force,
+                    self.token_model,
+                    depth=self.depth,
+                    jobs=self.jobs,
+                    index=index,
+                )
+            except RuntimeError as exc:
+                errors.append(str(exc))
+        else:
+            affected = [
+                manifest_path
+                for manifest_path in manifest_paths
+                if manifest_path in paths or self._uses_part(manifest_path, paths)
+            ]
+            for result in run_assemble_profiles(
+                affected,
+                self.work_dir,
+                jobs=self.jobs,
+                force=self.force,
+                token_model=self.token_model,
+            ):
+                if result.error is not None:
+                    errors.append(f"{result.manifest_path}: {result.error}")
+                else:
+                    outputs.append((result.output_path, result.ran))
+
+        self.plans = {
+            manifest_path: (
+                self._plan(manifest_path)
+                if spec_changed or manifest_path in paths or manifest_path not in self.plans
+                else self.plans[manifest_path]
+            )
+            for manifest_path in manifest_paths
+        }
+        self._seen = {path: _stat_version(path) for path in self.inputs()}
+        inputs = [] if paths is None else sorted(paths)
+        return WatchReport(inputs, changes, outputs, errors, time.perf_counter() - started)
+
+    def _uses_part(self, manifest_path: Path, paths: set[Path]) -> bool:
+        plan = self.plans.get(manifest_path)
+        return plan is not None and not paths.isdisjoint(plan.part_paths)
+
+    def _plan(self, manifest_path: Path) -> AssemblyPlan | None:
+        try:
+            return plan_assembly(manifest_path, self.work_dir)
+        except RuntimeError:
+            return None
+
+
+def print_watch_report(report: WatchReport) -> None:
+    if report.inputs:
+        print(f"Changed: {', '.join(path.name for path in report.inputs)}")
+    if report.changes:
+        print_section_changes(report.changes)
+    for output_path, ran in report.outputs:
+        if ran:
+            print(f"Rebuilt {output_path}")
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    rebuilt = sum(ran for _, ran in report.outputs)
+    print(
+        f"Rebuilt {rebuilt} of {len(report.outputs)} outputs "
+        f"in {report.seconds * 1000:.0f} ms",
+        flush=True,
+    )
+
+
+def _stat_version(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+@dataclass(frozen=True)
+class BuildNode:
+    """One ``build`` target: a command, its argument and the targets it needs first."""
+
+    name: str
+    command: str  # "download", "strip-lite", "strip-aggressive", "split" or "assemble"
+    argument: str | None = None  # URL to download or manifest to assemble
+    deps: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class BuildOptions:
+    work_dir: Path
+    force: bool = False
+    vocab_path: Path | None = None
+    depth: str = "part"
+
+
+@dataclass(frozen=True)
+class NodeResult:
+    name: str
+    status: str  # "rebuilt", "up to date", "failed" or "skipped"
+    seconds: float = 0.0
+    error: str | None = None
+
+
+def build_graph(profiles_dir: Path, url: str | None = DEFAULT_SPEC_URL) -> list[BuildNode]:
+    """The targets of a full refresh, in dependency order.
+
+    Strip and split only need the spec; each profile needs the split parts,
+    and a stripped variant if its manifest uses one as a part or baseline.
+    Without ``url`` the spec already in the work dir is used.
+    """
+    spec_deps = ("download",) if url is not None else ()
+    nodes = [BuildNode("download", "download", url)] if url is not None else []
+    nodes += [
+        BuildNode("strip-lite", "strip-lite", deps=spec_deps),
+        BuildNode("strip-aggressive", "strip-aggressive", deps=spec_deps),
+        BuildNode("split", "split", deps=spec_deps),
+    ]
+    variants = {DEFAULT_LITE_NAME: "strip-lite", DEFAULT_AGGRESSIVE_NAME: "strip-aggressive"}
+    for manifest_path in sorted(profiles_dir.glob("*.yaml")):
+        deps = ["split"]
+        try:
+            data = load_yaml_manifest(manifest_path)
+        except RuntimeError:
+            data = {}
+        parts = data.get("parts")
+        names = [*(parts if isinstance(parts, list) else []), data.get("baseline_file")]
+        deps += sorted(
+            {variants[name] for name in names if isinstance(name, str) and name in variants}
+        )
+        nodes.append(
+            BuildNode(
+                f"assemble:{manifest_path.stem}", "assemble", str(manifest_path), tuple(deps)
+            )
+        )
+    return nodes
+
+
+BUILD_COMMANDS = ("download", "strip-lite", "strip-aggressive", "split", "assemble")
+
+
+def load_build_graph(graph_path: Path, url: str | None = DEFAULT_SPEC_URL) -> list[BuildNode]:
+    """The targets listed in a YAML graph file, to run instead of :func:`build_graph`.
+
+    ``nodes`` is a list of mappings with a ``name``, a ``command`` (one of
+    :data:`BUILD_COMMANDS`), an optional ``argument`` and the ``deps`` that
+    must succeed first. Assemble manifests are relative to the graph file and
+    a download without an argument fetches ``url``. Without ``url`` download
+    nodes are left out, together with the dependencies on them. The nodes are
+    returned in dependency order.
+    """
+    data = load_yaml_manifest(graph_path, "Build graph")
+    entries = data.get("nodes")
+    if not isinstance(entries, list) or not entries:
+        raise RuntimeError(f"Invalid nodes entry in build graph: {graph_path}")
+    nodes = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise RuntimeError(f"Invalid node in build graph: {graph_path}")
+        name = entry.get("name")
+        command = entry.get("command")
+        argument = entry.get("argument")
+        deps = entry.get("deps", [])
+        if (
+            not isinstance(name, str)
+            or not name
+            or command not in BUILD_COMMANDS
+            or not (argument is None or isinstance(argument, str))
+            or not isinstance(deps, list)
+            or not all(isinstance(dep, str) for dep in deps)
+        ):
+            raise RuntimeError(f"Invalid build graph node {name!r}: {graph_path}")
+        if command == "assemble":
+            if argument is None:
+                raise RuntimeError(f"Build graph node {name} needs a manifest: {graph_path}")
+            argument = str(graph_path.parent / argument)
+        elif command == "download" and argument is None:
+            argument = url
+        nodes.append(BuildNode(name, command, argument, tuple(deps)))
+
+    names = {node.name for node in nodes}
+    if len(names) != len(nodes):
+        raise RuntimeError(f"Duplicate node names in build graph: {graph_path}")
+    for node in nodes:
+        for dep in node.deps:
+            if dep not in names:
+                raise RuntimeError(
+                    f"Unknown dependency {dep} of {node.name} in build graph: {graph_path}"
+                )
+    # Dependency order, as build_graph returns it; the file may list nodes in any order.
+    ordered: list[BuildNode] = []
+    done: set[str] = set()
+    remaining = nodes
+    while remaining:
+        ready = [node for node in remaining if done.issuperset(node.deps)]
+        if not ready:
+            cycle = ", ".join(node.name for node in remaining)
+            raise RuntimeError(f"Build graph has a cycle through {cycle}: {graph_path}")
+        ordered += ready
+        done.update(node.name for node in ready)
+        remaining = [node for node in remaining if node.name not in done]
+    nodes = ordered
+
+    if url is None:
+        skipped = {node.name for node in nodes if node.command == "download"}
+        nodes = [
+            replace(node, deps=tuple(dep for dep in node.deps if dep not in skipped))
+            for node in nodes
+            if node.name not in skipped
+        ]
+    return nodes
+
+
+_build_token_models: dict[Path | None, TokenModel] = {}
+
+
+def run_build_node(node: BuildNode, options: BuildOptions) -> NodeResult:
+    """Run one target, in a worker process of :func:`run_build`."""
+    started = time.perf_counter()
+    work_dir = options.work_dir
+    spec_path = work_dir / DEFAULT_SPEC_NAME
+    try:
+        token_model = _build_token_models.get(options.vocab_path)
+        if token_model is None:
+            token_model = load_token_model(options.vocab_path)
+            _build_token_models[options.vocab_path] = token_model
+        if node.command == "download":
+            ran = download_spec(node.argument, spec_path).downloaded
+        elif node.command in ("strip-lite", "strip-aggressive"):
+            aggressive = node.command == "strip-aggressive"
+            variant = CompressionVariant(
+                work_dir / (DEFAULT_AGGRESSIVE_NAME if aggressive else DEFAULT_LITE_NAME),
+                load_builtin_rules(aggressive),
+            )
+            [(_, ran)] = run_strip(spec_path, [variant], work_dir, options.force, token_model)
+        elif node.command == "split":
+            _, ran = run_split(spec_path, work_dir, options.force, token_model, depth=options.depth)
+        elif node.command == "assemble":
+            ran = run_assemble(Path(node.argument), work_dir, options.force, token_model).ran
+        else:
+            raise RuntimeError(f"Unknown build command: {node.command}")
+    except Exception as exc:
+        return NodeResult(node.name, "failed", time.perf_counter() - started, str(exc))
+    return NodeResult(node.name, "rebuilt" if ran else "up to date", time.perf_counter() - started)
+
+
+def run_build(
+    nodes: list[BuildNode], options: BuildOptions, jobs: int | None = None
+) -> list[NodeResult]:
+    """Run ``nodes`` on up to ``jobs`` processes, each once its dependencies succeed.
+
+    Dependents of a failed node, and nodes with unknown dependencies, are
+    skipped. Results follow the order of ``nodes``.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+    jobs = jobs or os.cpu_count() or 1
+    results: dict[str, NodeResult] = {}
+    pending = list(nodes)
+    names = {node.name for node in nodes}
+    # One job needs no worker processes.
+    executor = ThreadPoolExecutor(max_workers=1) if jobs == 1 else ProcessPoolExecutor(jobs)
+    with executor:
+        running = {}
+        while pending or running:
+            for node in list(pending):
+                done = [results.get(dep) for dep in node.deps]
+                if any(dep not in names for dep in node.deps) or any(
+                    result is not None and result.status in ("failed", "skipped")
+                    for result in done
+                ):
+                    results[node.name] = NodeResult(node.name, "skipped")
+                    pending.remove(node)
+                elif all(result is not None for result in done):
+                    running[executor.submit(run_build_node, node, options)] = node
+                    pending.remove(node)
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                try:
+                    results[node.name] = future.result()
+                except Exception as exc:
+                    results[node.name] = NodeResult(node.name, "failed", error=str(exc))
+    for node in pending:
+        results[node.name] = NodeResult(node.name, "skipped")
+    return [results[node.name] for node in nodes]
+
+
+def critical_path_seconds(nodes: list[BuildNode], results: list[NodeResult]) -> float:
+    """Length of the slowest dependency chain, the lower bound for any ``--jobs``.
+
+    ``nodes`` are in dependency order, as :func:`build_graph` and
+    :func:`load_build_graph` return them.
+    """
+    seconds = {result.name: result.seconds for result in results}
+    finish: dict[str, float] = {}
+    for node in nodes:
+        finish[node.name] = seconds[node.name] + max(
+            (finish.get(dep, 0.0) for dep in node.deps), default=0.0
+        )
+    return max(finish.values(), default=0.0)
+
+
+def print_build_summary(
+    nodes: list[BuildNode], results: list[NodeResult], wall_seconds: float
+) -> None:
+    rows = [("Target", "Status", "Seconds")]
+    for result in results:
+        seconds = f"{result.seconds:.2f}" if result.status != "skipped" else "-"
+        rows.append((result.name, result.status, seconds))
+    widths = [max(len(row[column]) for row in rows) for column in range(3)]
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    print(
+        f"Built {len(results)} targets in {wall_seconds:.2f}s "
+        f"(critical path {critical_path_seconds(nodes, results):.2f}s, "
+        f"{sum(result.seconds for result in results):.2f}s of work)"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="fpf-cli",
+        description="FPF specification tooling CLI.",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-phase timings, bytes, throughput and peak RSS as JSON on stderr.",
+    )
+    parser.add_argument(
+        "--timings-out",
+        default=None,
+        metavar="FILE",
+        help="Write the --timings JSON to FILE instead of stderr.",
+    )
+    parser.add_argument(
+        "--profile-out",
+        default=None,
+        metavar="FILE",
+        help="Profile the run: cProfile stats, or sampled collapsed stacks for "
+        "FILE ending in .folded/.collapsed.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    download_parser = subparsers.add_parser(
+        "download",
+        help="Download the canonical FPF-Spec.md into the local FPF directory.",
+    )
+    download_parser.add_argument(
+        "--url",
+        default=DEFAULT_SPEC_URL,
+        help="Source URL for FPF-Spec.md.",
+    )
+    download_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Directory for the downloaded spec.",
+    )
+    download_parser.add_argument(
+        "--sha256",
+        default=None,
+        help="Expected SHA-256 of the spec; the download fails on mismatch.",
+    )
+    download_parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_DOWNLOAD_RETRIES,
+        help="Retries after a failed or interrupted transfer (resumed with Range).",
+    )
+    download_parser.add_argument(
+        "--backoff",
+        type=float,
+        default=DEFAULT_DOWNLOAD_BACKOFF,
+        help="Initial retry delay in seconds; doubles on every retry.",
+    )
+    download_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30.0,
+        help="Socket timeout in seconds for each attempt.",
+    )
+    download_parser.add_argument(
+        "--report",
+        default=None,
+        help="Write a JSON transfer report (bytes/s, time-to-first-byte, ...) to this file.",
+    )
+
+    strip_lite_parser = subparsers.add_parser(
+        "strip-lite",
+        help="Generate the lite compressed spec.",
+    )
+    strip_lite_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    strip_lite_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    strip_lite_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
+    strip_lite_parser.add_argument(
+        "--input",
+        default=None,
+        help="Input spec path, or - for stdin (default: <work-dir>/FPF-Spec.md).",
+    )
+    strip_lite_parser.add_argument(
+        "--output",
+        default=None,
+        help="Output path, or - for stdout (stats then go to stderr).",
+    )
+
+    strip_parser = subparsers.add_parser(
+        "strip",
+        help="Generate compressed spec files (lite and aggressive, or --rules variants).",
+    )
+    strip_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    strip_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    strip_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
+    strip_parser.add_argument(
+        "--input",
+        default=None,
+        help="Input spec path, or - for stdin (default: <work-dir>/FPF-Spec.md).",
+    )
+    strip_parser.add_argument(
+        "--output",
+        default=None,
+        help="Output path, or - for stdout (stats then go to stderr).",
+    )
+    strip_parser.add_argument(
+        "--rules",
+        action="append",
+        default=None,
+        help=(
+            "Rules name, filename, or path to a rules file; repeat for more variants. "
+            "Defaults to the built-in lite and aggressive rules."
+        ),
+    )
+    strip_parser.add_argument(
+        "--rules-dir",
+        default=None,
+        help="Directory for rules files.",
+    )
+
+    strip_aggressive_parser = subparsers.add_parser(
+        "strip-aggressive",
+        help="Generate the aggressive compressed spec.",
+    )
+    strip_aggressive_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    strip_aggressive_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    strip_aggressive_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
+    strip_aggressive_parser.add_argument(
+        "--input",
+        default=None,
+        help="Input spec path, or - for stdin (default: <work-dir>/FPF-Spec.md).",
+    )
+    strip_aggressive_parser.add_argument(
+        "--output",
+        default=None,
+        help="Output path, or - for stdout (stats then go to stderr).",
+    )
 
+    split_parser = subparsers.add_parser(
+        "split",
+        help="Split the spec into per-part files.",
+    )
+    split_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    split_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    split_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
+    split_parser.add_argument(
+        "--depth",
+        choices=sorted(SPLIT_DEPTHS, key=SPLIT_DEPTHS.get),
+        default="part",
+        help="Split at Parts, chapters (FPF-Sec-B.5.md) or sections (FPF-Sec-B.5.2.md).",
+    )
+    split_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of files written in parallel.",
+    )
+    split_parser.add_argument(
+        "--input",
+        default=DEFAULT_SPEC_NAME,
+        help="Spec filename in the work dir (default: FPF-Spec.md).",
+    )
+    split_parser.add_argument(
+        "--store",
+        action="store_true",
+        help="Write section chunks to the work dir's content-addressed store instead of files.",
+    )
 
-def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(
-        prog="fpf-cli",
-        description="FPF specification tooling CLI.",
+    index_parser = subparsers.add_parser(
+        "index",
+        help="Build the section offset index sidecar for the spec.",
+    )
+    index_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    index_parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the index even if the sidecar is up to date.",
+    )
+    index_parser.add_argument(
+        "--list",
+        action="store_true",
+        help="Print the indexed headings.",
     )
-    subparsers = parser.add_subparsers(dest="command", required=True)
 
-    download_parser = subparsers.add_parser(
-        "download",
-        help="Download the canonical FPF-Spec.md into the local FPF directory.",
+    get_parser = subparsers.add_parser(
+        "get",
+        help="Print a single section (with its subsections) by section id.",
     )
-    download_parser.add_argument(
-        "--url",
-        default=DEFAULT_SPEC_URL,
-        help="Source URL for FPF-Spec.md.",
+    get_parser.add_argument(
+        "section_id",
+        help="Section id such as A.0, B.5.2.1 or C.17.",
     )
-    download_parser.add_argument(
+    get_parser.add_argument(
         "--work-dir",
         default=None,
-        help="Directory for the downloaded spec.",
+        help="Working directory for inputs and outputs.",
     )
 
-    strip_lite_parser = subparsers.add_parser(
-        "strip-lite",
-        help="Generate the lite compressed spec.",
+    diff_parser = subparsers.add_parser(
+        "diff",
+        help="List sections added, changed or removed between two spec revisions.",
     )
-    strip_lite_parser.add_argument(
+    diff_parser.add_argument(
         "--work-dir",
         default=None,
         help="Working directory for inputs and outputs.",
     )
+    diff_parser.add_argument(
+        "--old",
+        required=True,
+        help="Filename of the older revision in the work dir.",
+    )
+    diff_parser.add_argument(
+        "--new",
+        default=None,
+        help="Filename of the newer revision (default: FPF-Spec.md).",
+    )
+    diff_parser.add_argument(
+        "--output",
+        default=None,
+        help="Filename of the delta document (default: FPF-Spec-Delta.md).",
+    )
 
-    strip_parser = subparsers.add_parser(
-        "strip",
-        help="Generate compressed spec files (lite and aggressive).",
+    update_parser = subparsers.add_parser(
+        "update",
+        help="Diff the spec against the last update and rebuild the affected outputs.",
     )
-    strip_parser.add_argument(
+    update_parser.add_argument(
         "--work-dir",
         default=None,
         help="Working directory for inputs and outputs.",
     )
+    update_parser.add_argument(
+        "--profiles-dir",
+        default=None,
+        help="Directory with the profile manifests to rebuild (default: profiles).",
+    )
+    update_parser.add_argument(
+        "--depth",
+        choices=sorted(SPLIT_DEPTHS, key=SPLIT_DEPTHS.get),
+        default="part",
+        help="Split depth, as for split.",
+    )
+    update_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of files written in parallel.",
+    )
+    update_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    update_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
 
-    strip_aggressive_parser = subparsers.add_parser(
-        "strip-aggressive",
-        help="Generate the aggressive compressed spec.",
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Rebuild the outputs affected by each change to the spec, parts or profiles.",
     )
-    strip_aggressive_parser.add_argument(
+    watch_parser.add_argument(
         "--work-dir",
         default=None,
         help="Working directory for inputs and outputs.",
     )
+    watch_parser.add_argument(
+        "--profiles-dir",
+        default=None,
+        help="Directory with the profile manifests to rebuild (default: profiles).",
+    )
+    watch_parser.add_argument(
+        "--depth",
+        choices=sorted(SPLIT_DEPTHS, key=SPLIT_DEPTHS.get),
+        default="part",
+        help="Split depth, as for split.",
+    )
+    watch_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of files written in parallel.",
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_WATCH_DEBOUNCE,
+        help="Seconds without further changes before a rebuild starts.",
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Poll file sizes and mtimes instead of using inotify.",
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL,
+        help="Seconds between polls when polling.",
+    )
+    watch_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
 
-    split_parser = subparsers.add_parser(
-        "split",
-        help="Split the spec into per-part files.",
+    full_build_parser = subparsers.add_parser(
+        "build",
+        help="Run download, strip, split and every profile as a graph of parallel targets.",
     )
-    split_parser.add_argument(
+    full_build_parser.add_argument(
         "--work-dir",
         default=None,
         help="Working directory for inputs and outputs.",
     )
+    full_build_parser.add_argument(
+        "--profiles-dir",
+        default=None,
+        help="Directory with the profile manifests to assemble (default: profiles).",
+    )
+    full_build_parser.add_argument(
+        "--graph",
+        default=None,
+        help="YAML file of targets (name, command, argument, deps) to build instead.",
+    )
+    full_build_parser.add_argument(
+        "--url",
+        default=DEFAULT_SPEC_URL,
+        help="Source URL for FPF-Spec.md.",
+    )
+    full_build_parser.add_argument(
+        "--skip-download",
+        action="store_true",
+        help="Build from the spec already in the working directory.",
+    )
+    full_build_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of targets run at once (default: CPU count).",
+    )
+    full_build_parser.add_argument(
+        "--depth",
+        choices=sorted(SPLIT_DEPTHS, key=SPLIT_DEPTHS.get),
+        default="part",
+        help="Split depth, as for split.",
+    )
+    full_build_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    full_build_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
 
     assemble_parser = subparsers.add_parser(
         "assemble",
@@ -395,49 +5529,431 @@ def build_parser() -> argparse.ArgumentParser:
         "--profile",
         help="Profile name, filename, or path to the profile manifest. (Experimental). See profiles/ for available profiles.",
     )
+    assemble_manifest_group.add_argument(
+        "--all-profiles",
+        action="store_true",
+        help="Assemble every profile in --profiles-dir, reading each part once.",
+    )
     assemble_parser.add_argument(
         "--work-dir",
         default=None,
         help="Working directory for inputs and outputs.",
     )
     assemble_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if the outputs are up to date.",
+    )
+    assemble_parser.add_argument(
+        "--profiles-dir",
+        default=None,
+        help="Directory for profile manifests.",
+    )
+    assemble_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of outputs written in parallel with --all-profiles.",
+    )
+    assemble_parser.add_argument(
+        "--output",
+        choices=["-"],
+        default=None,
+        help="- writes the output to stdout instead of output_file (stats then go to stderr).",
+    )
+    assemble_parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help="Token budget; keeps the highest-value chapters that fit (overrides max_tokens).",
+    )
+    assemble_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
+
+    normalize_parser = subparsers.add_parser(
+        "normalize-typographics",
+        help="Replace typographic dashes, spaces and quotes and normalize Part headers.",
+    )
+    normalize_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    normalize_parser.add_argument(
+        "--input",
+        default=None,
+        help=f"Input filename in the working directory (default {DEFAULT_SPEC_NAME}).",
+    )
+    normalize_parser.add_argument(
+        "--output",
+        default=None,
+        help=f"Output filename in the working directory (default {DEFAULT_NORMALIZED_NAME}).",
+    )
+    normalize_parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Overwrite the input file (atomically).",
+    )
+
+    check_parser = subparsers.add_parser(
+        "check-typographics",
+        help="Report typographic characters and unnormalized Part headers; fail if any.",
+    )
+    check_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory for inputs and outputs.",
+    )
+    check_parser.add_argument(
+        "--input",
+        default=None,
+        help=f"Input filename in the working directory (default {DEFAULT_SPEC_NAME}).",
+    )
+    check_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes scanning chunks (default: CPU count).",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve sections, stripped variants and profiles from an in-memory spec.",
+    )
+    serve_parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Working directory containing FPF-Spec.md.",
+    )
+    serve_parser.add_argument(
         "--profiles-dir",
         default=None,
         help="Directory for profile manifests.",
     )
+    serve_parser.add_argument(
+        "--rules-dir",
+        default=None,
+        help="Directory for rules files.",
+    )
+    serve_parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on.",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_SERVE_PORT,
+        help="TCP port to listen on (0 picks a free port).",
+    )
+    serve_parser.add_argument(
+        "--socket",
+        default=None,
+        help="Listen on this Unix socket path instead of TCP.",
+    )
+    serve_parser.add_argument(
+        "--cache-mb",
+        type=int,
+        default=DEFAULT_SERVE_CACHE_BYTES // (1024 * 1024),
+        help="Size limit of the rendered pack cache in MiB.",
+    )
+    serve_parser.add_argument(
+        "--vocab",
+        default=None,
+        help="Offline BPE vocabulary (tiktoken format) for exact token counts.",
+    )
+    serve_parser.add_argument(
+        "--access-log",
+        action="store_true",
+        help="Log every request to stderr.",
+    )
 
     return parser
 
 
 def main(argv: list[str]) -> int:
+    global _active_timings
     parser = build_parser()
     args = parser.parse_args(argv)
 
+    timings = Timings() if args.timings or args.timings_out else None
+    _active_timings = timings
+    try:
+        if args.profile_out:
+            exit_code = run_profiled(lambda: run_command(parser, args), Path(args.profile_out))
+        else:
+            exit_code = run_command(parser, args)
+    finally:
+        _active_timings = None
+
+    if timings is not None:
+        report = json.dumps(timings.as_dict(args.command, exit_code))
+        if args.timings_out:
+            try:
+                Path(args.timings_out).write_text(report + "\n", encoding="utf-8")
+            except OSError as exc:
+                print(
+                    f"Warning: failed to write timings {args.timings_out}: {exc}",
+                    file=sys.stderr,
+                )
+        else:
+            print(report, file=sys.stderr)
+    return exit_code
+
+
+def run_command(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
     if args.command == "download":
         work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
         output_path = work_dir / DEFAULT_SPEC_NAME
         try:
-            download_spec(args.url, output_path)
+            report = download_spec(
+                args.url,
+                output_path,
+                sha256=args.sha256,
+                retries=args.retries,
+                backoff=args.backoff,
+                timeout=args.timeout,
+            )
         except Exception as exc:
             print(str(exc), file=sys.stderr)
             return 1
-        print(f"Downloaded FPF spec to {output_path}")
+        if args.report:
+            try:
+                Path(args.report).write_text(
+                    json.dumps(report.as_dict(), indent=2) + "\n", encoding="utf-8"
+                )
+            except OSError as exc:
+                print(f"Warning: failed to write report {args.report}: {exc}", file=sys.stderr)
+        if report.downloaded:
+            print(f"Downloaded FPF spec to {output_path}")
+        else:
+            print(f"Not modified: {output_path}")
+        ttfb = "-" if report.ttfb_seconds is None else f"{report.ttfb_seconds * 1000:.0f} ms"
+        encoding = f" ({report.content_encoding})" if report.content_encoding else ""
+        print(
+            f"Transferred {report.bytes_transferred} bytes{encoding} in {report.seconds:.2f}s "
+            f"over {report.attempts} attempt(s); last attempt {report.attempt_bytes} bytes "
+            f"in {report.attempt_seconds:.2f}s ({format_rate(report.bytes_per_second)}, "
+            f"TTFB {ttfb})"
+        )
         return 0
 
     if args.command == "split":
         work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
-        input_path = work_dir / DEFAULT_SPEC_NAME
+        if args.jobs is not None and args.jobs < 1:
+            print("--jobs must be at least 1", file=sys.stderr)
+            return 1
         output_dir = work_dir
         try:
-            split_fpf(input_path, output_dir)
+            input_path = resolve_workdir_path(work_dir, args.input, "Input file")
+            token_model = load_token_model(Path(args.vocab) if args.vocab else None)
+            _, ran = run_split(
+                input_path,
+                output_dir,
+                force=args.force,
+                token_model=token_model,
+                depth=args.depth,
+                jobs=args.jobs,
+                store=args.store,
+            )
+        except Exception as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        if ran:
+            print(f"Wrote {output_dir / DEFAULT_PARTS_MANIFEST}")
+        else:
+            print(f"Up to date: {output_dir / DEFAULT_PARTS_MANIFEST}")
+        if args.store:
+            # The digest was cached in the build stamps by run_split.
+            version = StampDatabase(work_dir).digest(input_path)
+            print(f"Stored version {version} in {ChunkStore(work_dir).root}")
+        return 0
+
+    if args.command == "index":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        input_path = work_dir / DEFAULT_SPEC_NAME
+        try:
+            with timed("index"):
+                index = load_section_index(input_path, rebuild=args.rebuild)
+        except Exception as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        if args.list:
+            for entry in index.sections:
+                print(f"{entry.line}\t{entry.section_id or '-'}\t{'#' * entry.level} {entry.title}")
+        print(f"Indexed {len(index.sections)} sections in {input_path}")
+        print(f"Wrote {section_index_path(input_path)}")
+        return 0
+
+    if args.command == "get":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        input_path = work_dir / DEFAULT_SPEC_NAME
+        try:
+            with timed("read"):
+                data = read_section(input_path, args.section_id)
+            count_io(read=len(data), written=len(data))
+        except Exception as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        write_stdout_bytes(data)
+        return 0
+
+    if args.command == "diff":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        try:
+            old_path = resolve_workdir_path(work_dir, args.old, "Input file")
+            new_path = resolve_workdir_path(work_dir, args.new or DEFAULT_SPEC_NAME, "Input file")
+            output_path = resolve_workdir_path(
+                work_dir, args.output or DEFAULT_DELTA_NAME, "Output file"
+            )
+            with timed("diff"):
+                changes = diff_sections(old_path, new_path)
+            write_section_delta(new_path, changes, output_path, old_path.name)
+        except Exception as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        print_section_changes(changes)
+        print(f"Wrote {output_path}")
+        return 0
+
+    if args.command == "update":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        profiles_dir = Path(args.profiles_dir) if args.profiles_dir else DEFAULT_PROFILES_DIR
+        if args.jobs is not None and args.jobs < 1:
+            print("--jobs must be at least 1", file=sys.stderr)
+            return 1
+        try:
+            token_model = load_token_model(Path(args.vocab) if args.vocab else None)
+            report = run_update(
+                work_dir,
+                profiles_dir,
+                force=args.force,
+                token_model=token_model,
+                depth=args.depth,
+                jobs=args.jobs,
+            )
         except Exception as exc:
             print(str(exc), file=sys.stderr)
             return 1
-        print(f"Wrote {output_dir / DEFAULT_PARTS_MANIFEST}")
+        if report.changes is None:
+            print("No previous update recorded; rebuilding from the current spec")
+        elif not report.changes:
+            print("No section changes since the previous update")
+        else:
+            print_section_changes(report.changes)
+            print(f"Wrote {report.delta_path}")
+        for output_path, ran in report.outputs:
+            print(f"Rebuilt {output_path}" if ran else f"Up to date: {output_path}")
+        for error in report.errors:
+            print(error, file=sys.stderr)
+        return 1 if report.errors else 0
+
+    if args.command == "watch":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        profiles_dir = Path(args.profiles_dir) if args.profiles_dir else DEFAULT_PROFILES_DIR
+        if args.jobs is not None and args.jobs < 1:
+            print("--jobs must be at least 1", file=sys.stderr)
+            return 1
+        if args.debounce < 0:
+            print("--debounce must not be negative", file=sys.stderr)
+            return 1
+        if args.interval <= 0:
+            print("--interval must be positive", file=sys.stderr)
+            return 1
+        try:
+            token_model = load_token_model(Path(args.vocab) if args.vocab else None)
+        except RuntimeError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        watch = SpecWatch(
+            work_dir, profiles_dir, token_model=token_model, depth=args.depth, jobs=args.jobs
+        )
+        try:
+            watcher = open_watcher(watch.directories, poll=args.poll, interval=args.interval)
+        except OSError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        try:
+            print_watch_report(watch.rebuild())
+            print(f"Watching {', '.join(map(str, watch.directories))}", flush=True)
+            while True:
+                if wait_for_changes(watcher, args.debounce):
+                    paths = watch.pending()
+                    if paths:
+                        print_watch_report(watch.rebuild(paths))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
         return 0
 
+    if args.command == "build":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        profiles_dir = Path(args.profiles_dir) if args.profiles_dir else DEFAULT_PROFILES_DIR
+        if args.jobs is not None and args.jobs < 1:
+            print("--jobs must be at least 1", file=sys.stderr)
+            return 1
+        url = None if args.skip_download else args.url
+        try:
+            if args.graph:
+                nodes = load_build_graph(Path(args.graph), url)
+            else:
+                nodes = build_graph(profiles_dir, url)
+        except RuntimeError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        options = BuildOptions(
+            work_dir,
+            force=args.force,
+            vocab_path=Path(args.vocab) if args.vocab else None,
+            depth=args.depth,
+        )
+        started = time.perf_counter()
+        results = run_build(nodes, options, jobs=args.jobs)
+        print_build_summary(nodes, results, time.perf_counter() - started)
+        for result in results:
+            if result.error is not None:
+                print(f"{result.name}: {result.error}", file=sys.stderr)
+        return 0 if all(result.status in ("rebuilt", "up to date") for result in results) else 1
+
     if args.command == "assemble":
         work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        if args.max_tokens is not None and args.max_tokens <= 0:
+            print("--max-tokens must be a positive number", file=sys.stderr)
+            return 1
+        if args.jobs is not None and args.jobs < 1:
+            print("--jobs must be at least 1", file=sys.stderr)
+            return 1
+        if args.all_profiles and args.output is not None:
+            print("--output - needs a single manifest, not --all-profiles", file=sys.stderr)
+            return 1
+        if args.all_profiles:
+            profiles_dir = Path(args.profiles_dir) if args.profiles_dir else DEFAULT_PROFILES_DIR
+            manifest_paths = sorted(profiles_dir.glob("*.yaml"))
+            if not manifest_paths:
+                print(f"No profile manifests found in {profiles_dir}", file=sys.stderr)
+                return 1
+            try:
+                token_model = load_token_model(Path(args.vocab) if args.vocab else None)
+            except RuntimeError as exc:
+                print(str(exc), file=sys.stderr)
+                return 1
+            results = run_assemble_profiles(
+                manifest_paths,
+                work_dir,
+                jobs=args.jobs,
+                force=args.force,
+                token_model=token_model,
+                max_tokens=args.max_tokens,
+            )
+            print_assembly_table(results)
+            for result in results:
+                if result.error is not None:
+                    print(f"{result.manifest_path}: {result.error}", file=sys.stderr)
+            return 1 if any(result.error is not None for result in results) else 0
         if args.profile:
             profiles_dir = Path(args.profiles_dir) if args.profiles_dir else DEFAULT_PROFILES_DIR
             manifest_path = resolve_profile_path(args.profile, profiles_dir)
@@ -466,42 +5982,184 @@ def main(argv: list[str]) -> int:
             else:
                 manifest_path = work_dir / manifest_value
         try:
-            output_path, stats = assemble_fpf(manifest_path, work_dir)
+            token_model = load_token_model(Path(args.vocab) if args.vocab else None)
+            if args.output == "-":
+                stats, budget = assemble_stream(
+                    manifest_path, work_dir, token_model, args.max_tokens
+                )
+                if stats is not None:
+                    print_compression_stats(stats, "<stdout>", file=sys.stderr)
+                if budget is not None:
+                    print_budget_report(budget, file=sys.stderr)
+                return 0
+            result = run_assemble(
+                manifest_path,
+                work_dir,
+                force=args.force,
+                token_model=token_model,
+                max_tokens=args.max_tokens,
+            )
         except Exception as exc:
             print(str(exc), file=sys.stderr)
             return 1
-        if stats is not None:
-            print_compression_stats(stats, output_path)
+        if result.stats is not None:
+            print_compression_stats(result.stats, result.output_path)
+        if result.budget is not None:
+            print_budget_report(result.budget)
+        if not result.ran:
+            print(f"Up to date: {result.output_path}")
         return 0
 
     if args.command in {"strip", "strip-lite", "strip-aggressive"}:
         work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
-        input_path = work_dir / DEFAULT_SPEC_NAME
+        input_path = Path(args.input) if args.input else work_dir / DEFAULT_SPEC_NAME
+
+        try:
+            token_model = load_token_model(Path(args.vocab) if args.vocab else None)
+            if args.command == "strip":
+                rules_dir = Path(args.rules_dir) if args.rules_dir else DEFAULT_RULES_DIR
+                variants = []
+                for rules_value in args.rules or ["lite", "aggressive"]:
+                    rules = load_removal_rules(resolve_rules_path(rules_value, rules_dir))
+                    output_path = resolve_workdir_path(
+                        work_dir, rules_output_name(rules), "Output file"
+                    )
+                    if any(variant.output_path == output_path for variant in variants):
+                        raise RuntimeError(f"Duplicate output file for rules: {rules_value}")
+                    variants.append(CompressionVariant(output_path, rules))
+            elif args.command == "strip-lite":
+                variants = [
+                    CompressionVariant(work_dir / DEFAULT_LITE_NAME, load_builtin_rules(False))
+                ]
+            else:
+                variants = [
+                    CompressionVariant(
+                        work_dir / DEFAULT_AGGRESSIVE_NAME, load_builtin_rules(True)
+                    )
+                ]
+            if args.output is not None:
+                if len(variants) != 1:
+                    raise RuntimeError("--output needs exactly one rules variant")
+                variants = [replace(variants[0], output_path=Path(args.output))]
+            if "-" in {args.input, args.output}:
+                if len(variants) != 1:
+                    raise RuntimeError("Streaming with - needs exactly one rules variant")
+                variant = variants[0]
+                stats = strip_stream(
+                    iter_lines(input_path), variant.output_path, variant.rules, token_model
+                )
+                if args.output == "-":
+                    print_compression_stats(stats, "<stdout>", file=sys.stderr)
+                else:
+                    print_compression_stats(stats, variant.output_path)
+                    print(f"Wrote {variant.output_path}")
+                return 0
+            results = run_strip(
+                input_path, variants, work_dir, force=args.force, token_model=token_model
+            )
+        except RuntimeError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        for variant, (stats, ran) in zip(variants, results):
+            print_compression_stats(stats, variant.output_path)
+            if ran:
+                print(f"Wrote {variant.output_path}")
+            else:
+                print(f"Up to date: {variant.output_path}")
+        return 0
+
+    if args.command == "normalize-typographics":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        try:
+            input_path = resolve_workdir_path(
+                work_dir, args.input or DEFAULT_SPEC_NAME, "Input file"
+            )
+            if args.in_place:
+                if args.output is not None:
+                    print(
+                        "Warning: both --output and --in-place given; overwriting the input",
+                        file=sys.stderr,
+                    )
+                output_path = input_path
+            else:
+                output_path = resolve_workdir_path(
+                    work_dir, args.output or DEFAULT_NORMALIZED_NAME, "Output file"
+                )
+            stats = normalize_typographics(input_path, output_path)
+        except RuntimeError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        print(
+            f"Normalized {stats.changed_lines} of {stats.lines} lines "
+            f"({stats.part_headers} Part headers)"
+        )
+        print(f"Wrote {output_path}")
+        return 0
+
+    if args.command == "check-typographics":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        if args.jobs is not None and args.jobs < 1:
+            print("--jobs must be at least 1", file=sys.stderr)
+            return 1
+        try:
+            input_path = resolve_workdir_path(
+                work_dir, args.input or DEFAULT_SPEC_NAME, "Input file"
+            )
+            violations = check_typographics(input_path, jobs=args.jobs)
+        except RuntimeError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        sys.stdout.writelines(
+            f"{input_path.name}:{violation.line}:{violation.column}: {violation.reason}\n"
+            for violation in violations
+        )
+        if violations:
+            print(
+                f"Found {len(violations)} typographic violations in {input_path}",
+                file=sys.stderr,
+            )
+            return 1
+        print(f"No typographic violations in {input_path}")
+        return 0
 
-        if args.command == "strip":
-            lite_path = work_dir / DEFAULT_LITE_NAME
-            aggressive_path = work_dir / DEFAULT_AGGRESSIVE_NAME
-            lite_stats = compress_fpf(input_path, lite_path, aggressive=False)
-            aggressive_stats = compress_fpf(input_path, aggressive_path, aggressive=True)
-            print_compression_stats(lite_stats, lite_path)
-            print(f"Wrote {lite_path}")
-            print_compression_stats(aggressive_stats, aggressive_path)
-            print(f"Wrote {aggressive_path}")
-            return 0
-
-        if args.command == "strip-lite":
-            output_path = work_dir / DEFAULT_LITE_NAME
-            stats = compress_fpf(input_path, output_path, aggressive=False)
-            print_compression_stats(stats, output_path)
-            print(f"Wrote {output_path}")
-            return 0
-
-        if args.command == "strip-aggressive":
-            output_path = work_dir / DEFAULT_AGGRESSIVE_NAME
-            stats = compress_fpf(input_path, output_path, aggressive=True)
-            print_compression_stats(stats, output_path)
-            print(f"Wrote {output_path}")
-            return 0
+    if args.command == "serve":
+        work_dir = Path(args.work_dir) if args.work_dir else DEFAULT_WORK_DIR
+        if args.cache_mb < 0:
+            print("--cache-mb must not be negative", file=sys.stderr)
+            return 1
+        socket_path = Path(args.socket) if args.socket else None
+        try:
+            service = SpecService(
+                work_dir,
+                profiles_dir=Path(args.profiles_dir) if args.profiles_dir else DEFAULT_PROFILES_DIR,
+                rules_dir=Path(args.rules_dir) if args.rules_dir else DEFAULT_RULES_DIR,
+                cache_bytes=args.cache_mb * 1024 * 1024,
+                token_model=load_token_model(Path(args.vocab) if args.vocab else None),
+            )
+            snapshot = service.snapshot()
+            server = make_spec_server(
+                service, args.host, args.port, socket_path, access_log=args.access_log
+            )
+        except (RuntimeError, OSError) as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        if socket_path is not None:
+            address = f"unix:{socket_path}"
+        else:
+            address = f"http://{args.host}:{server.server_address[1]}"
+        print(
+            f"Serving {service.spec_path} ({len(snapshot.index.sections)} sections) on {address}",
+            flush=True,
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if socket_path is not None and socket_path.is_socket():
+                socket_path.unlink()
+        return 0
 
     parser.print_help()
     return 2
@@ -0,0 +1,225 @@
+"""Typographic normalization and checks shared by strip, split, normalize and
+check (PF-3/4/5/7/8).
+
+Nearly every line of the spec is plain ASCII, and ``str.isascii`` answers
+that from the string header without scanning it, so those lines are returned
+untouched. The rest go through one ``str.replace`` per entry of
+``TYPOGRAPHIC_REPLACEMENTS``: CPython's ``str.translate`` takes a slow
+per-character path on non-ASCII text and measured about 20x slower here.
+
+The checker works on raw bytes: one compiled regex finds the UTF-8 encodings
+of the replaced characters and candidate Part headings, so clean lines are
+never decoded. Pure-ASCII chunks are searched for headings only.
+"""
+
+import mmap
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+
+TYPOGRAPHIC_REPLACEMENTS = {
+    "\u2011": "-",  # non-breaking hyphen
+    "\u2013": "-",  # en dash
+    "\u2014": "-",  # em dash
+    "\u00A0": " ",  # no-break space
+    "\u2018": "'",  # left single quotation mark
+    "\u2019": "'",  # right single quotation mark
+    "\u201C": '"',  # left double quotation mark
+    "\u201D": '"',  # right double quotation mark
+}
+_REPLACEMENT_PAIRS = tuple(TYPOGRAPHIC_REPLACEMENTS.items())
+# Matched on already normalized text. Unlike the spec's bare pattern, the part
+# letter must end the word so that "Part Alpha" is not rewritten as "Part A lpha".
+PART_HEADER_PATTERN = re.compile(
+    r"^(#+)\s*(\**)Part\s+([A-Z])(?!\w)(\**)(.*)$", re.IGNORECASE | re.DOTALL
+)
+
+CHECK_CHUNK_SIZE = 4 * 1024 * 1024
+CHECK_MIN_CHUNK_SIZE = 1024 * 1024
+# Byte patterns for the checker. Every alternative starts with a plain byte
+# and there are no groups, which lets ``re`` skip ahead with its fast prefix
+# scan; a heading candidate starts at the newline before the heading.
+_CHARACTER_SOURCE = b"|".join(
+    re.escape(character.encode("utf-8")) for character in TYPOGRAPHIC_REPLACEMENTS
+)
+_HEADER_SOURCE = rb"#+[ \t]*\**[Pp][Aa][Rr][Tt](?=[ \t]|\xc2\xa0)"
+_HEADER_AT_START = re.compile(_HEADER_SOURCE)
+_HEADER_CANDIDATE = re.compile(b"\n" + _HEADER_SOURCE)
+_VIOLATION_PATTERN = re.compile(_CHARACTER_SOURCE + b"|\n" + _HEADER_SOURCE)
+
+
+def normalize_text(text: str) -> str:
+    """Replace typographic dashes, spaces and quotes with their ASCII forms."""
+    if text.isascii():
+        return text
+    for character, replacement in _REPLACEMENT_PAIRS:
+        text = text.replace(character, replacement)
+    return text
+
+
+def normalize_part_header(line: str) -> str:
+    """Rewrite a Part heading as ``<hashes> Part <LETTER> <suffix>``.
+
+    Emphasis around ``Part`` and the letter is dropped, including the closing
+    marker of emphasis that spans the whole heading. Other lines and the line
+    ending are returned unchanged.
+    """
+    body = line.rstrip("\r\n")
+    match = PART_HEADER_PATTERN.match(body)
+    if match is None:
+        return line
+    hashes, opening, letter, closing, suffix = match.groups()
+    suffix = suffix.strip()
+    if opening and not closing and suffix.endswith(opening):
+        suffix = suffix[: -len(opening)].rstrip()
+    header = f"{hashes} Part {letter.upper()}"
+    if suffix:
+        header = f"{header} {suffix}"
+    return header + line[len(body) :]
+
+
+def normalize_line(line: str) -> str:
+    """Apply every PF-7 normalization to one line."""
+    line = normalize_text(line)
+    if line.startswith("#"):
+        line = normalize_part_header(line)
+    return line
+
+
+@dataclass
+class NormalizationStats:
+    lines: int = 0
+    changed_lines: int = 0
+    part_headers: int = 0
+
+
+def iter_normalized(
+    lines: Iterable[str], stats: NormalizationStats | None = None
+) -> Iterator[str]:
+    """Yield ``lines`` normalized, counting changes into ``stats`` if given."""
+    if stats is None:
+        stats = NormalizationStats()
+    for line in lines:
+        stats.lines += 1
+        if line.isascii():
+            if line.startswith("#"):
+                normalized = normalize_part_header(line)
+                if normalized != line:
+                    stats.changed_lines += 1
+                    stats.part_headers += 1
+                    line = normalized
+            yield line
+            continue
+        normalized = normalize_text(line)
+        if normalized.startswith("#"):
+            header = normalize_part_header(normalized)
+            if header != normalized:
+                stats.part_headers += 1
+                normalized = header
+        if normalized != line:
+            stats.changed_lines += 1
+        yield normalized
+
+
+@dataclass(frozen=True)
+class TypographyViolation:
+    line: int
+    column: int
+    reason: str
+
+
+def _character_reason(character: str) -> str:
+    import unicodedata
+
+    return f"U+{ord(character):04X} {unicodedata.name(character).lower()}"
+
+
+def _header_violation(line: str) -> bool:
+    normalized = normalize_text(line)
+    return (
+        PART_HEADER_PATTERN.match(normalized) is not None
+        and normalize_part_header(normalized) != normalized
+    )
+
+
+def plan_check_chunks(
+    data: bytes | mmap.mmap, chunk_size: int = CHECK_CHUNK_SIZE
+) -> list[tuple[int, int]]:
+    """Split ``data`` into ``(start, end)`` ranges that each end after a newline."""
+    chunks = []
+    start = 0
+    size = len(data)
+    while start < size:
+        end = data.find(b"\n", min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+def _check_header(data: bytes, start: int, line: int, violations: list) -> None:
+    end = data.find(b"\n", start)
+    header = data[start : None if end == -1 else end].decode("utf-8", "replace")
+    if _header_violation(header):
+        violations.append(TypographyViolation(line, 1, "Part header not normalized"))
+
+
+def scan_chunk(data: bytes) -> tuple[int, list[TypographyViolation]]:
+    """Newline count of ``data`` and its violations, with lines counted from 1.
+
+    ``data`` must start at the beginning of a line. A pure-ASCII chunk cannot
+    hold typographic characters, so only its headings are looked at.
+    """
+    violations: list[TypographyViolation] = []
+    reasons: dict[bytes, str] = {}
+    if _HEADER_AT_START.match(data):
+        _check_header(data, 0, 1, violations)
+    pattern = _HEADER_CANDIDATE if data.isascii() else _VIOLATION_PATTERN
+    line = 1
+    line_start = 0
+    position = 0
+    for match in pattern.finditer(data):
+        start = match.start()
+        is_header = data[start] == 0x0A
+        if is_header:
+            start += 1
+        newlines = data.count(b"\n", position, start)
+        if newlines:
+            line += newlines
+            line_start = data.rfind(b"\n", position, start) + 1
+        position = start
+        if is_header:
+            _check_header(data, start, line, violations)
+        else:
+            column = len(data[line_start:start].decode("utf-8", "replace")) + 1
+            character = match.group()
+            reason = reasons.get(character)
+            if reason is None:
+                reason = reasons[character] = _character_reason(character.decode("utf-8"))
+            violations.append(TypographyViolation(line, column, reason))
+    return data.count(b"\n"), violations
+
+
+def scan_file_chunk(path: str, start: int, end: int) -> tuple[int, list[TypographyViolation]]:
+    """Process pool entry point: scan bytes ``start:end`` of the file at ``path``."""
+    with open(path, "rb") as handle:
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return scan_chunk(data[start:end])
+
+
+def offset_violations(
+    results: Iterable[tuple[int, list[TypographyViolation]]],
+) -> Iterator[TypographyViolation]:
+    """Turn per-chunk results, in file order, into file line numbers.
+
+    Each chunk's first line number is one plus the newlines in all chunks
+    before it.
+    """
+    lines_before = 0
+    for newlines, violations in results:
+        for violation in violations:
+            yield TypographyViolation(
+                violation.line + lines_before, violation.column, violation.reason
+            )
+        lines_before += newlines
@@ -0,0 +1,77 @@
+import re
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+from benchmarks.bench import compare_results
+from benchmarks.specgen import format_size, iter_spec_chunks, parse_size, write_spec
+
+
+class TestSpecGenerator(unittest.TestCase):
+    def test_output_is_deterministic_and_close_to_size(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            first = write_spec(Path(tmp_dir) / "first.md", 256 * 1024, seed=3)
+            second = write_spec(Path(tmp_dir) / "second.md", 256 * 1024, seed=3)
+            other = write_spec(Path(tmp_dir) / "other.md", 256 * 1024, seed=4)
+
+            self.assertEqual(first.read_bytes(), second.read_bytes())
+            self.assertNotEqual(first.read_bytes(), other.read_bytes())
+            self.assertAlmostEqual(first.stat().st_size, 256 * 1024, delta=16 * 1024)
+
+    def test_output_has_fpf_structure(self) -> None:
+        text = "".join(iter_spec_chunks(200 * 1024))
+        parts = [fpf.parse_section_id(title) for title in re.findall(r"^# (.*)$", text, re.M)]
+
+        self.assertEqual(parts[1:], list("ABCDEFGHIJK"))
+        self.assertRegex(text, r"(?m)^### A\.1\.2 Problem$")
+        self.assertRegex(text, r"(?m)^#### [A-K]\.\d+\.\d+\.1 Worked example$")
+        for needle in ("SoTA‑Echoing", "Forces", "|---|", " ", "—", "MUST"):
+            with self.subTest(needle=needle):
+                self.assertIn(needle, text)
+
+    def test_generated_spec_exercises_strip_and_split(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = write_spec(Path(tmp_dir) / "FPF-Spec.md", 128 * 1024)
+
+            stats = fpf.compress_fpf(spec_path, Path(tmp_dir) / "lite.md", aggressive=False)
+            parts = fpf.split_fpf(spec_path, Path(tmp_dir))
+
+            self.assertGreater(stats.removed_counts.get("SoTA-Echoing", 0), 0)
+            self.assertEqual(len(parts), 12)
+
+    def test_sizes_round_trip(self) -> None:
+        self.assertEqual(parse_size("1MB"), 1024 * 1024)
+        self.assertEqual(parse_size("1.5k"), 1536)
+        self.assertEqual(parse_size("1GB"), 1024**3)
+        self.assertEqual(format_size(parse_size("64MB")), "64MB")
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+
+class TestCompareResults(unittest.TestCase):
+    def results(self, mb_per_s: float, peak_rss_mb: float) -> dict[str, object]:
+        return {
+            "results": [
+                {
+                    "command": "split",
+                    "size": "1MB",
+                    "mb_per_s": mb_per_s,
+                    "peak_rss_mb": peak_rss_mb,
+                }
+            ]
+        }
+
+    def test_flags_slowdown_and_memory_growth_beyond_tolerance(self) -> None:
+        baseline = self.results(100.0, 40.0)
+
+        self.assertEqual(compare_results(self.results(80.0, 45.0), baseline, 0.25), [])
+        [slow] = compare_results(self.results(70.0, 40.0), baseline, 0.25)
+        self.assertIn("split @ 1MB: 70.0 MB/s", slow)
+        [rss] = compare_results(self.results(100.0, 80.0), baseline, 0.25)
+        self.assertIn("peak RSS 80.0 MB", rss)
+        self.assertEqual(compare_results(self.results(1.0, 1.0), {"results": []}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+SPEC = (
+    "Preface\n"
+    "# Part A - Kernel\n"
+    "## A.1 Holon\n"
+    "holon\n"
+    "### SoTA-Echoing\n"
+    "echo\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+)
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = TemporaryDirectory()
+        self.work_dir = Path(self._tmp_dir.name)
+        (self.work_dir / "FPF-Spec.md").write_text(SPEC, encoding="utf-8")
+        self.profiles_dir = self.work_dir / "profiles"
+        self.profiles_dir.mkdir()
+        (self.profiles_dir / "kernel.yaml").write_text(
+            "output_file: kernel.md\nparts:\n- FPF-Part-A.md\n", encoding="utf-8"
+        )
+        (self.profiles_dir / "lite.yaml").write_text(
+            "output_file: lite-b.md\nparts:\n- FPF-Spec-Lite.md\n- FPF-Part-B.md\n",
+            encoding="utf-8",
+        )
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def run_build(self, *extra: str) -> tuple[int, str, str]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        argv = [
+            "build",
+            "--work-dir",
+            str(self.work_dir),
+            "--profiles-dir",
+            str(self.profiles_dir),
+            "--skip-download",
+            *extra,
+        ]
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_code = fpf.main(argv)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_graph_orders_profiles_after_their_inputs(self) -> None:
+        nodes = {node.name: node for node in fpf.build_graph(self.profiles_dir)}
+        self.assertEqual(nodes["split"].deps, ("download",))
+        self.assertEqual(nodes["assemble:kernel"].deps, ("split",))
+        self.assertEqual(nodes["assemble:lite"].deps, ("split", "strip-lite"))
+        offline = fpf.build_graph(self.profiles_dir, None)
+        self.assertNotIn("download", {node.name for node in offline})
+
+    def test_builds_all_targets_in_parallel_then_skips_them(self) -> None:
+        exit_code, stdout, stderr = self.run_build("--jobs", "2")
+
+        self.assertEqual(exit_code, 0, stderr)
+        self.assertEqual(stdout.count("rebuilt"), 5)
+        self.assertIn("Built 5 targets in", stdout)
+        self.assertEqual(
+            (self.work_dir / "kernel.md").read_text(encoding="utf-8"),
+            "# Part A - Kernel\n## A.1 Holon\nholon\n### SoTA-Echoing\necho\n",
+        )
+        lite_b = (self.work_dir / "lite-b.md").read_text(encoding="utf-8")
+        self.assertTrue(
+            lite_b.endswith("\n# Part B - Reasoning\n## B.1 Aggregation\naggregation\n")
+        )
+
+        # Stamps saved by the worker processes are merged, not overwritten.
+        exit_code, stdout, _ = self.run_build("--jobs", "2")
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout.count("up to date"), 5)
+
+    def test_graph_file_replaces_the_default_graph(self) -> None:
+        graph_path = self.profiles_dir / "graph.yaml"
+        graph_path.write_text(
+            "nodes:\n"
+            "- {name: fetch, command: download}\n"
+            "- {name: split, command: split, deps: [fetch]}\n"
+            "- {name: kernel, command: assemble, argument: kernel.yaml, deps: [split]}\n",
+            encoding="utf-8",
+        )
+        nodes = fpf.load_build_graph(graph_path, "https://example.test/spec.md")
+        self.assertEqual(nodes[0].argument, "https://example.test/spec.md")
+        self.assertEqual(nodes[2].argument, str(self.profiles_dir / "kernel.yaml"))
+
+        exit_code, stdout, stderr = self.run_build("--graph", str(graph_path), "--jobs", "1")
+
+        self.assertEqual(exit_code, 0, stderr)
+        self.assertEqual(stdout.count("rebuilt"), 2)
+        self.assertIn("kernel", stdout)
+        self.assertTrue((self.work_dir / "kernel.md").exists())
+        self.assertFalse((self.work_dir / "lite-b.md").exists())
+
+        for body, message in (
+            ("nodes:\n- {name: a, command: split, deps: [b]}\n", "Unknown dependency b"),
+            (
+                "nodes:\n- {name: a, command: split, deps: [b]}\n"
+                "- {name: b, command: split, deps: [a]}\n",
+                "cycle through a, b",
+            ),
+            ("nodes:\n- {name: a, command: compile}\n", "Invalid build graph node 'a'"),
+        ):
+            graph_path.write_text(body, encoding="utf-8")
+            exit_code, _, stderr = self.run_build("--graph", str(graph_path))
+            self.assertEqual(exit_code, 1)
+            self.assertIn(message, stderr)
+
+    def test_graph_file_nodes_are_sorted_by_dependency(self) -> None:
+        graph_path = self.profiles_dir / "graph.yaml"
+        graph_path.write_text(
+            "nodes:\n"
+            "- {name: kernel, command: assemble, argument: kernel.yaml, deps: [split]}\n"
+            "- {name: split, command: split}\n",
+            encoding="utf-8",
+        )
+
+        nodes = fpf.load_build_graph(graph_path, None)
+
+        self.assertEqual([node.name for node in nodes], ["split", "kernel"])
+        results = [fpf.NodeResult(node.name, "rebuilt", 5.0) for node in nodes]
+        self.assertEqual(fpf.critical_path_seconds(nodes, results), 10.0)
+
+    def test_failed_target_skips_its_dependents(self) -> None:
+        nodes = [
+            fpf.BuildNode("split", "split"),
+            fpf.BuildNode("assemble:missing", "assemble", "missing.yaml", ("split",)),
+            fpf.BuildNode("after", "assemble", "missing.yaml", ("assemble:missing",)),
+            fpf.BuildNode("orphan", "split", deps=("unknown",)),
+        ]
+
+        results = fpf.run_build(nodes, fpf.BuildOptions(self.work_dir), jobs=1)
+
+        self.assertEqual(
+            [result.status for result in results], ["rebuilt", "failed", "skipped", "skipped"]
+        )
+        self.assertIn("Manifest file not found", results[1].error)
+        self.assertEqual(
+            fpf.critical_path_seconds(nodes, results), results[0].seconds + results[1].seconds
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+SPEC_V1 = (
+    "Preface\n"
+    "# Part A - Kernel\n"
+    "## A.1 Holon\n"
+    "holon\n"
+    "### A.1.1 Boundary\n"
+    "boundary\n"
+    "## A.2 Role\n"
+    "role\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+)
+SPEC_V2 = SPEC_V1.replace("role\n", "role, revised\n")
+PARTS = ["FPF-Part-Preface.md", "FPF-Part-A.md", "FPF-Part-B.md"]
+
+
+def chunk_files(work_dir: Path) -> set[Path]:
+    chunks_dir = work_dir / fpf.STORE_DIR_NAME / "chunks"
+    return {path for path in chunks_dir.rglob("*") if path.is_file()}
+
+
+class TestChunkStore(unittest.TestCase):
+    def run_main(self, argv: list[str]) -> tuple[int, str, str]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_code = fpf.main(argv)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def store_versions(self, work_dir: Path) -> list[str]:
+        versions = []
+        for name, text in (("FPF-Spec-v1.md", SPEC_V1), ("FPF-Spec-v2.md", SPEC_V2)):
+            (work_dir / name).write_text(text, encoding="utf-8")
+            exit_code, stdout, _ = self.run_main(
+                ["split", "--work-dir", str(work_dir), "--input", name, "--store"]
+            )
+            self.assertEqual(exit_code, 0)
+            versions.append(stdout.split("Stored version ")[1].split()[0])
+        return versions
+
+    def write_manifest(self, work_dir: Path, name: str, body: str) -> None:
+        parts = "".join(f"- {part}\n" for part in PARTS)
+        (work_dir / name).write_text(f"parts:\n{parts}{body}", encoding="utf-8")
+
+    def test_versions_share_unchanged_section_chunks(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec-v1.md").write_text(SPEC_V1, encoding="utf-8")
+            self.run_main(["split", "--work-dir", tmp_dir, "--input", "FPF-Spec-v1.md", "--store"])
+            first = chunk_files(work_dir)
+            self.assertEqual(len(first), 7)
+
+            versions = self.store_versions(work_dir)
+
+            # Only the changed section A.2 adds a chunk; no part files are written.
+            self.assertEqual(len(chunk_files(work_dir) - first), 1)
+            self.assertFalse(any((work_dir / name).exists() for name in PARTS))
+            self.assertEqual(versions[0], fpf.file_digest(work_dir / "FPF-Spec-v1.md"))
+            for version in versions:
+                self.assertTrue(fpf.ChunkStore(work_dir).version_path(version).exists())
+
+    def test_assemble_resolves_pinned_and_current_versions(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            versions = self.store_versions(work_dir)
+            self.write_manifest(
+                work_dir,
+                "old.yaml",
+                "output_file: old.md\nbaseline_file: FPF-Spec-v1.md\n"
+                f"version: '{versions[0][:12]}'\n",
+            )
+            self.write_manifest(
+                work_dir,
+                "current.yaml",
+                "output_file: current.md\nbaseline_file: FPF-Spec-v2.md\n",
+            )
+            (work_dir / "FPF-Spec-v1.md").unlink()
+
+            for manifest in ("old.yaml", "current.yaml"):
+                exit_code, stdout, stderr = self.run_main(
+                    ["assemble", "--manifest", manifest, "--work-dir", tmp_dir]
+                )
+                self.assertEqual(exit_code, 0, stderr)
+                self.assertIn("Reduction: 0.0%", stdout)
+
+            self.assertEqual((work_dir / "old.md").read_text(encoding="utf-8"), SPEC_V1)
+            self.assertEqual((work_dir / "current.md").read_text(encoding="utf-8"), SPEC_V2)
+
+    def test_stored_split_takes_precedence_over_stale_part_files(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SPEC_V1, encoding="utf-8")
+            self.write_manifest(work_dir, "full.yaml", "output_file: full.md\n")
+            assemble = ["assemble", "--manifest", "full.yaml", "--work-dir", tmp_dir]
+            self.run_main(["split", "--work-dir", tmp_dir])
+            self.run_main(assemble)
+
+            (work_dir / "FPF-Spec.md").write_text(SPEC_V2, encoding="utf-8")
+            self.run_main(["split", "--work-dir", tmp_dir, "--store"])
+            exit_code, stdout, stderr = self.run_main(assemble)
+
+            self.assertEqual(exit_code, 0, stderr)
+            self.assertNotIn("Up to date", stdout)
+            self.assertEqual((work_dir / "full.md").read_text(encoding="utf-8"), SPEC_V2)
+
+    def test_section_filters_and_profiles_read_stored_parts(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            versions = self.store_versions(work_dir)
+            profiles_dir = work_dir / "profiles"
+            profiles_dir.mkdir()
+            self.write_manifest(
+                profiles_dir,
+                "old.yaml",
+                f"output_file: old.md\nversion: '{versions[0]}'\nexclude_sections:\n- A.1\n",
+            )
+            self.write_manifest(
+                profiles_dir, "new.yaml", "output_file: new.md\nexclude_sections:\n- A.1\n"
+            )
+
+            exit_code, _, stderr = self.run_main(
+                [
+                    "assemble",
+                    "--all-profiles",
+                    "--profiles-dir",
+                    str(profiles_dir),
+                    "--work-dir",
+                    tmp_dir,
+                ]
+            )
+
+            self.assertEqual(exit_code, 0, stderr)
+            without_a1 = "## A.1 Holon\nholon\n### A.1.1 Boundary\nboundary\n"
+            self.assertEqual(
+                (work_dir / "old.md").read_text(encoding="utf-8"), SPEC_V1.replace(without_a1, "")
+            )
+            self.assertEqual(
+                (work_dir / "new.md").read_text(encoding="utf-8"), SPEC_V2.replace(without_a1, "")
+            )
+
+    def test_unknown_version_and_missing_chunk_fail(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            self.store_versions(work_dir)
+            self.write_manifest(work_dir, "pinned.yaml", "output_file: out.md\nversion: 'ffff'\n")
+            exit_code, _, stderr = self.run_main(
+                ["assemble", "--manifest", "pinned.yaml", "--work-dir", tmp_dir]
+            )
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Stored version not found: ffff", stderr)
+
+            for path in chunk_files(work_dir):
+                path.unlink()
+            self.write_manifest(work_dir, "current.yaml", "output_file: out.md\n")
+            exit_code, _, stderr = self.run_main(
+                ["assemble", "--manifest", "current.yaml", "--work-dir", tmp_dir]
+            )
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Chunk not found in store", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+SAMPLE_SPEC = (
+    "Preface line\n"
+    "# Part A\n"
+    "## A.1 Holons\n"
+    "Body A.1\n"
+    "### SoTA-Echoing\n"
+    "Echo\n"
+    "# Part B\n"
+    "B line\n"
+)
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def run_cli(self, *argv: str) -> str:
+        buffer = io.StringIO()
+        with redirect_stdout(buffer), redirect_stderr(io.StringIO()):
+            exit_code = fpf.main(list(argv))
+        self.assertEqual(exit_code, 0)
+        return buffer.getvalue()
+
+    def age(self, path: Path) -> int:
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+        return path.stat().st_mtime_ns
+
+    def test_strip_skips_up_to_date_targets(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            spec_path = work_dir / "FPF-Spec.md"
+            spec_path.write_text(SAMPLE_SPEC, encoding="utf-8")
+            lite_path = work_dir / "FPF-Spec-Lite.md"
+
+            first = self.run_cli("strip", "--work-dir", tmp_dir)
+            self.assertEqual(first.count("Wrote"), 2)
+            lite_mtime = lite_path.stat().st_mtime_ns
+
+            second = self.run_cli("strip", "--work-dir", tmp_dir)
+            self.assertEqual(second.count("Up to date"), 2)
+            self.assertEqual(second.count("Stats for"), 2)
+            self.assertEqual(
+                [line for line in first.splitlines() if line.startswith("Lines")],
+                [line for line in second.splitlines() if line.startswith("Lines")],
+            )
+            self.assertEqual(lite_path.stat().st_mtime_ns, lite_mtime)
+
+            lite_mtime = self.age(lite_path)
+            third = self.run_cli("strip-lite", "--work-dir", tmp_dir)
+            self.assertIn("Wrote", third)
+            self.assertEqual(lite_path.stat().st_mtime_ns, lite_mtime)
+
+            # The preface and SoTA-Echoing are not in the lite output: only the
+            # stats follow the new spec.
+            spec_path.write_text(
+                "Other preface\n" + SAMPLE_SPEC.replace("Echo\n", "Echo 2\n"), encoding="utf-8"
+            )
+            lite_mtime = lite_path.stat().st_mtime_ns
+            fourth = self.run_cli("strip-lite", "--work-dir", tmp_dir)
+            self.assertIn("Up to date", fourth)
+            self.assertIn("Lines: 9 -> 5", fourth)
+            self.assertEqual(lite_path.stat().st_mtime_ns, lite_mtime)
+
+            spec_path.write_text(SAMPLE_SPEC.replace("B line", "B line 2"), encoding="utf-8")
+            self.assertIn("Wrote", self.run_cli("strip-lite", "--work-dir", tmp_dir))
+            self.assertIn("B line 2", lite_path.read_text(encoding="utf-8"))
+
+            self.assertIn("Wrote", self.run_cli("strip-lite", "--force", "--work-dir", tmp_dir))
+
+    def test_skipped_strip_prints_the_same_stats(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(
+                SAMPLE_SPEC + "## Zeta notes\nZ\n## Alpha notes\nA\n", encoding="utf-8"
+            )
+            (work_dir / "notes.yaml").write_text("keywords:\n- zeta\n- alpha\n", encoding="utf-8")
+            argv = ("strip", "--rules", str(work_dir / "notes.yaml"), "--work-dir", tmp_dir)
+
+            first = self.run_cli(*argv)
+            second = self.run_cli(*argv)
+
+            self.assertIn("  - zeta: 1 sections\n  - alpha: 1 sections\n", first)
+            self.assertIn("Up to date", second)
+            self.assertEqual(first.replace("Wrote", "Up to date:"), second)
+
+    def test_split_and_assemble_skip_when_inputs_unchanged(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SAMPLE_SPEC, encoding="utf-8")
+            (work_dir / "assemble.yaml").write_text(
+                "output_file: out.md\nparts:\n- FPF-Part-A.md\nbaseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+
+            self.assertIn("Wrote", self.run_cli("split", "--work-dir", tmp_dir))
+            self.assertIn("Up to date", self.run_cli("split", "--work-dir", tmp_dir))
+
+            assemble = ["assemble", "--manifest", "assemble.yaml", "--work-dir", tmp_dir]
+            first = self.run_cli(*assemble)
+            self.assertNotIn("Up to date", first)
+            second = self.run_cli(*assemble)
+            self.assertIn("Up to date", second)
+            self.assertIn("Lines: 8 -> 5", second)
+
+            (work_dir / "FPF-Part-A.md").write_text("# Part A\n", encoding="utf-8")
+            third = self.run_cli(*assemble)
+            self.assertNotIn("Up to date", third)
+            self.assertEqual((work_dir / "out.md").read_text(encoding="utf-8"), "# Part A\n")
+
+            (work_dir / "out.md").unlink()
+            self.assertNotIn("Up to date", self.run_cli(*assemble))
+            self.assertTrue((work_dir / "out.md").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
+import gzip
+import hashlib
 import io
+import json
+import threading
 import unittest
+import zlib
 from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
@@ -9,12 +15,13 @@ import fpf
 
 
 class FakeResponse:
-    def __init__(self, status: int, data: bytes) -> None:
+    def __init__(self, status: int, data: bytes, headers: dict[str, str] | None = None) -> None:
         self.status = status
-        self._data = data
+        self.headers = headers or {}
+        self._stream = io.BytesIO(data)
 
-    def read(self) -> bytes:
-        return self._data
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
 
     def __enter__(self):
         return self
@@ -30,7 +37,7 @@ class TestPF2Download(unittest.TestCase):
             data = b"spec contents"
 
             with patch(
-                "fpf.urllib.request.urlopen",
+                "urllib.request.urlopen",
                 return_value=FakeResponse(200, data),
             ) as mock_urlopen:
                 fpf.download_spec("https://example.test/spec.md", output_path)
@@ -39,12 +46,26 @@ class TestPF2Download(unittest.TestCase):
             self.assertEqual(output_path.read_bytes(), data)
             mock_urlopen.assert_called_once()
 
+    def test_malformed_content_length_is_ignored(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            data = b"spec contents"
+
+            with patch(
+                "urllib.request.urlopen",
+                return_value=FakeResponse(200, data, {"Content-Length": "13 bytes"}),
+            ):
+                report = fpf.download_spec("https://example.test/spec.md", output_path)
+
+            self.assertEqual(output_path.read_bytes(), data)
+            self.assertEqual(report.attempts, 1)
+
     def test_download_spec_http_error_raises(self) -> None:
         with TemporaryDirectory() as tmp_dir:
             output_path = Path(tmp_dir) / "FPF-Spec.md"
 
             with patch(
-                "fpf.urllib.request.urlopen",
+                "urllib.request.urlopen",
                 return_value=FakeResponse(404, b""),
             ):
                 with self.assertRaises(RuntimeError) as ctx:
@@ -58,7 +79,7 @@ class TestPF2Download(unittest.TestCase):
             data = b"spec contents"
 
             with patch(
-                "fpf.urllib.request.urlopen",
+                "urllib.request.urlopen",
                 return_value=FakeResponse(200, data),
             ):
                 buffer = io.StringIO()
@@ -82,7 +103,7 @@ class TestPF2Download(unittest.TestCase):
             output_path = Path(tmp_dir) / "FPF-Spec.md"
 
             with patch(
-                "fpf.urllib.request.urlopen",
+                "urllib.request.urlopen",
                 return_value=FakeResponse(404, b""),
             ):
                 buffer_out = io.StringIO()
@@ -103,5 +124,356 @@ class TestPF2Download(unittest.TestCase):
             self.assertFalse(output_path.exists())
 
 
+class SpecHandler(BaseHTTPRequestHandler):
+    body = b"# Part A\nspec body\n" * 1000
+    etag = '"v1"'
+    requests: list[dict[str, str]] = []
+
+    def do_GET(self) -> None:
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", "Mon, 06 Oct 2025 10:00:00 GMT")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class TestPF2DownloadHTTP(unittest.TestCase):
+    def setUp(self) -> None:
+        SpecHandler.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SpecHandler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/FPF-Spec.md"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_conditional_request_skips_transfer_on_304(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+
+            self.assertTrue(fpf.download_spec(self.url, output_path).downloaded)
+            self.assertEqual(output_path.read_bytes(), SpecHandler.body)
+            mtime = output_path.stat().st_mtime_ns
+
+            self.assertFalse(fpf.download_spec(self.url, output_path).downloaded)
+            self.assertEqual(output_path.stat().st_mtime_ns, mtime)
+            self.assertEqual(SpecHandler.requests[1].get("If-None-Match"), '"v1"')
+            self.assertEqual(
+                SpecHandler.requests[1].get("If-Modified-Since"),
+                "Mon, 06 Oct 2025 10:00:00 GMT",
+            )
+            self.assertEqual(
+                sorted(path.name for path in Path(tmp_dir).iterdir()),
+                ["FPF-Spec.md", "FPF-Spec.md.http.json"],
+            )
+
+    def test_sha256_pin_mismatch_keeps_existing_file(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            output_path.write_bytes(b"old spec")
+            expected = hashlib.sha256(SpecHandler.body).hexdigest()
+
+            with self.assertRaises(RuntimeError) as ctx:
+                fpf.download_spec(self.url, output_path, sha256="0" * 64)
+
+            self.assertIn("SHA-256 mismatch", str(ctx.exception))
+            self.assertEqual(output_path.read_bytes(), b"old spec")
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [output_path])
+
+            self.assertTrue(
+                fpf.download_spec(self.url, output_path, sha256=expected.upper()).downloaded
+            )
+            self.assertEqual(output_path.read_bytes(), SpecHandler.body)
+
+    def test_modified_or_unpinned_local_file_is_downloaded_again(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            fpf.download_spec(self.url, output_path)
+
+            output_path.write_bytes(b"edited locally")
+            self.assertTrue(fpf.download_spec(self.url, output_path).downloaded)
+            self.assertIsNone(SpecHandler.requests[1].get("If-None-Match"))
+            self.assertEqual(output_path.read_bytes(), SpecHandler.body)
+
+            pin = hashlib.sha256(b"another revision").hexdigest()
+            with self.assertRaises(RuntimeError) as ctx:
+                fpf.download_spec(self.url, output_path, sha256=pin)
+            self.assertIn("SHA-256 mismatch", str(ctx.exception))
+            self.assertIsNone(SpecHandler.requests[2].get("If-None-Match"))
+
+    def test_main_reports_not_modified(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            argv = ["download", "--url", self.url, "--work-dir", tmp_dir]
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(fpf.main(argv), 0)
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                self.assertEqual(fpf.main(argv), 0)
+
+            self.assertIn("Not modified", buffer.getvalue())
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = bytes(range(256)) * 4096
+    etag = '"r1"'
+    cut_after: list[int] = []
+    # Bytes to serve before the requested range start, one entry per request.
+    range_shift: list[int] = []
+    requests: list[dict[str, str]] = []
+
+    def do_GET(self) -> None:
+        type(self).requests.append(dict(self.headers))
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == self.etag:
+            start = int(range_header.split("=", 1)[1].rstrip("-"))
+            if type(self).range_shift:
+                start -= type(self).range_shift.pop(0)
+        payload = self.body[start:]
+        self.send_response(206 if start else 200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(payload)))
+        if start:
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(self.body) - 1}/{len(self.body)}"
+            )
+        self.end_headers()
+        if type(self).cut_after:
+            self.wfile.write(payload[: type(self).cut_after.pop(0)])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class TestPF2DownloadResume(unittest.TestCase):
+    def setUp(self) -> None:
+        RangeHandler.requests = []
+        RangeHandler.cut_after = []
+        RangeHandler.range_shift = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/FPF-Spec.md"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_interrupted_transfer_resumes_with_range(self) -> None:
+        RangeHandler.cut_after = [300_000, 200_000]
+        expected = hashlib.sha256(RangeHandler.body).hexdigest()
+
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            with patch("fpf.time.sleep") as sleep:
+                report = fpf.download_spec(self.url, output_path, sha256=expected, backoff=0.5)
+
+            self.assertEqual(output_path.read_bytes(), RangeHandler.body)
+            self.assertEqual(report.attempts, 3)
+            self.assertEqual(report.resumed_from, 500_000)
+            self.assertEqual(report.bytes_transferred, len(RangeHandler.body))
+            self.assertEqual(report.attempt_bytes, len(RangeHandler.body) - 500_000)
+            self.assertLessEqual(report.ttfb_seconds, report.attempt_seconds)
+            self.assertLessEqual(report.attempt_seconds, report.seconds)
+            self.assertAlmostEqual(
+                report.bytes_per_second, report.attempt_bytes / report.attempt_seconds
+            )
+            self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0])
+            self.assertEqual(RangeHandler.requests[1]["Range"], "bytes=300000-")
+            self.assertEqual(RangeHandler.requests[2]["Range"], "bytes=500000-")
+            self.assertEqual(RangeHandler.requests[2]["If-Range"], '"r1"')
+            self.assertEqual(
+                sorted(path.name for path in Path(tmp_dir).iterdir()),
+                ["FPF-Spec.md", "FPF-Spec.md.http.json"],
+            )
+
+    def test_misaligned_range_restarts_from_scratch(self) -> None:
+        RangeHandler.cut_after = [300_000]
+        RangeHandler.range_shift = [1_000]
+
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            with patch("fpf.time.sleep"):
+                report = fpf.download_spec(self.url, output_path)
+
+            self.assertEqual(output_path.read_bytes(), RangeHandler.body)
+            self.assertEqual(report.attempts, 3)
+            self.assertEqual(report.resumed_from, 0)
+            self.assertEqual(RangeHandler.requests[1]["Range"], "bytes=300000-")
+            self.assertNotIn("Range", RangeHandler.requests[2])
+
+    def test_partial_file_is_resumed_by_next_run_and_reported(self) -> None:
+        RangeHandler.cut_after = [100_000]
+
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            with self.assertRaises(RuntimeError):
+                fpf.download_spec(self.url, output_path, retries=0)
+            self.assertFalse(output_path.exists())
+            self.assertEqual((Path(tmp_dir) / "FPF-Spec.md.part").stat().st_size, 100_000)
+
+            report_path = Path(tmp_dir) / "report.json"
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(
+                    [
+                        "download",
+                        "--url",
+                        self.url,
+                        "--work-dir",
+                        tmp_dir,
+                        "--report",
+                        str(report_path),
+                    ]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(output_path.read_bytes(), RangeHandler.body)
+            report = json.loads(report_path.read_text(encoding="utf-8"))
+            self.assertEqual(report["resumed_from"], 100_000)
+            self.assertEqual(report["bytes_transferred"], len(RangeHandler.body) - 100_000)
+            self.assertGreater(report["bytes_per_second"], 0)
+            self.assertIn("TTFB", buffer.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
+
+
+class EncodingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"".join(b"## A.%d Section\nrepeated spec text\n" % i for i in range(20_000))
+    etag = '"e1"'
+    encoding = "gzip"
+    raw_deflate = False
+    cut_after: list[int] = []
+    requests: list[dict[str, str]] = []
+
+    def do_GET(self) -> None:
+        type(self).requests.append(dict(self.headers))
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == self.etag:
+            start = int(range_header.split("=", 1)[1].rstrip("-"))
+        payload = self.body[start:]
+        encoding = None
+        if not start and self.encoding in self.headers.get("Accept-Encoding", ""):
+            encoding = self.encoding
+            if encoding == "gzip":
+                payload = gzip.compress(payload)
+            elif encoding == "deflate" and type(self).raw_deflate:
+                compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+                payload = compressor.compress(payload) + compressor.flush()
+            else:
+                payload = zlib.compress(payload)
+        self.send_response(206 if start else 200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(payload)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if start:
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(self.body) - 1}/{len(self.body)}"
+            )
+        self.end_headers()
+        if type(self).cut_after:
+            self.wfile.write(payload[: type(self).cut_after.pop(0)])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class TestPF2DownloadEncoding(unittest.TestCase):
+    def setUp(self) -> None:
+        EncodingHandler.requests = []
+        EncodingHandler.cut_after = []
+        EncodingHandler.encoding = "gzip"
+        EncodingHandler.raw_deflate = False
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), EncodingHandler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/FPF-Spec.md"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_gzip_body_is_decoded_and_hashed_while_streaming(self) -> None:
+        expected = hashlib.sha256(EncodingHandler.body).hexdigest()
+
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            report = fpf.download_spec(self.url, output_path, sha256=expected)
+
+            self.assertEqual(output_path.read_bytes(), EncodingHandler.body)
+            self.assertEqual(report.content_encoding, "gzip")
+            self.assertEqual(report.total_bytes, len(EncodingHandler.body))
+            self.assertLess(report.bytes_transferred * 4, len(EncodingHandler.body))
+            self.assertEqual(EncodingHandler.requests[0]["Accept-Encoding"], "gzip, deflate")
+
+    def test_deflate_with_and_without_zlib_wrapper(self) -> None:
+        EncodingHandler.encoding = "deflate"
+        for raw in (False, True):
+            with self.subTest(raw=raw), TemporaryDirectory() as tmp_dir:
+                EncodingHandler.raw_deflate = raw
+                output_path = Path(tmp_dir) / "FPF-Spec.md"
+                report = fpf.download_spec(self.url, output_path)
+
+                self.assertEqual(output_path.read_bytes(), EncodingHandler.body)
+                self.assertEqual(report.content_encoding, "deflate")
+
+    def test_identity_fallback_when_server_does_not_compress(self) -> None:
+        EncodingHandler.encoding = "br"
+
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            report = fpf.download_spec(self.url, output_path)
+
+            self.assertEqual(output_path.read_bytes(), EncodingHandler.body)
+            self.assertIsNone(report.content_encoding)
+            self.assertEqual(report.bytes_transferred, len(EncodingHandler.body))
+
+    def test_truncated_gzip_transfer_resumes_as_identity_range(self) -> None:
+        EncodingHandler.cut_after = [5_000]
+        expected = hashlib.sha256(EncodingHandler.body).hexdigest()
+
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "FPF-Spec.md"
+            with patch("fpf.time.sleep"):
+                report = fpf.download_spec(self.url, output_path, sha256=expected)
+
+            self.assertEqual(output_path.read_bytes(), EncodingHandler.body)
+            self.assertEqual(report.attempts, 2)
+            self.assertGreater(report.resumed_from, 0)
+            self.assertIsNone(report.content_encoding)
+            self.assertEqual(EncodingHandler.requests[1]["Accept-Encoding"], "identity")
+            self.assertEqual(
+                EncodingHandler.requests[1]["Range"], f"bytes={report.resumed_from}-"
+            )
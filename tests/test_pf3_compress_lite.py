@@ -8,7 +8,71 @@ from tempfile import TemporaryDirectory
 import fpf
 
 
+SAMPLE_SPEC = (
+    "Preface line\n"
+    "# Part A\n"
+    "## A.1 Holons\n"
+    "Body A.1\n"
+    "### A.1:4 SoTA\u2011Echoing\n"
+    "Echo body\n"
+    "### A.1:5 Forces\n"
+    "Forces body\n"
+    "#### Forces detail\n"
+    "Detail body\n"
+    "## A.2 Roles\n"
+    "Body A.2\n"
+)
+
+
 class TestPF3CompressLite(unittest.TestCase):
+    def test_compress_variants_match_single_variant_runs(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            input_path = work_dir / "FPF-Spec.md"
+            input_path.write_text(SAMPLE_SPEC, encoding="utf-8")
+
+            lite_stats, aggressive_stats = fpf.compress_fpf_variants(
+                input_path,
+                [
+                    fpf.CompressionVariant(work_dir / "lite.md", fpf.load_builtin_rules(False)),
+                    fpf.CompressionVariant(
+                        work_dir / "aggressive.md", fpf.load_builtin_rules(True)
+                    ),
+                ],
+            )
+            single_lite = fpf.compress_fpf(input_path, work_dir / "single-lite.md", False)
+            single_aggressive = fpf.compress_fpf(
+                input_path, work_dir / "single-aggressive.md", True
+            )
+
+            self.assertEqual(lite_stats, single_lite)
+            self.assertEqual(aggressive_stats, single_aggressive)
+            self.assertEqual(
+                (work_dir / "lite.md").read_text(encoding="utf-8"),
+                (work_dir / "single-lite.md").read_text(encoding="utf-8"),
+            )
+            self.assertEqual(
+                (work_dir / "aggressive.md").read_text(encoding="utf-8"),
+                "# Part A\n## A.1 Holons\nBody A.1\n## A.2 Roles\nBody A.2\n",
+            )
+            self.assertEqual(lite_stats.removed_counts["SoTA-Echoing"], 1)
+            self.assertEqual(aggressive_stats.removed_counts["Forces"], 1)
+            self.assertEqual(lite_stats.original_lines, 12)
+
+    def test_strip_writes_both_variants(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SAMPLE_SPEC, encoding="utf-8")
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(["strip", "--work-dir", str(work_dir)])
+
+            self.assertEqual(exit_code, 0)
+            self.assertTrue((work_dir / "FPF-Spec-Lite.md").exists())
+            self.assertTrue((work_dir / "FPF-Spec-Aggressive.md").exists())
+            self.assertEqual(buffer.getvalue().count("Stats for"), 2)
+
     @unittest.skipUnless(
         Path("FPF/FPF-Spec.md").exists(),
         "Requires FPF/FPF-Spec.md. Run `./fpf-cli download` first.",
@@ -0,0 +1,166 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+SAMPLE_SPEC = (
+    "# Part A\n"
+    "## A.0 Onboarding Glossary\n"
+    "Glossary body\n"
+    "## A.1 Holons\n"
+    "Body A.1\n"
+    "### A.1.2 Creative Abduction with NQD\n"
+    "NQD body\n"
+    "## A.2 Roles\n"
+    "Body A.2\n"
+    "#### Deep Forces note\n"
+    "Deep body\n"
+    "# Part C\n"
+    "## C.17 Creativity-CHR\n"
+    "C.17 body\n"
+    "## C.18 NQD-CAL\n"
+    "C.18 body\n"
+    "## C.2 KD-CAL\n"
+    "C.2 body\n"
+)
+
+
+class TestPF3CompressRules(unittest.TestCase):
+    def compress(self, work_dir: Path, rules: fpf.RemovalRules) -> tuple[str, fpf.CompressionStats]:
+        input_path = work_dir / "FPF-Spec.md"
+        input_path.write_text(SAMPLE_SPEC, encoding="utf-8")
+        output_path = work_dir / "out.md"
+        stats = fpf.compress_fpf(input_path, output_path, aggressive=False, rules=rules)
+        return output_path.read_text(encoding="utf-8"), stats
+
+    def test_parse_section_id(self) -> None:
+        self.assertEqual(fpf.parse_section_id("A.0 — Onboarding"), "A.0")
+        self.assertEqual(fpf.parse_section_id("**B.5.2.1 Creative Abduction**"), "B.5.2.1")
+        self.assertEqual(fpf.parse_section_id("**Part c – Calculi**"), "C")
+        self.assertEqual(fpf.parse_section_id("A.1:4.1 Echo"), "A.1:4.1")
+        self.assertIsNone(fpf.parse_section_id("Problem frame"))
+        self.assertIsNone(fpf.parse_section_id("Partial results"))
+
+    def test_section_id_globs_remove_chapters(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            rules = fpf.RemovalRules(name="custom", section_ids=("C.1[78]", "A.0"))
+            result, stats = self.compress(Path(tmp_dir), rules)
+
+        self.assertNotIn("C.17", result)
+        self.assertNotIn("C.18", result)
+        self.assertNotIn("Glossary body", result)
+        self.assertIn("## C.2 KD-CAL\n", result)
+        self.assertEqual(stats.removed_counts, {"C.1[78]": 2, "A.0": 1})
+
+    def test_patterns_and_level_limits(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            rules = fpf.RemovalRules(
+                name="custom",
+                keywords=("forces",),
+                patterns=(r"\bNQD\b",),
+                max_level=3,
+            )
+            result, stats = self.compress(Path(tmp_dir), rules)
+
+        self.assertNotIn("NQD body", result)
+        self.assertNotIn("C.18 body", result)
+        self.assertIn("Deep body", result)
+        self.assertEqual(stats.removed_counts, {"forces": 0, r"\bNQD\b": 2})
+
+    def test_first_listed_rule_labels_titles_matching_several(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            rules = fpf.RemovalRules(
+                name="custom",
+                keywords=("abduction", "creative", "cal", "nqd-cal"),
+                patterns=("Abduction",),
+            )
+            result, stats = self.compress(Path(tmp_dir), rules)
+
+        self.assertNotIn("NQD body", result)
+        self.assertNotIn("C.18 body", result)
+        self.assertEqual(
+            stats.removed_counts,
+            {"abduction": 1, "creative": 0, "cal": 2, "nqd-cal": 0, "Abduction": 0},
+        )
+
+    def test_patterns_keep_inline_flags_groups_and_backreferences(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SAMPLE_SPEC, encoding="utf-8")
+            (work_dir / "flags.yaml").write_text(
+                "keywords:\n- glossary\npatterns:\n- '(?i)deep forces'\n"
+                "- '(?P<r0>CHR)'\n- '(\\w)\\.1\\d \\w+-\\1AL'\n",
+                encoding="utf-8",
+            )
+
+            stdout = io.StringIO()
+            with redirect_stdout(stdout):
+                exit_code = fpf.main(
+                    ["strip", "--rules", str(work_dir / "flags.yaml"), "--work-dir", tmp_dir]
+                )
+
+            self.assertEqual(exit_code, 0)
+            result = (work_dir / "FPF-Spec-flags.md").read_text(encoding="utf-8")
+        self.assertNotIn("Glossary body", result)
+        self.assertNotIn("Deep body", result)
+        self.assertNotIn("C.17 body", result)
+        self.assertNotIn("C.18 body", result)
+        self.assertIn("C.2 body", result)
+        self.assertIn("  - (?i)deep forces: 1 sections", stdout.getvalue())
+
+    def test_strip_rules_option_builds_custom_variant(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SAMPLE_SPEC, encoding="utf-8")
+            rules_dir = work_dir / "rules"
+            rules_dir.mkdir()
+            (rules_dir / "no-nqd.yaml").write_text(
+                "keywords:\n- NQD\nsection_ids:\n- C.17\n",
+                encoding="utf-8",
+            )
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(
+                    [
+                        "strip",
+                        "--rules",
+                        "no-nqd",
+                        "--rules",
+                        str(fpf.DEFAULT_RULES_DIR / "lite.yaml"),
+                        "--rules-dir",
+                        str(rules_dir),
+                        "--work-dir",
+                        str(work_dir),
+                    ]
+                )
+
+            self.assertEqual(exit_code, 0)
+            result = (work_dir / "FPF-Spec-no-nqd.md").read_text(encoding="utf-8")
+            self.assertNotIn("NQD", result)
+            self.assertNotIn("C.17", result)
+            self.assertTrue((work_dir / "FPF-Spec-Lite.md").exists())
+            self.assertIn("  - NQD: 2 sections", buffer.getvalue())
+
+    def test_invalid_pattern_reports_error(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SAMPLE_SPEC, encoding="utf-8")
+            rules_path = work_dir / "broken.yaml"
+            rules_path.write_text("patterns:\n- '(unclosed'\n", encoding="utf-8")
+
+            buffer_err = io.StringIO()
+            with redirect_stdout(io.StringIO()), redirect_stderr(buffer_err):
+                exit_code = fpf.main(
+                    ["strip", "--rules", str(rules_path), "--work-dir", str(work_dir)]
+                )
+
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Invalid pattern", buffer_err.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
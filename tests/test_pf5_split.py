@@ -1,9 +1,12 @@
+import hashlib
 import io
 import unittest
-from contextlib import redirect_stdout
+from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
+import yaml
+
 import fpf
 
 
@@ -74,6 +77,144 @@ class TestPF5Split(unittest.TestCase):
             )
             self.assertEqual(reassembled, input_path.read_bytes())
 
+    def test_split_records_file_metadata(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            input_path = work_dir / "FPF-Spec.md"
+            input_path.write_bytes(b"Preface\r\n# Part A\nA line 1\nA line 2")
+
+            fpf.split_fpf(input_path, work_dir)
+
+            manifest = yaml.safe_load(
+                (work_dir / "FPF-Parts-Manifest.yaml").read_text(encoding="utf-8")
+            )
+            files = manifest["files"]
+            self.assertEqual(set(files), {"FPF-Part-Preface.md", "FPF-Part-A.md", "FPF-Spec.md"})
+            for name, expected_lines in [
+                ("FPF-Part-Preface.md", 1),
+                ("FPF-Part-A.md", 3),
+                ("FPF-Spec.md", 4),
+            ]:
+                data = (work_dir / name).read_bytes()
+                self.assertEqual(files[name]["lines"], expected_lines)
+                self.assertEqual(files[name]["bytes"], len(data))
+                self.assertEqual(
+                    files[name]["blake2b"], hashlib.blake2b(data, digest_size=32).hexdigest()
+                )
+                self.assertEqual(files[name]["mtime_ns"], (work_dir / name).stat().st_mtime_ns)
+            self.assertEqual((work_dir / "FPF-Part-Preface.md").read_bytes(), b"Preface\r\n")
+
+    def test_split_by_chapter_and_section_depth(self) -> None:
+        sample = (
+            "Preface\n"
+            "# **Part A \u2013 Kernel**\n"
+            "intro\n"
+            "## A.1 Holon\n"
+            "holon\n"
+            "### A.1.1 Problem\n"
+            "problem\n"
+            "#### A.1.1.1 Example\n"
+            "example\n"
+            "### A.1.2 Solution\n"
+            "## A.2 Boundary\n"
+            "## A.1 Holon again\n"
+            "# Part B\n"
+            "### B.3.1 Orphan section\n"
+        )
+        expected = {
+            "chapter": [
+                "FPF-Part-Preface.md",
+                "FPF-Part-A.md",
+                "FPF-Sec-A.1.md",
+                "FPF-Sec-A.2.md",
+                "FPF-Part-B.md",
+            ],
+            "section": [
+                "FPF-Part-Preface.md",
+                "FPF-Part-A.md",
+                "FPF-Sec-A.1.md",
+                "FPF-Sec-A.1.1.md",
+                "FPF-Sec-A.1.2.md",
+                "FPF-Sec-A.2.md",
+                "FPF-Part-B.md",
+                "FPF-Sec-B.3.1.md",
+            ],
+        }
+        for depth, names in expected.items():
+            with self.subTest(depth=depth), TemporaryDirectory() as tmp_dir:
+                work_dir = Path(tmp_dir)
+                input_path = work_dir / "FPF-Spec.md"
+                input_path.write_text(sample, encoding="utf-8")
+
+                self.assertEqual(fpf.split_fpf(input_path, work_dir, depth=depth, jobs=3), names)
+
+                manifest = yaml.safe_load(
+                    (work_dir / "FPF-Parts-Manifest.yaml").read_text(encoding="utf-8")
+                )
+                self.assertEqual(manifest["parts"], names)
+                self.assertEqual(manifest["depth"], depth)
+                reassembled = b"".join((work_dir / name).read_bytes() for name in names)
+                self.assertEqual(reassembled, input_path.read_bytes())
+                self.assertEqual(
+                    manifest["files"]["FPF-Spec.md"]["lines"], len(sample.splitlines())
+                )
+                self.assertEqual(
+                    (work_dir / "FPF-Sec-A.1.md").read_text(encoding="utf-8").splitlines()[0],
+                    "## A.1 Holon",
+                )
+                self.assertIn("## A.1 Holon again\n", (work_dir / "FPF-Sec-A.2.md").read_text())
+
+                [preface, part_a, part_b] = manifest["hierarchy"]
+                self.assertEqual(preface, {"file": "FPF-Part-Preface.md"})
+                self.assertEqual(part_a["title"], "Part A - Kernel")
+                self.assertEqual(
+                    [child["file"] for child in part_a["children"]],
+                    ["FPF-Sec-A.1.md", "FPF-Sec-A.2.md"],
+                )
+                if depth == "section":
+                    holon = part_a["children"][0]
+                    self.assertEqual(
+                        [child["id"] for child in holon["children"]], ["A.1.1", "A.1.2"]
+                    )
+                    self.assertEqual(part_b["children"][0]["id"], "B.3.1")
+
+    def test_split_depth_is_part_of_the_build_stamp(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(
+                "# Part A\n## A.1 Holon\nholon\n", encoding="utf-8"
+            )
+            with redirect_stdout(io.StringIO()) as stdout:
+                fpf.main(["split", "--work-dir", tmp_dir])
+                fpf.main(["split", "--work-dir", tmp_dir, "--depth", "chapter"])
+
+            self.assertNotIn("Up to date", stdout.getvalue())
+            self.assertTrue((work_dir / "FPF-Sec-A.1.md").exists())
+
+    def test_assemble_expands_parts_of_deeper_splits(self) -> None:
+        sample = "Preface\n# Part A\nintro\n## A.1 Holon\nholon\n## A.2 Role\nrole\n# Part B\nb\n"
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(sample, encoding="utf-8")
+            (work_dir / "a.yaml").write_text(
+                "output_file: a.md\nparts:\n- FPF-Part-A.md\n- FPF-Sec-A.2.md\n",
+                encoding="utf-8",
+            )
+            assemble = ["assemble", "--manifest", "a.yaml", "--work-dir", tmp_dir]
+            with redirect_stdout(io.StringIO()):
+                fpf.main(["split", "--work-dir", tmp_dir, "--depth", "section"])
+                self.assertEqual(fpf.main(assemble), 0)
+
+            # The Part file holds only the intro; its chapters follow it, once.
+            expected = "# Part A\nintro\n## A.1 Holon\nholon\n## A.2 Role\nrole\n"
+            self.assertEqual((work_dir / "a.md").read_text(encoding="utf-8"), expected)
+
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                fpf.main(["split", "--work-dir", tmp_dir])
+                self.assertEqual(fpf.main(assemble), 1)
+            self.assertFalse(any(work_dir.glob("FPF-Sec-*")))
+            self.assertTrue((work_dir / "FPF-Part-A.md").exists())
+
     @unittest.skipUnless(
         Path("FPF/FPF-Spec.md").exists(),
         "Requires FPF/FPF-Spec.md. Run `./fpf-cli download` first.",
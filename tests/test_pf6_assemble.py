@@ -1,8 +1,10 @@
+import errno
 import io
 import unittest
-from contextlib import redirect_stderr, redirect_stdout
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
 import fpf
 
@@ -285,6 +287,167 @@ class TestPF6Assemble(unittest.TestCase):
             output = buffer_out.getvalue() + buffer_err.getvalue()
             self.assertGreaterEqual(output.count("Warning"), 2)
 
+    def test_assemble_section_filters(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            self.write_parts(
+                work_dir,
+                {
+                    "FPF-Part-A.md": (
+                        "# Part A\n"
+                        "## A.0 Onboarding Glossary\n"
+                        "Glossary\n"
+                        "## A.1 Holons\n"
+                        "Holons\n"
+                    ),
+                    "FPF-Part-C.md": (
+                        "# Part C\n"
+                        "## C.1 Sys-CAL\n"
+                        "Sys\n"
+                        "## C.17 Creativity-CHR\n"
+                        "Creativity\n"
+                        "### C.17.1 Details\n"
+                        "Details\n"
+                        "## C.18 NQD-CAL\n"
+                        "NQD"
+                    ),
+                    "baseline.md": "line\n" * 20,
+                },
+            )
+            manifest_path = work_dir / "assemble.yaml"
+            manifest_path.write_text(
+                "\n".join(
+                    [
+                        "output_file: assembled.md",
+                        "parts:",
+                        "  - FPF-Part-A.md",
+                        "  - FPF-Part-C.md",
+                        "exclude_sections:",
+                        "  - a.0",
+                        "  - C.17",
+                        "  - C.18",
+                        "  - C.17.1",
+                        "baseline_file: baseline.md",
+                    ]
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+
+            buffer_out = io.StringIO()
+            with redirect_stdout(buffer_out), redirect_stderr(io.StringIO()):
+                exit_code = fpf.main(
+                    ["assemble", "--manifest", "assemble.yaml", "--work-dir", str(work_dir)]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(
+                (work_dir / "assembled.md").read_text(encoding="utf-8"),
+                "# Part A\n## A.1 Holons\nHolons\n# Part C\n## C.1 Sys-CAL\nSys\n",
+            )
+            output = buffer_out.getvalue()
+            self.assertIn("  - A.0: 1 sections", output)
+            self.assertIn("  - C.17: 1 sections", output)
+            self.assertNotIn("C.17.1", output)
+            self.assertIn("Lines: 20 -> 6", output)
+
+            manifest_path.write_text(
+                "\n".join(
+                    [
+                        "output_file: assembled.md",
+                        "parts:",
+                        "  - FPF-Part-A.md",
+                        "  - FPF-Part-C.md",
+                        "include_sections:",
+                        "  - A.1",
+                        "  - C.17",
+                        "exclude_sections:",
+                        "  - C.17.1",
+                    ]
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                exit_code = fpf.main(
+                    ["assemble", "--manifest", "assemble.yaml", "--work-dir", str(work_dir)]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(
+                (work_dir / "assembled.md").read_text(encoding="utf-8"),
+                "## A.1 Holons\nHolons\n## C.17 Creativity-CHR\nCreativity\n",
+            )
+
+    def test_assemble_is_byte_identical_on_every_copy_path(self) -> None:
+        parts = {
+            "FPF-Part-Preface.md": "Préface\u00a0line\r\n",
+            "FPF-Part-A.md": "# Part A \u2014 Kernel\n" + "A line\n" * 5000,
+            "FPF-Part-B.md": "# Part B\nno trailing newline",
+        }
+        expected = "".join(parts.values()).encode("utf-8")
+
+        for baseline in (None, "baseline.md"):
+            for disabled in ((), ("copy_file_range",), ("copy_file_range", "sendfile")):
+                with self.subTest(baseline=baseline, disabled=disabled):
+                    with TemporaryDirectory() as tmp_dir:
+                        work_dir = Path(tmp_dir)
+                        self.write_parts(work_dir, dict(parts, **{"baseline.md": "x\n" * 10}))
+                        manifest_path = work_dir / "assemble.yaml"
+                        manifest_path.write_text(
+                            "\n".join(
+                                ["output_file: assembled.md", "parts:"]
+                                + [f"  - {name}" for name in parts]
+                                + ([f"baseline_file: {baseline}"] if baseline else [])
+                            )
+                            + "\n",
+                            encoding="utf-8",
+                        )
+
+                        def unavailable(*args, **kwargs):
+                            raise OSError(errno.ENOSYS, "unavailable")
+
+                        with ExitStack() as stack:
+                            for name in disabled:
+                                stack.enter_context(patch.object(fpf.os, name, unavailable))
+                            with redirect_stderr(io.StringIO()):
+                                output_path, stats, _ = fpf.assemble_fpf(manifest_path, work_dir)
+
+                        self.assertEqual(output_path.read_bytes(), expected)
+                        if baseline:
+                            self.assertEqual(stats.new_lines, 5004)
+                        else:
+                            self.assertIsNone(stats)
+
+    def test_assemble_stats_use_split_metadata(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            spec_path = work_dir / "FPF-Spec.md"
+            spec_path.write_text(
+                "Preface\n# Part A\nA line\n# Part B\nB line\nB line\n", encoding="utf-8"
+            )
+            fpf.split_fpf(spec_path, work_dir)
+            manifest_path = work_dir / "assemble.yaml"
+            manifest_path.write_text(
+                "output_file: assembled.md\nparts:\n- FPF-Part-A.md\n- FPF-Part-B.md\n"
+                "baseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+
+            with patch.object(fpf, "measure_file", side_effect=AssertionError("rescan")):
+                with patch.object(fpf, "copy_block", wraps=fpf.copy_block) as copy_block:
+                    _, stats, _ = fpf.assemble_fpf(manifest_path, work_dir)
+
+            self.assertEqual((stats.original_lines, stats.new_lines), (6, 5))
+            self.assertFalse(any(call.args[5] for call in copy_block.call_args_list))
+
+            spec_path.write_text("line\n" * 10, encoding="utf-8")
+            (work_dir / "FPF-Part-B.md").write_text("# Part B\n", encoding="utf-8")
+            _, stats, _ = fpf.assemble_fpf(manifest_path, work_dir)
+
+            self.assertEqual((stats.original_lines, stats.new_lines), (10, 3))
+
     @unittest.skipUnless(
         Path("FPF/FPF-Spec.md").exists(),
         "Requires FPF/FPF-Spec.md. Run `./fpf-cli download` first.",
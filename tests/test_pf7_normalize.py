@@ -0,0 +1,98 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+import fpf_typography
+
+
+SAMPLE = (
+    "Preface line\n"
+    "# **Part A – Kernel Architecture**\n"
+    "It’s a “test” — with a non‑breaking hyphen\r\n"
+    "## *Part b* Reasoning\n"
+    "## Part Alpha is not a part header\n"
+    "plain ASCII line\n"
+)
+EXPECTED = (
+    "Preface line\n"
+    "# Part A - Kernel Architecture\n"
+    'It\'s a "test" - with a non-breaking hyphen\r\n'
+    "## Part B Reasoning\n"
+    "## Part Alpha is not a part header\n"
+    "plain ASCII line\n"
+)
+
+
+class TestPF7Normalize(unittest.TestCase):
+    def run_main(self, argv: list[str]) -> tuple[int, str, str]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_code = fpf.main(argv)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_writes_normalized_copy(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            input_path = Path(tmp_dir) / "FPF-Spec.md"
+            input_path.write_bytes(SAMPLE.encode("utf-8"))
+
+            exit_code, stdout, _ = self.run_main(
+                ["normalize-typographics", "--work-dir", tmp_dir]
+            )
+
+            self.assertEqual(exit_code, 0)
+            output_path = Path(tmp_dir) / fpf.DEFAULT_NORMALIZED_NAME
+            self.assertEqual(output_path.read_bytes(), EXPECTED.encode("utf-8"))
+            self.assertEqual(input_path.read_bytes(), SAMPLE.encode("utf-8"))
+            self.assertIn("Normalized 4 of 6 lines (2 Part headers)", stdout)
+
+    def test_in_place_overwrites_input_atomically(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            input_path = Path(tmp_dir) / "custom.md"
+            input_path.write_bytes(SAMPLE.encode("utf-8"))
+
+            exit_code, _, stderr = self.run_main(
+                [
+                    "normalize-typographics",
+                    "--work-dir",
+                    tmp_dir,
+                    "--input",
+                    "custom.md",
+                    "--output",
+                    "ignored.md",
+                    "--in-place",
+                ]
+            )
+
+            self.assertEqual(exit_code, 0)
+            self.assertIn("Warning", stderr)
+            self.assertEqual(input_path.read_bytes(), EXPECTED.encode("utf-8"))
+            self.assertEqual(sorted(path.name for path in Path(tmp_dir).iterdir()), ["custom.md"])
+
+    def test_rejects_paths_and_missing_input(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            exit_code, _, stderr = self.run_main(
+                ["normalize-typographics", "--work-dir", tmp_dir, "--output", "../out.md"]
+            )
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Output file must be a filename", stderr)
+
+            exit_code, _, stderr = self.run_main(["normalize-typographics", "--work-dir", tmp_dir])
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Input file not found", stderr)
+
+    def test_normalization_is_idempotent_and_skips_ascii(self) -> None:
+        normalized = [fpf_typography.normalize_line(line) for line in SAMPLE.splitlines(True)]
+        self.assertEqual("".join(normalized), EXPECTED)
+        self.assertEqual([fpf_typography.normalize_line(line) for line in normalized], normalized)
+
+        line = "## A.1 Holon\n"
+        self.assertIs(fpf_typography.normalize_text(line), line)
+        self.assertEqual(fpf.normalize_text("SoTA‑Echoing"), "SoTA-Echoing")
+
+
+if __name__ == "__main__":
+    unittest.main()
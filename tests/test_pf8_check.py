@@ -0,0 +1,92 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+import fpf_typography
+
+
+SAMPLE = (
+    "# **Part A – Kernel**\n"
+    "It’s a “test”\n"
+    "## Part B - Reasoning\n"
+    "plain line\n"
+    "### **Part\u00a0C**\n"
+)
+
+
+class TestPF8Check(unittest.TestCase):
+    def run_main(self, argv: list[str]) -> tuple[int, str, str]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_code = fpf.main(argv)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_reports_every_violation_in_line_order(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            (Path(tmp_dir) / "FPF-Spec.md").write_text(SAMPLE, encoding="utf-8")
+
+            exit_code, stdout, stderr = self.run_main(
+                ["check-typographics", "--work-dir", tmp_dir]
+            )
+
+            self.assertEqual(exit_code, 1)
+            self.assertEqual(
+                stdout.splitlines(),
+                [
+                    "FPF-Spec.md:1:1: Part header not normalized",
+                    "FPF-Spec.md:1:12: U+2013 en dash",
+                    "FPF-Spec.md:2:3: U+2019 right single quotation mark",
+                    "FPF-Spec.md:2:8: U+201C left double quotation mark",
+                    "FPF-Spec.md:2:13: U+201D right double quotation mark",
+                    "FPF-Spec.md:5:1: Part header not normalized",
+                    "FPF-Spec.md:5:11: U+00A0 no-break space",
+                ],
+            )
+            self.assertIn("Found 7 typographic violations", stderr)
+
+    def test_normalized_output_passes(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            (Path(tmp_dir) / "FPF-Spec.md").write_text(SAMPLE, encoding="utf-8")
+            self.run_main(["normalize-typographics", "--work-dir", tmp_dir, "--in-place"])
+
+            exit_code, stdout, _ = self.run_main(["check-typographics", "--work-dir", tmp_dir])
+
+            self.assertEqual(exit_code, 0)
+            self.assertIn("No typographic violations", stdout)
+
+    def test_chunked_parallel_scan_matches_single_pass(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = Path(tmp_dir) / "FPF-Spec.md"
+            block = "ascii only line\n" * 2000 + SAMPLE
+            spec_path.write_text(block * 80, encoding="utf-8")
+            data = spec_path.read_bytes()
+
+            chunks = fpf_typography.plan_check_chunks(data, fpf_typography.CHECK_MIN_CHUNK_SIZE)
+            serial = fpf.check_typographics(spec_path, jobs=1)
+            parallel = fpf.check_typographics(spec_path, jobs=2)
+
+            self.assertGreater(len(chunks), 1)
+            self.assertTrue(all(data[end - 1 : end] == b"\n" for _, end in chunks))
+            self.assertEqual(serial, parallel)
+            self.assertEqual(len(serial), 7 * 80)
+            self.assertEqual(serial[-1].line, len(block.splitlines()) * 80)
+
+    def test_rejects_paths_and_missing_input(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            exit_code, _, stderr = self.run_main(
+                ["check-typographics", "--work-dir", tmp_dir, "--input", "/etc/passwd"]
+            )
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Input file must be a filename", stderr)
+
+            exit_code, _, stderr = self.run_main(["check-typographics", "--work-dir", tmp_dir])
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Input file not found", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import unittest
 from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
 import fpf
 
@@ -187,6 +188,114 @@ class TestPF9Profiles(unittest.TestCase):
             self.assertTrue((work_dir / "right.md").exists())
             self.assertFalse((work_dir / "wrong.md").exists())
 
+    def test_all_profiles_reads_each_part_once(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            base_dir = Path(tmp_dir)
+            profiles_dir = base_dir / "profiles"
+            work_dir = base_dir / "work"
+            spec = "Preface line 1\n# Part A\n## A.0 Glossary\nG\n## A.1 Holons\nH\n# Part B\nB\n"
+            work_dir.mkdir()
+            (work_dir / "FPF-Spec.md").write_text(spec, encoding="utf-8")
+            fpf.split_fpf(work_dir / "FPF-Spec.md", work_dir)
+
+            profiles_dir.mkdir()
+            (profiles_dir / "full.yaml").write_text(
+                "output_file: full.md\nparts:\n- FPF-Part-Preface.md\n- FPF-Part-A.md\n"
+                "- FPF-Part-B.md\nbaseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+            (profiles_dir / "kernel.yaml").write_text(
+                "output_file: kernel.md\nparts:\n- FPF-Part-A.md\nexclude_sections:\n- A.0\n"
+                "baseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+            (profiles_dir / "notes.md").write_text("not a profile\n", encoding="utf-8")
+
+            buffer_out = io.StringIO()
+            with patch.object(fpf, "_map_part", wraps=fpf._map_part) as map_part:
+                with redirect_stdout(buffer_out), redirect_stderr(io.StringIO()):
+                    exit_code = fpf.main(
+                        [
+                            "assemble",
+                            "--all-profiles",
+                            "--profiles-dir",
+                            str(profiles_dir),
+                            "--work-dir",
+                            str(work_dir),
+                            "--jobs",
+                            "2",
+                        ]
+                    )
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(map_part.call_count, 3)
+            self.assertEqual((work_dir / "full.md").read_text(encoding="utf-8"), spec)
+            self.assertEqual(
+                (work_dir / "kernel.md").read_text(encoding="utf-8"),
+                "# Part A\n## A.1 Holons\nH\n",
+            )
+            output = buffer_out.getvalue()
+            self.assertRegex(output, r"full\s+full\.md\s+8 -> 8\s+0\.0%")
+            self.assertRegex(output, r"kernel\s+kernel\.md\s+8 -> 3\s+62\.5%")
+
+            (profiles_dir / "broken.yaml").write_text(
+                "output_file: broken.md\nparts:\n- FPF-Part-Z.md\n", encoding="utf-8"
+            )
+            buffer_err = io.StringIO()
+            with redirect_stdout(io.StringIO()), redirect_stderr(buffer_err):
+                exit_code = fpf.main(
+                    [
+                        "assemble",
+                        "--all-profiles",
+                        "--profiles-dir",
+                        str(profiles_dir),
+                        "--work-dir",
+                        str(work_dir),
+                    ]
+                )
+
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Part file not found", buffer_err.getvalue())
+            self.assertFalse((work_dir / "broken.md").exists())
+
+    def test_all_profiles_rejects_shared_outputs_and_bad_jobs(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            profiles_dir = work_dir / "profiles"
+            self.write_parts(work_dir, {"FPF-Part-A.md": "# Part A\n", "FPF-Part-B.md": "B\n"})
+            self.write_parts(
+                profiles_dir,
+                {
+                    "a.yaml": "output_file: out.md\nparts:\n- FPF-Part-A.md\n",
+                    "b.yaml": "output_file: out.md\nparts:\n- FPF-Part-B.md\n",
+                    "c.yaml": "output_file: c.md\nparts:\n- FPF-Part-B.md\n",
+                },
+            )
+            argv = [
+                "assemble",
+                "--all-profiles",
+                "--profiles-dir",
+                str(profiles_dir),
+                "--work-dir",
+                tmp_dir,
+            ]
+
+            buffer_err = io.StringIO()
+            with redirect_stdout(io.StringIO()), redirect_stderr(buffer_err):
+                exit_code = fpf.main(argv)
+
+            self.assertEqual(exit_code, 1)
+            self.assertEqual(buffer_err.getvalue().count("is written by"), 2)
+            self.assertFalse((work_dir / "out.md").exists())
+            self.assertEqual((work_dir / "c.md").read_text(encoding="utf-8"), "B\n")
+
+            buffer_err = io.StringIO()
+            with redirect_stdout(io.StringIO()), redirect_stderr(buffer_err):
+                exit_code = fpf.main([*argv, "--jobs", "0"])
+
+            self.assertEqual(exit_code, 1)
+            self.assertIn("--jobs must be at least 1", buffer_err.getvalue())
+
 
 if __name__ == "__main__":
     unittest.main()
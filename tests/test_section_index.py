@@ -0,0 +1,106 @@
+import io
+import json
+import os
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+SAMPLE_SPEC = (
+    "Preface line\n"
+    "# **Part A – Kernel**\n"
+    "## A.0 — Onboarding Glossary\n"
+    "Glossary body\n"
+    "## A.1 Holons\n"
+    "Body A.1\n"
+    "### A.1.2 Details\n"
+    "Details body\n"
+    "# Part B\n"
+    "## B.5.2.1 Creative Abduction\n"
+    "Abduction body\n"
+)
+
+
+class TestSectionIndex(unittest.TestCase):
+    def write_spec(self, work_dir: Path, text: str = SAMPLE_SPEC) -> Path:
+        spec_path = work_dir / "FPF-Spec.md"
+        spec_path.write_text(text, encoding="utf-8")
+        return spec_path
+
+    def test_index_records_headings_with_offsets(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = self.write_spec(Path(tmp_dir))
+            index = fpf.build_section_index(spec_path)
+            data = spec_path.read_bytes()
+
+        ids = [entry.section_id for entry in index.sections]
+        self.assertEqual(ids, ["A", "A.0", "A.1", "A.1.2", "B", "B.5.2.1"])
+        part_a = index.find("a")
+        self.assertEqual(part_a.line, 2)
+        self.assertEqual(part_a.level, 1)
+        self.assertEqual(part_a.title, "**Part A – Kernel**")
+        section = index.find("A.1")
+        self.assertEqual(
+            data[section.offset : section.offset + section.length],
+            "## A.1 Holons\nBody A.1\n### A.1.2 Details\nDetails body\n".encode("utf-8"),
+        )
+        last = index.find("B")
+        self.assertEqual(last.offset + last.length, len(data))
+        self.assertEqual(index.source_size, len(data))
+
+    def test_sidecar_is_reused_and_invalidated(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = self.write_spec(Path(tmp_dir))
+            index = fpf.load_section_index(spec_path)
+            sidecar = fpf.section_index_path(spec_path)
+            self.assertTrue(sidecar.exists())
+
+            stored = json.loads(sidecar.read_text(encoding="utf-8"))
+            stored["sections"] = stored["sections"][:1]
+            sidecar.write_text(json.dumps(stored), encoding="utf-8")
+            self.assertEqual(len(fpf.load_section_index(spec_path).sections), 1)
+
+            stat = spec_path.stat()
+            os.utime(spec_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            self.assertEqual(len(fpf.load_section_index(spec_path).sections), 1)
+
+            self.write_spec(Path(tmp_dir), SAMPLE_SPEC + "## B.6 New\n")
+            rebuilt = fpf.load_section_index(spec_path)
+            self.assertEqual(len(rebuilt.sections), len(index.sections) + 1)
+
+    def test_get_prints_section(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            self.write_spec(Path(tmp_dir))
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(["get", "A.0", "--work-dir", tmp_dir])
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(buffer.getvalue(), "## A.0 — Onboarding Glossary\nGlossary body\n")
+
+            buffer_err = io.StringIO()
+            with redirect_stdout(io.StringIO()), redirect_stderr(buffer_err):
+                exit_code = fpf.main(["get", "Z.9", "--work-dir", tmp_dir])
+
+            self.assertEqual(exit_code, 1)
+            self.assertIn("Section not found", buffer_err.getvalue())
+
+    def test_index_command_writes_sidecar(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = self.write_spec(Path(tmp_dir))
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(["index", "--list", "--work-dir", tmp_dir])
+
+            self.assertEqual(exit_code, 0)
+            self.assertIn("Indexed 6 sections", buffer.getvalue())
+            self.assertIn("10\tB.5.2.1\t## B.5.2.1 Creative Abduction", buffer.getvalue())
+            self.assertTrue(fpf.section_index_path(spec_path).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import http.client
+import io
+import json
+import os
+import socket
+import threading
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+SPEC = (
+    "Title\n"
+    "# **Part A - Kernel**\n"
+    "## A.0 Onboarding\n"
+    "onboarding\n"
+    "## A.1 Holon\n"
+    "The holon MUST declare its boundary.\n"
+    "### A.1.1 SoTA-Echoing\n"
+    "echo\n"
+    "## A.2 Roles\n"
+    "roles\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+)
+
+
+def write_tree(root: Path) -> tuple[Path, Path]:
+    work_dir = root / "FPF"
+    profiles_dir = root / "profiles"
+    work_dir.mkdir()
+    profiles_dir.mkdir()
+    (work_dir / fpf.DEFAULT_SPEC_NAME).write_text(SPEC, encoding="utf-8")
+    (profiles_dir / "kernel.yaml").write_text(
+        "output_file: kernel.md\nparts:\n- FPF-Part-A.md\n- FPF-Part-B.md\n"
+        "baseline_file: FPF-Spec.md\nexclude_sections:\n- A.0\n",
+        encoding="utf-8",
+    )
+    return work_dir, profiles_dir
+
+
+class TestSpecService(unittest.TestCase):
+    def test_profile_matches_assemble_and_is_cached(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            service = fpf.SpecService(work_dir, profiles_dir)
+
+            first = service.handle("/profiles/kernel")
+            second = service.handle("/profiles/kernel.yaml")
+
+            fpf.split_fpf(work_dir / fpf.DEFAULT_SPEC_NAME, work_dir)
+            output_path, stats, _ = fpf.assemble_fpf(profiles_dir / "kernel.yaml", work_dir)
+            self.assertEqual(first.status, 200)
+            self.assertEqual(first.body, output_path.read_bytes())
+            self.assertEqual(dict(first.headers)["X-FPF-Cache"], "miss")
+            self.assertEqual(dict(first.headers)["X-FPF-Tokens"], str(stats.new_tokens))
+            self.assertEqual(dict(first.headers)["X-FPF-Lines"], str(stats.new_lines))
+            self.assertEqual(second.body, first.body)
+            self.assertEqual(dict(second.headers)["X-FPF-Cache"], "hit")
+
+    def test_sections_strip_and_budget(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            service = fpf.SpecService(work_dir, profiles_dir)
+
+            section = service.handle("/sections/a.1")
+            self.assertEqual(section.body, fpf.read_section(work_dir / "FPF-Spec.md", "A.1"))
+
+            stripped = service.handle("/strip/lite")
+            fpf.compress_fpf(work_dir / "FPF-Spec.md", work_dir / "lite.md", aggressive=False)
+            self.assertEqual(stripped.body, (work_dir / "lite.md").read_bytes())
+
+            budget = service.handle("/profiles/kernel?max_tokens=40")
+            fpf.split_fpf(work_dir / "FPF-Spec.md", work_dir)
+            output_path, _, _ = fpf.assemble_fpf(
+                profiles_dir / "kernel.yaml", work_dir, max_tokens=40
+            )
+            self.assertEqual(budget.status, 200)
+            self.assertEqual(budget.body, output_path.read_bytes())
+            self.assertIn(b"A.1 Holon", budget.body)
+            self.assertNotIn(b"B.1 Aggregation", budget.body)
+            self.assertLessEqual(int(dict(budget.headers)["X-FPF-Tokens"]), 40)
+
+    def test_pinned_profile_serves_the_stored_version(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            stdout = io.StringIO()
+            with redirect_stdout(stdout):
+                fpf.main(["split", "--work-dir", str(work_dir), "--store"])
+            version = stdout.getvalue().split("Stored version ")[1].split()[0]
+            (work_dir / fpf.DEFAULT_SPEC_NAME).write_text(
+                SPEC.replace("roles\n", "roles, revised\n"), encoding="utf-8"
+            )
+            manifest_path = profiles_dir / "pinned.yaml"
+            manifest_path.write_text(
+                f"output_file: pinned.md\nparts:\n- FPF-Part-A.md\nversion: {version}\n",
+                encoding="utf-8",
+            )
+            service = fpf.SpecService(work_dir, profiles_dir)
+
+            response = service.handle("/profiles/pinned")
+
+            output_path, _, _ = fpf.assemble_fpf(manifest_path, work_dir)
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.body, output_path.read_bytes())
+            self.assertIn(b"roles\n", response.body)
+            self.assertNotIn(b"revised", response.body)
+
+    def test_errors_map_to_status_codes(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            service = fpf.SpecService(work_dir, profiles_dir)
+
+            for target, status in (
+                ("/sections/Z.9", 404),
+                ("/profiles/missing", 404),
+                ("/profiles/..%2Fkernel", 404),
+                ("/strip/nope", 404),
+                ("/nowhere", 404),
+                ("/profiles/kernel?max_tokens=0", 400),
+                ("/profiles/kernel?max_tokens=1", 400),
+            ):
+                with self.subTest(target=target):
+                    response = service.handle(target)
+                    self.assertEqual(response.status, status)
+                    self.assertIn("error", json.loads(response.body))
+
+    def test_reloads_when_spec_changes(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            spec_path = work_dir / fpf.DEFAULT_SPEC_NAME
+            service = fpf.SpecService(work_dir, profiles_dir)
+            first = service.handle("/sections/B.1")
+            self.assertEqual(first.body, b"## B.1 Aggregation\naggregation\n")
+
+            spec_path.write_text(SPEC.replace("aggregation\n", "merged\n"), encoding="utf-8")
+            stat = spec_path.stat()
+            os.utime(spec_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            response = service.handle("/sections/B.1")
+
+            self.assertEqual(response.body, b"## B.1 Aggregation\nmerged\n")
+            self.assertEqual(dict(response.headers)["X-FPF-Cache"], "miss")
+            self.assertEqual(service.reloads, 2)
+
+    def test_pack_cache_evicts_least_recently_used(self) -> None:
+        cache = fpf.PackCache(10)
+        cache.put(("a",), fpf.RenderedPack(b"aaaa", 1, 1))
+        cache.put(("b",), fpf.RenderedPack(b"bbbb", 1, 1))
+        cache.get(("a",))
+        cache.put(("c",), fpf.RenderedPack(b"cccc", 1, 1))
+        cache.put(("big",), fpf.RenderedPack(b"x" * 11, 1, 1))
+
+        self.assertIsNotNone(cache.get(("a",)))
+        self.assertIsNone(cache.get(("b",)))
+        self.assertIsNone(cache.get(("big",)))
+        self.assertEqual(cache.size, 8)
+
+
+class TestSpecServer(unittest.TestCase):
+    def start(self, server) -> None:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def test_tcp_server_keeps_connection_alive(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            server = fpf.make_spec_server(fpf.SpecService(work_dir, profiles_dir), port=0)
+            self.start(server)
+
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+            self.addCleanup(connection.close)
+            connection.request("GET", "/")
+            info = json.loads(connection.getresponse().read())
+            connection.request("GET", "/sections/A.2")
+            response = connection.getresponse()
+
+            self.assertEqual(info["profiles"], ["kernel"])
+            self.assertEqual(
+                info["parts"], ["FPF-Part-Preface.md", "FPF-Part-A.md", "FPF-Part-B.md"]
+            )
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.read(), b"## A.2 Roles\nroles\n")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets not available")
+    def test_unix_socket_server(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir, profiles_dir = write_tree(Path(tmp_dir))
+            socket_path = Path(tmp_dir) / "fpf.sock"
+            server = fpf.make_spec_server(
+                fpf.SpecService(work_dir, profiles_dir), socket_path=socket_path
+            )
+            self.start(server)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(str(socket_path))
+                client.sendall(b"GET /sections/B.1 HTTP/1.0\r\n\r\n")
+                reply = b""
+                while chunk := client.recv(4096):
+                    reply += chunk
+
+            self.assertTrue(reply.startswith(b"HTTP/1.1 200"))
+            self.assertIn(b"X-FPF-Cache: miss", reply)
+            self.assertTrue(reply.endswith(b"\r\n\r\n## B.1 Aggregation\naggregation\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFERRED_MODULES = (
+    "yaml",
+    "urllib.request",
+    "http.client",
+    "ssl",
+    "email",
+    "concurrent.futures",
+)
+# Cumulative microseconds for `import fpf` with warm bytecode caches; eager
+# yaml/urllib.request imports alone used to cost about twice this.
+IMPORT_BUDGET_US = 80_000
+
+
+def import_times(code: str, cache_dir: str) -> dict[str, int]:
+    """Run ``code`` under ``-X importtime`` and map module names to cumulative us."""
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=cache_dir)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_defers_heavy_modules(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            times = import_times("import fpf", cache_dir)
+
+        self.assertIn("fpf", times)
+        for module in DEFERRED_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, times)
+
+    def test_offline_command_skips_network_modules(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            (Path(tmp_dir) / "FPF-Spec.md").write_text("# Part A\n## A.1 Holon\n", encoding="utf-8")
+            times = import_times(
+                f"import fpf; fpf.main(['index', '--work-dir', {tmp_dir!r}])", tmp_dir
+            )
+
+        for module in DEFERRED_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, times)
+
+    def test_import_cost_is_capped(self) -> None:
+        with TemporaryDirectory() as cache_dir:
+            import_times("import fpf", cache_dir)
+            best = min(import_times("import fpf", cache_dir)["fpf"] for _ in range(3))
+
+        self.assertLess(best, IMPORT_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import io
+import itertools
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import fpf
+
+
+SPEC = (
+    "Title\n"
+    "Preface text\n"
+    "# **Part A - Kernel**\n"
+    "## A.0 Onboarding\n"
+    "onboarding\n"
+    "## A.1 Holon\n"
+    "holon\n"
+    "### A.1.1 SoTA-Echoing\n"
+    "echo\n"
+    "### A.1.2 Rules\n"
+    "rules\n"
+    "## A.2 Roles\n"
+    "roles\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+)
+
+
+class TestGeneratorStages(unittest.TestCase):
+    def test_iter_strip_matches_compress_fpf(self) -> None:
+        rules = fpf.load_builtin_rules(False)
+        with TemporaryDirectory() as tmp_dir:
+            input_path = Path(tmp_dir) / "FPF-Spec.md"
+            output_path = Path(tmp_dir) / "lite.md"
+            input_path.write_text(SPEC, encoding="utf-8")
+            stats = fpf.compress_fpf(input_path, output_path, aggressive=False)
+
+            removed_counts: dict[str, int] = {}
+            lines = list(fpf.iter_strip(fpf.iter_lines(input_path), rules, removed_counts))
+
+            self.assertEqual("".join(lines), output_path.read_text(encoding="utf-8"))
+            self.assertEqual(removed_counts, stats.removed_counts)
+
+    def test_iter_select_sections_matches_byte_ranges(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = Path(tmp_dir) / "FPF-Spec.md"
+            spec_path.write_text(SPEC, encoding="utf-8")
+            data = spec_path.read_bytes()
+            index = fpf.build_section_index(spec_path)
+            for include, exclude in (
+                (None, ["A.1"]),
+                (["A.1", "B"], ["A.1.1"]),
+                (["A.2"], None),
+            ):
+                with self.subTest(include=include, exclude=exclude):
+                    ranges = fpf.select_section_ranges(index, include, exclude)
+                    expected = b"".join(data[start:end] for start, end in ranges)
+                    lines = fpf.iter_select_sections(SPEC.splitlines(True), include, exclude)
+                    self.assertEqual("".join(lines).encode("utf-8"), expected)
+
+    def test_iter_sections_yields_flat_chunks(self) -> None:
+        chunks = list(fpf.iter_sections(SPEC.splitlines(True)))
+
+        self.assertEqual(chunks[0].level, 0)
+        self.assertEqual(chunks[0].lines, ("Title\n", "Preface text\n"))
+        self.assertEqual(
+            [chunk.section_id for chunk in chunks[1:]],
+            ["A", "A.0", "A.1", "A.1.1", "A.1.2", "A.2", "B", "B.1"],
+        )
+        self.assertEqual(chunks[3].lines, ("## A.1 Holon\n", "holon\n"))
+        self.assertEqual("".join(line for chunk in chunks for line in chunk.lines), SPEC)
+
+    def test_iter_parts_matches_split(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = Path(tmp_dir) / "FPF-Spec.md"
+            spec_path.write_text(SPEC, encoding="utf-8")
+            manifest = fpf.split_fpf(spec_path, Path(tmp_dir))
+
+            parts: dict[str, str] = {}
+            for name, line in fpf.iter_parts(SPEC.splitlines(True)):
+                parts[name] = parts.get(name, "") + line
+
+            self.assertEqual(list(parts), manifest)
+            for name, text in parts.items():
+                self.assertEqual((Path(tmp_dir) / name).read_text(encoding="utf-8"), text)
+
+    def test_stages_chain_lazily(self) -> None:
+        def endless():
+            yield "# Part A\n"
+            for number in itertools.count(1):
+                yield f"## A.{number} Section\n"
+                yield "body\n"
+
+        stages = fpf.iter_select_sections(
+            fpf.iter_strip(endless(), fpf.load_builtin_rules(True)), exclude=["A.1"]
+        )
+
+        self.assertEqual(
+            list(itertools.islice(stages, 3)), ["# Part A\n", "## A.2 Section\n", "body\n"]
+        )
+
+
+class TestStreamingCLI(unittest.TestCase):
+    def test_strip_lite_reads_stdin_and_writes_stdout(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            stdout = io.StringIO()
+            stderr = io.StringIO()
+            with (
+                patch("sys.stdin", io.StringIO(SPEC)),
+                redirect_stdout(stdout),
+                redirect_stderr(stderr),
+            ):
+                exit_code = fpf.main(
+                    ["strip-lite", "--work-dir", tmp_dir, "--input", "-", "--output", "-"]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertTrue(stdout.getvalue().startswith("## A.0 Onboarding\n"))
+            self.assertNotIn("echo", stdout.getvalue())
+            self.assertIn("Stats for <stdout>:", stderr.getvalue())
+            self.assertIn("Lines: 16 -> 11", stderr.getvalue())
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
+
+    def test_strip_file_to_stdout_and_stdin_to_file(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = Path(tmp_dir) / "spec.md"
+            spec_path.write_text(SPEC, encoding="utf-8")
+            stdout = io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+                exit_code = fpf.main(
+                    ["strip-aggressive", "--input", str(spec_path), "--output", "-"]
+                )
+            self.assertEqual(exit_code, 0)
+
+            output_path = Path(tmp_dir) / "out.md"
+            with patch("sys.stdin", io.StringIO(SPEC)), redirect_stdout(io.StringIO()):
+                exit_code = fpf.main(
+                    ["strip-aggressive", "--input", "-", "--output", str(output_path)]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(output_path.read_text(encoding="utf-8"), stdout.getvalue())
+
+    def test_stdin_keeps_crlf_line_endings(self) -> None:
+        data = SPEC.replace("\n", "\r\n").encode("utf-8")
+        stdout = io.StringIO()
+        with (
+            patch("sys.stdin", io.TextIOWrapper(io.BytesIO(data))),
+            redirect_stdout(stdout),
+            redirect_stderr(io.StringIO()),
+        ):
+            exit_code = fpf.main(["strip-lite", "--input", "-", "--output", "-"])
+
+        self.assertEqual(exit_code, 0)
+        self.assertTrue(stdout.getvalue().startswith("## A.0 Onboarding\r\nonboarding\r\n"))
+
+    def test_assemble_writes_stdout(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(SPEC, encoding="utf-8")
+            fpf.split_fpf(work_dir / "FPF-Spec.md", work_dir)
+            (work_dir / "a.yaml").write_text(
+                "output_file: a.md\nparts:\n- FPF-Part-A.md\nexclude_sections:\n- A.1\n"
+                "baseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+            stdout = io.StringIO()
+            stderr = io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                exit_code = fpf.main(
+                    ["assemble", "--manifest", "a.yaml", "--work-dir", tmp_dir, "--output", "-"]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(
+                stdout.getvalue(),
+                "# **Part A - Kernel**\n## A.0 Onboarding\nonboarding\n## A.2 Roles\nroles\n",
+            )
+            self.assertIn("Stats for <stdout>:", stderr.getvalue())
+            self.assertIn("Lines: 16 -> 5", stderr.getvalue())
+            self.assertFalse((work_dir / "a.md").exists())
+
+    def test_streaming_needs_a_single_variant(self) -> None:
+        stderr = io.StringIO()
+        with patch("sys.stdin", io.StringIO(SPEC)), redirect_stderr(stderr):
+            exit_code = fpf.main(["strip", "--input", "-"])
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("exactly one rules variant", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import json
+import pstats
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+SPEC = (
+    "Preface\n"
+    "# Part A - Kernel\n"
+    "## A.1 Holon\n"
+    "holon\n"
+    "### A.1.1 SoTA-Echoing\n"
+    "echo\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+)
+
+
+def write_work_dir(work_dir: Path) -> Path:
+    spec_path = work_dir / "FPF-Spec.md"
+    spec_path.write_text(SPEC, encoding="utf-8")
+    fpf.split_fpf(spec_path, work_dir)
+    manifest_path = work_dir / "assemble.yaml"
+    manifest_path.write_text(
+        "output_file: out.md\nparts:\n- FPF-Part-A.md\n- FPF-Part-B.md\n"
+        "baseline_file: FPF-Spec.md\nexclude_sections:\n- A.1.1\n",
+        encoding="utf-8",
+    )
+    return manifest_path
+
+
+class TestTimings(unittest.TestCase):
+    def test_assemble_reports_phases_bytes_and_rss(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            manifest_path = write_work_dir(work_dir)
+            timings_path = work_dir / "timings.json"
+
+            with redirect_stdout(io.StringIO()):
+                exit_code = fpf.main(
+                    [
+                        "--timings-out",
+                        str(timings_path),
+                        "assemble",
+                        "--manifest",
+                        str(manifest_path),
+                        "--work-dir",
+                        tmp_dir,
+                    ]
+                )
+
+            self.assertEqual(exit_code, 0)
+            report = json.loads(timings_path.read_text(encoding="utf-8"))
+            self.assertEqual(report["command"], "assemble")
+            self.assertEqual(report["exit_code"], 0)
+            self.assertLessEqual(
+                {"manifest load", "validate", "read", "match", "write", "baseline count"},
+                set(report["phases"]),
+            )
+            parts_size = sum(
+                (work_dir / name).stat().st_size for name in ("FPF-Part-A.md", "FPF-Part-B.md")
+            )
+            self.assertEqual(report["bytes_read"], parts_size)
+            self.assertEqual(report["bytes_written"], (work_dir / "out.md").stat().st_size)
+            self.assertGreater(report["peak_rss_mb"], 0)
+            self.assertIsNone(fpf._active_timings)
+
+    def test_strip_prints_timings_on_stderr(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            (Path(tmp_dir) / "FPF-Spec.md").write_text(SPEC, encoding="utf-8")
+            stdout = io.StringIO()
+            stderr = io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                exit_code = fpf.main(["--timings", "strip-lite", "--work-dir", tmp_dir])
+
+            self.assertEqual(exit_code, 0)
+            self.assertIn("Wrote", stdout.getvalue())
+            report = json.loads(stderr.getvalue())
+            self.assertIn("strip pass", report["phases"])
+            self.assertEqual(report["bytes_read"], len(SPEC))
+            self.assertEqual(
+                report["bytes_written"],
+                (Path(tmp_dir) / fpf.DEFAULT_LITE_NAME).stat().st_size,
+            )
+
+    def test_phases_are_free_when_timings_are_off(self) -> None:
+        with fpf.timed("read"):
+            fpf.count_io(10, 10)
+        self.assertIsNone(fpf._active_timings)
+
+
+class TestProfileOut(unittest.TestCase):
+    def test_writes_pstats(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            (Path(tmp_dir) / "FPF-Spec.md").write_text(SPEC, encoding="utf-8")
+            profile_path = Path(tmp_dir) / "split.prof"
+
+            with redirect_stdout(io.StringIO()):
+                exit_code = fpf.main(
+                    ["--profile-out", str(profile_path), "split", "--work-dir", tmp_dir]
+                )
+
+            self.assertEqual(exit_code, 0)
+            functions = {name for _, _, name in pstats.Stats(str(profile_path)).stats}
+            self.assertIn("split_fpf", functions)
+
+    def test_writes_collapsed_stacks(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            profile_path = Path(tmp_dir) / "busy.folded"
+
+            def busy() -> int:
+                deadline = time.perf_counter() + 0.1
+                while time.perf_counter() < deadline:
+                    sum(range(1000))
+                return 0
+
+            self.assertEqual(fpf.run_profiled(busy, profile_path), 0)
+            lines = profile_path.read_text(encoding="utf-8").splitlines()
+            self.assertTrue(lines)
+            for line in lines:
+                self.assertRegex(line, r"^\S+ \d+$")
+            self.assertTrue(any(";test_timings:busy" in line for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
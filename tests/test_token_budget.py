@@ -0,0 +1,212 @@
+import io
+import itertools
+import random
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+PLAIN = "This paragraph explains the idea in ordinary words for the reader.\n"
+NORMATIVE = "The holon MUST declare its boundary and SHALL publish its scope.\n"
+
+
+def write_spec(work_dir: Path) -> None:
+    (work_dir / "FPF-Part-A.md").write_text(
+        "# Part A - Kernel\nIntro.\n"
+        "## A.1 Normative chapter\n" + NORMATIVE * 10 +
+        "### A.1.1 Detail\n" + NORMATIVE * 2 +
+        "## A.2 Plain chapter\n" + PLAIN * 12 +
+        "## A.3 Long chapter\n" + PLAIN * 40,
+        encoding="utf-8",
+    )
+    (work_dir / "FPF-Part-B.md").write_text(
+        "# Part B - Reasoning\n## B.1 Tiny\n" + PLAIN * 2, encoding="utf-8"
+    )
+    (work_dir / "FPF-Spec.md").write_text("baseline\n" * 100, encoding="utf-8")
+
+
+def write_manifest(work_dir: Path, extra: str = "") -> Path:
+    manifest_path = work_dir / "budget.yaml"
+    manifest_path.write_text(
+        "output_file: packed.md\nparts:\n- FPF-Part-A.md\n- FPF-Part-B.md\n"
+        "baseline_file: FPF-Spec.md\n" + extra,
+        encoding="utf-8",
+    )
+    return manifest_path
+
+
+def estimate(text: str) -> int:
+    estimator = fpf.TokenEstimator()
+    estimator.feed(text.encode("utf-8"))
+    return estimator.tokens
+
+
+class TestChooseBudgetUnits(unittest.TestCase):
+    def test_matches_brute_force_optimum(self) -> None:
+        rng = random.Random(7)
+        for _ in range(30):
+            units = [
+                fpf.BudgetUnit(
+                    0, f"u{i}", ((0, 1),), rng.randint(1, 60), rng.random() * 100, False
+                )
+                for i in range(8)
+            ]
+            budget = rng.randint(20, 200)
+            chosen = fpf.choose_budget_units(units, budget)
+            best = max(
+                sum(units[i].value for i in subset)
+                for size in range(len(units) + 1)
+                for subset in itertools.combinations(range(len(units)), size)
+                if sum(units[i].tokens for i in subset) <= budget
+            )
+            self.assertLessEqual(sum(units[i].tokens for i in chosen), budget)
+            self.assertAlmostEqual(sum(units[i].value for i in chosen), best)
+
+    def test_required_units_over_budget_raise(self) -> None:
+        units = [fpf.BudgetUnit(0, "frame", ((0, 1),), 50, 50.0, True)]
+        with self.assertRaises(RuntimeError) as ctx:
+            fpf.choose_budget_units(units, 10)
+        self.assertIn("over the budget of 10", str(ctx.exception))
+
+
+class TestAssembleMaxTokens(unittest.TestCase):
+    def test_prefers_normative_chapters_and_reports_dropped(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            write_spec(work_dir)
+            manifest_path = write_manifest(work_dir)
+            budget = estimate(NORMATIVE * 12 + PLAIN * 4) + 40
+
+            output_path, stats, report = fpf.assemble_fpf(
+                manifest_path, work_dir, max_tokens=budget
+            )
+
+            output = output_path.read_text(encoding="utf-8")
+            self.assertIn("# Part A - Kernel\nIntro.\n## A.1 Normative chapter", output)
+            self.assertIn("### A.1.1 Detail", output)
+            self.assertIn("## B.1 Tiny", output)
+            self.assertNotIn("A.2 Plain chapter", output)
+            self.assertNotIn("A.3 Long chapter", output)
+            self.assertLessEqual(estimate(output), budget)
+            self.assertEqual(report.max_tokens, budget)
+            self.assertEqual(report.tokens, estimate(output))
+            self.assertEqual(stats.new_tokens, estimate(output))
+            self.assertEqual(
+                [label.rsplit(" (", 1)[0] for label in report.dropped],
+                ["A.2 Plain chapter", "A.3 Long chapter"],
+            )
+
+    def test_manifest_must_keep_and_priorities(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            write_spec(work_dir)
+            manifest_path = write_manifest(
+                work_dir,
+                "max_tokens: 100000\nmust_keep:\n- A.3\nsection_priorities:\n  B.1: 0\n",
+            )
+
+            output_path, _, report = fpf.assemble_fpf(manifest_path, work_dir)
+
+            output = output_path.read_text(encoding="utf-8")
+            self.assertIn("A.3 Long chapter", output)
+            self.assertIn("A.2 Plain chapter", output)
+            self.assertNotIn("B.1 Tiny", output)
+            self.assertIn("# Part B - Reasoning\n", output)
+            self.assertEqual(report.max_tokens, 100000)
+
+            with self.assertRaises(RuntimeError) as ctx:
+                fpf.assemble_fpf(manifest_path, work_dir, max_tokens=50)
+            self.assertIn("Required sections need", str(ctx.exception))
+
+    def test_invalid_budget_entries_raise(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            write_spec(work_dir)
+            for extra, field in (
+                ("max_tokens: -1\n", "max_tokens"),
+                ("section_priorities:\n  A.1: high\n", "section_priorities"),
+                ("must_keep: A.1\n", "must_keep"),
+            ):
+                with self.subTest(field=field):
+                    manifest_path = write_manifest(work_dir, extra)
+                    with self.assertRaises(RuntimeError) as ctx:
+                        fpf.assemble_fpf(manifest_path, work_dir)
+                    self.assertIn(f"Invalid {field} entry", str(ctx.exception))
+
+    def test_cli_reports_budget_for_single_and_all_profiles(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            write_spec(work_dir)
+            manifest_path = write_manifest(work_dir)
+            budget = str(estimate(NORMATIVE * 12) + 60)
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(
+                    [
+                        "assemble",
+                        "--manifest",
+                        manifest_path.name,
+                        "--work-dir",
+                        tmp_dir,
+                        "--max-tokens",
+                        budget,
+                    ]
+                )
+
+            self.assertEqual(exit_code, 0)
+            self.assertRegex(buffer.getvalue(), rf"Token budget: \d+ of {budget} tokens used")
+            self.assertIn("Dropped to fit the budget:\n  - A.2 Plain chapter", buffer.getvalue())
+
+            profiles_dir = work_dir / "profiles"
+            profiles_dir.mkdir()
+            manifest_path.rename(profiles_dir / "budget.yaml")
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(
+                    [
+                        "assemble",
+                        "--all-profiles",
+                        "--profiles-dir",
+                        str(profiles_dir),
+                        "--work-dir",
+                        tmp_dir,
+                        "--max-tokens",
+                        budget,
+                    ]
+                )
+
+            self.assertEqual(exit_code, 0)
+            packed = (work_dir / "packed.md").read_text(encoding="utf-8")
+            self.assertLessEqual(estimate(packed), int(budget))
+            self.assertNotIn("A.3 Long chapter", packed)
+
+    def test_cli_reports_budget_without_baseline(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            write_spec(work_dir)
+            (work_dir / "nobase.yaml").write_text(
+                "output_file: packed.md\nparts:\n- FPF-Part-A.md\n- FPF-Part-B.md\n",
+                encoding="utf-8",
+            )
+            argv = ["assemble", "--manifest", "nobase.yaml", "--work-dir", tmp_dir]
+            argv += ["--max-tokens", str(estimate(NORMATIVE * 12) + 60)]
+
+            for _ in range(2):
+                buffer = io.StringIO()
+                with redirect_stdout(buffer), redirect_stderr(io.StringIO()):
+                    exit_code = fpf.main(argv)
+
+                self.assertEqual(exit_code, 0)
+                packed = (work_dir / "packed.md").read_text(encoding="utf-8")
+                output = buffer.getvalue()
+                self.assertIn(f"Token budget: {estimate(packed)} of", output)
+                self.assertIn("Dropped to fit the budget:\n  - A.2 Plain chapter", output)
+            self.assertIn("Up to date", buffer.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import base64
+import io
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import fpf
+
+
+PROSE = (
+    "The framework describes how bounded contexts relate to each other and "
+    "why every claim needs an explicit scope.\n"
+)
+TABLE = "| Id | Name | Status |\n|----|------|--------|\n| A.1 | Holon — core | 42 |\n"
+
+
+def write_vocab(path: Path, merges: list[bytes]) -> None:
+    tokens = [bytes([value]) for value in range(256)] + merges
+    path.write_bytes(
+        b"".join(
+            base64.b64encode(token) + b" " + str(rank).encode() + b"\n"
+            for rank, token in enumerate(tokens)
+        )
+    )
+
+
+class TestTokenEstimator(unittest.TestCase):
+    def test_estimate_does_not_depend_on_chunking(self) -> None:
+        data = ((PROSE + TABLE) * 50).encode("utf-8")
+        whole = fpf.TokenEstimator()
+        whole.feed(data)
+        pieces = fpf.TokenEstimator()
+        for position in range(0, len(data), 7):
+            pieces.feed(data[position : position + 7])
+
+        self.assertEqual(pieces.tokens, whole.tokens)
+        self.assertEqual(pieces.chars, whole.chars)
+        self.assertEqual(pieces.bytes, len(data))
+
+    def test_counts_characters_not_bytes(self) -> None:
+        estimator = fpf.TokenEstimator()
+        estimator.feed("a—b c\n".encode("utf-8"))
+
+        self.assertEqual(estimator.bytes, 9)
+        self.assertEqual(estimator.chars, 6)
+        self.assertEqual(estimator.counts["non_ascii"], 2)
+
+    def test_tables_cost_more_tokens_per_char_than_prose(self) -> None:
+        prose = fpf.TokenEstimator()
+        prose.feed(PROSE.encode("utf-8") * 20)
+        table = fpf.TokenEstimator()
+        table.feed(TABLE.encode("utf-8") * 20)
+
+        self.assertAlmostEqual(prose.chars / prose.tokens, 4.5, delta=1.0)
+        self.assertGreater(table.tokens / table.chars, prose.tokens / prose.chars)
+
+
+class TestBpeTokenModel(unittest.TestCase):
+    def test_counts_merged_pieces_from_vocabulary(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            vocab_path = Path(tmp_dir) / "tiny.tiktoken"
+            write_vocab(vocab_path, [b"th", b"the", b" the", b"he"])
+            model = fpf.load_token_model(vocab_path)
+
+            self.assertTrue(model.name.startswith("bpe:tiny.tiktoken:"))
+            self.assertEqual(model.count("the"), 1)
+            self.assertEqual(model.count("the the"), 2)
+            self.assertEqual(model.count("then"), 2)
+
+            counter = model.counter()
+            for chunk in (b"the t", b"he\nthe", b"n"):
+                counter.feed(chunk)
+            self.assertEqual(counter.tokens, 1 + 1 + 1 + 2)
+            self.assertEqual(counter.chars, len("the the\nthen"))
+
+    def test_invalid_vocabulary_raises(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            vocab_path = Path(tmp_dir) / "broken.tiktoken"
+            vocab_path.write_text("not-base64!\n", encoding="utf-8")
+
+            with self.assertRaises(RuntimeError) as ctx:
+                fpf.load_token_model(vocab_path)
+
+            self.assertIn("line 1", str(ctx.exception))
+
+
+class TestTokenStats(unittest.TestCase):
+    def test_strip_reports_bytes_chars_and_tokens(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "FPF-Spec.md").write_text(
+                "Preface\n# **Part A**\n" + PROSE * 5 + "## Plain-English gloss\n" + TABLE * 5,
+                encoding="utf-8",
+            )
+
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                exit_code = fpf.main(["strip-lite", "--work-dir", tmp_dir])
+
+            self.assertEqual(exit_code, 0)
+            output = buffer.getvalue()
+            self.assertRegex(output, r"Size: \d+ -> \d+ bytes, \d+ -> \d+ chars")
+            self.assertRegex(
+                output, r"Tokens \(heuristic-v1\): \d+ -> \d+ \(Reduction: \d+(\.\d+)?%\)"
+            )
+
+            [(stats, _)] = fpf.run_strip(
+                work_dir / "FPF-Spec.md",
+                [
+                    fpf.CompressionVariant(
+                        work_dir / fpf.DEFAULT_LITE_NAME, fpf.load_builtin_rules(False)
+                    )
+                ],
+                work_dir,
+            )
+            estimator = fpf.TokenEstimator()
+            estimator.feed((work_dir / fpf.DEFAULT_LITE_NAME).read_bytes())
+            self.assertEqual(stats.new_tokens, estimator.tokens)
+            self.assertLess(stats.new_tokens, stats.original_tokens)
+
+    def test_assemble_uses_split_token_metadata(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            spec_path = work_dir / "FPF-Spec.md"
+            spec_path.write_text(
+                "Preface\n# Part A\n" + PROSE + "# Part B\n" + TABLE, encoding="utf-8"
+            )
+            fpf.split_fpf(spec_path, work_dir)
+            manifest_path = work_dir / "assemble.yaml"
+            manifest_path.write_text(
+                "output_file: assembled.md\nparts:\n- FPF-Part-B.md\n"
+                "baseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+
+            with patch.object(fpf, "measure_file", side_effect=AssertionError("rescan")):
+                _, stats, _ = fpf.assemble_fpf(manifest_path, work_dir)
+
+            expected = fpf.measure_file(work_dir / "FPF-Part-B.md")
+            baseline = fpf.measure_file(spec_path)
+            self.assertEqual(stats.token_model, "heuristic-v1")
+            self.assertEqual(
+                (stats.new_chars, stats.new_tokens), (expected.chars, expected.tokens)
+            )
+            self.assertEqual(stats.original_tokens, baseline.tokens)
+
+            vocab_path = work_dir / "tiny.tiktoken"
+            write_vocab(vocab_path, [b"th", b"the"])
+            model = fpf.load_token_model(vocab_path)
+            self.assertIsNone(fpf.load_parts_metadata(work_dir, model)["FPF-Part-B.md"].tokens)
+            _, stats, _ = fpf.assemble_fpf(manifest_path, work_dir, model)
+            self.assertEqual(stats.token_model, model.name)
+            self.assertEqual(
+                stats.new_tokens, fpf.measure_file(work_dir / "FPF-Part-B.md", model).tokens
+            )
+
+    def test_whole_spec_profile_keeps_the_baseline_token_count(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            spec_path = work_dir / "FPF-Spec.md"
+            # The rounded estimates of these parts add up to one token less.
+            spec_path.write_text(
+                "Preface\n# Part A\n" + PROSE + "# Part B\n" + TABLE, encoding="utf-8"
+            )
+            parts = fpf.split_fpf(spec_path, work_dir)
+            profiles_dir = work_dir / "profiles"
+            profiles_dir.mkdir()
+            manifest_path = profiles_dir / "full.yaml"
+            manifest_path.write_text(
+                "output_file: full.md\nparts:\n"
+                + "".join(f"- {name}\n" for name in parts)
+                + "baseline_file: FPF-Spec.md\n",
+                encoding="utf-8",
+            )
+
+            _, stats, _ = fpf.assemble_fpf(manifest_path, work_dir)
+            [result] = fpf.assemble_profiles([manifest_path], work_dir)
+
+            self.assertEqual(stats.new_tokens, stats.original_tokens)
+            self.assertEqual(result.stats.new_tokens, result.stats.original_tokens)
+
+
+if __name__ == "__main__":
+    unittest.main()
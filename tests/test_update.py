@@ -0,0 +1,134 @@
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+SPEC = (
+    "Preface\n"
+    "# Part A - Kernel\n"
+    "## A.1 Holon\n"
+    "holon\n"
+    "### Problem\n"
+    "holon problem\n"
+    "## A.2 Role\n"
+    "role\n"
+    "### Problem\n"
+    "role problem\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+    "## B.2 Obsolete\n"
+    "obsolete\n"
+)
+REVISED = (
+    SPEC.replace("role problem\n", "role problem, revised\n")
+    .replace("## B.2 Obsolete\nobsolete\n", "")
+    .replace("aggregation\n", "aggregation\n## B.3 Evidence\nevidence\n")
+)
+
+
+class TestSectionDiff(unittest.TestCase):
+    def run_main(self, argv: list[str]) -> tuple[int, str, str]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exit_code = fpf.main(argv)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_diff_lists_changes_and_writes_delta(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            (work_dir / "old.md").write_text(SPEC, encoding="utf-8")
+            (work_dir / "FPF-Spec.md").write_text(REVISED, encoding="utf-8")
+
+            exit_code, stdout, stderr = self.run_main(
+                ["diff", "--work-dir", tmp_dir, "--old", "old.md"]
+            )
+
+            self.assertEqual(exit_code, 0, stderr)
+            self.assertEqual(
+                stdout.splitlines()[:4],
+                [
+                    "~ A.2/Problem\tProblem",
+                    "+ B.3\tB.3 Evidence",
+                    "- B.2\tB.2 Obsolete",
+                    "Added 1, changed 1, removed 1 sections",
+                ],
+            )
+            delta = (work_dir / fpf.DEFAULT_DELTA_NAME).read_text(encoding="utf-8")
+            self.assertIn("- B.2 Obsolete\n", delta)
+            self.assertTrue(
+                delta.endswith("### Problem\nrole problem, revised\n## B.3 Evidence\nevidence\n")
+            )
+            self.assertNotIn("## A.2 Role", delta)
+
+    def test_section_keys_pair_repeated_headings_by_enclosing_id(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            spec_path = Path(tmp_dir) / "FPF-Spec.md"
+            spec_path.write_text(SPEC + "### Problem\nagain\n", encoding="utf-8")
+            keys = fpf.section_keys(fpf.build_section_index(spec_path))
+            self.assertEqual(keys[2], "A.1/Problem")
+            self.assertEqual(keys[4], "A.2/Problem")
+            self.assertEqual(keys[-1], "B.2/Problem")
+            self.assertEqual(fpf.diff_sections(spec_path, spec_path), [])
+
+
+class TestUpdate(unittest.TestCase):
+    def run_update(self, work_dir: Path) -> str:
+        stdout = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+            exit_code = fpf.main(
+                [
+                    "update",
+                    "--work-dir",
+                    str(work_dir),
+                    "--profiles-dir",
+                    str(work_dir / "profiles"),
+                ]
+            )
+        self.assertEqual(exit_code, 0)
+        return stdout.getvalue()
+
+    def test_rebuilds_only_outputs_with_changed_sections(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            spec_path = work_dir / "FPF-Spec.md"
+            spec_path.write_text(SPEC, encoding="utf-8")
+            profiles_dir = work_dir / "profiles"
+            profiles_dir.mkdir()
+            (profiles_dir / "holon.yaml").write_text(
+                "output_file: holon.md\nparts:\n- FPF-Part-A.md\nbaseline_file: FPF-Spec.md\n"
+                "include_sections:\n- A.1\n",
+                encoding="utf-8",
+            )
+            (profiles_dir / "reasoning.yaml").write_text(
+                "output_file: reasoning.md\nparts:\n- FPF-Part-B.md\n", encoding="utf-8"
+            )
+
+            first = self.run_update(work_dir)
+            self.assertIn("No previous update recorded", first)
+            self.assertNotIn("Up to date", first)
+            holon_mtime = (work_dir / "holon.md").stat().st_mtime_ns
+
+            spec_path.write_text(SPEC.replace("role\n", "role, revised\n"), encoding="utf-8")
+            second = self.run_update(work_dir)
+
+            self.assertIn("~ A.2\tA.2 Role", second)
+            self.assertIn(f"Rebuilt {work_dir / fpf.DEFAULT_LITE_NAME}", second)
+            self.assertIn(f"Up to date: {work_dir / 'holon.md'}", second)
+            self.assertIn(f"Up to date: {work_dir / 'reasoning.md'}", second)
+            self.assertEqual((work_dir / "holon.md").stat().st_mtime_ns, holon_mtime)
+            self.assertIn("role, revised", (work_dir / "FPF-Part-A.md").read_text())
+            self.assertTrue((work_dir / fpf.DEFAULT_DELTA_NAME).exists())
+
+            third = self.run_update(work_dir)
+            self.assertIn("No section changes", third)
+            self.assertNotIn("Rebuilt", third)
+
+
+if __name__ == "__main__":
+    unittest.main()
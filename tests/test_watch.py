@@ -0,0 +1,97 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import fpf
+
+
+SPEC = (
+    "Preface\n"
+    "# Part A - Kernel\n"
+    "## A.1 Holon\n"
+    "holon\n"
+    "## A.2 Role\n"
+    "role\n"
+    "# Part B - Reasoning\n"
+    "## B.1 Aggregation\n"
+    "aggregation\n"
+)
+
+
+class TestWatchers(unittest.TestCase):
+    def check_watcher(self, watcher, directory: Path) -> None:
+        try:
+            self.assertEqual(watcher.wait(0.05), set())
+            (directory / "a.yaml").write_text("a", encoding="utf-8")
+            (directory / "b.tmp").write_text("b", encoding="utf-8")
+            os.replace(directory / "b.tmp", directory / "b.yaml")
+            changed = fpf.wait_for_changes(watcher, 0.1, timeout=5)
+            self.assertLessEqual({directory / "a.yaml", directory / "b.yaml"}, changed)
+        finally:
+            watcher.close()
+
+    def test_polling_watcher_reports_written_and_renamed_files(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            directory = Path(tmp_dir)
+            self.check_watcher(fpf.PollingWatcher([directory], interval=0.01), directory)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+    def test_inotify_watcher_reports_written_and_renamed_files(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            directory = Path(tmp_dir)
+            try:
+                watcher = fpf.InotifyWatcher([directory])
+            except OSError as exc:
+                self.skipTest(f"inotify unavailable: {exc}")
+            self.check_watcher(watcher, directory)
+
+
+class TestSpecWatch(unittest.TestCase):
+    def test_rebuilds_only_affected_targets(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir).resolve()
+            spec_path = work_dir / "FPF-Spec.md"
+            spec_path.write_text(SPEC, encoding="utf-8")
+            profiles_dir = work_dir / "profiles"
+            profiles_dir.mkdir()
+            kernel = profiles_dir / "kernel.yaml"
+            kernel.write_text("output_file: kernel.md\nparts:\n- FPF-Part-A.md\n", encoding="utf-8")
+            (profiles_dir / "reasoning.yaml").write_text(
+                "output_file: reasoning.md\nparts:\n- FPF-Part-B.md\n", encoding="utf-8"
+            )
+            watch = fpf.SpecWatch(work_dir, profiles_dir)
+
+            first = watch.rebuild()
+            self.assertEqual(first.errors, [])
+            self.assertTrue(all(ran for _, ran in first.outputs))
+            self.assertEqual(watch.pending(), set())
+
+            kernel.write_text(
+                "output_file: kernel.md\nparts:\n- FPF-Part-A.md\nexclude_sections:\n- A.2\n",
+                encoding="utf-8",
+            )
+            self.assertEqual(watch.pending(), {kernel})
+            report = watch.rebuild(watch.pending())
+            self.assertEqual(report.outputs, [(work_dir / "kernel.md", True)])
+            self.assertNotIn("role", (work_dir / "kernel.md").read_text(encoding="utf-8"))
+
+            spec_path.write_text(SPEC.replace("aggregation\n", "aggregation 2\n"), encoding="utf-8")
+            report = watch.rebuild(watch.pending())
+            self.assertEqual([change.key for change in report.changes], ["B.1"])
+            rebuilt = {path.name for path, ran in report.outputs if ran}
+            self.assertIn("reasoning.md", rebuilt)
+            self.assertNotIn("kernel.md", rebuilt)
+            # Parts rewritten by the rebuild are not reported as changes.
+            self.assertEqual(watch.pending(), set())
+
+            part_path = work_dir / "FPF-Part-B.md"
+            part_path.write_text("# Part B - Reasoning\nedited\n", encoding="utf-8")
+            report = watch.rebuild(watch.pending())
+            self.assertEqual(report.inputs, [part_path])
+            self.assertEqual(report.outputs, [(work_dir / "reasoning.md", True)])
+
+
+if __name__ == "__main__":
+    unittest.main()